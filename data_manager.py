@@ -1,18 +1,504 @@
+import atexit
 import json
 import os
+import threading
+from contextlib import contextmanager
+from journal import MutationJournal
+from persistence import BackgroundWriter, atomic_write_json
+from snapshot import SNAPSHOT_EXTENSION, SnapshotError, load_snapshot, save_snapshot
+from stream_loader import iter_bank_events
 
-class DataManager:
+
+def is_legacy_data(data):
+    """
+    判断是否为旧版数据结构（顶层直接是题目列表，没有题库）
+    
+    Args:
+        data: 从文件读取的数据字典
+        
+    Returns:
+        bool: 是否为旧版数据结构
+    """
+    return 'questions' in data and 'banks' not in data
+
+
+def convert_legacy_data(data):
+    """
+    将旧版数据结构转换为题库结构
+    
+    Args:
+        data: 旧版数据字典
+        
+    Returns:
+        dict: 新结构的数据字典
+    """
+    return {
+        'banks': [
+            {
+                'id': 1,
+                'name': '题库一',
+                'questions': data['questions']
+            }
+        ]
+    }
+
+
+def create_data_manager(file_path='questions.json', **kwargs):
+    """
+    根据文件扩展名创建对应存储后端的数据管理器
+    
+    Args:
+        file_path: 数据文件路径，.db/.sqlite/.sqlite3使用SQLite后端，
+            目录使用分片存储，其余使用JSON
+        **kwargs: 传给数据管理器的其他参数
+        
+    Returns:
+        数据管理器实例
+    """
+    if os.path.splitext(file_path)[1].lower() in ('.db', '.sqlite', '.sqlite3'):
+        from sqlite_manager import SQLiteDataManager
+        return SQLiteDataManager(file_path, **kwargs)
+    if os.path.isdir(file_path):
+        from sharded_manager import ShardedDataManager
+        return ShardedDataManager(file_path, **kwargs)
+    return DataManager(file_path, **kwargs)
+
+
+# 进程内共享的数据管理器，按文件绝对路径区分
+_shared_managers = {}
+_shared_lock = threading.Lock()
+
+
+def get_data_manager(file_path='questions.json', **kwargs):
+    """
+    获取进程内共享的数据管理器，同一个文件只加载一次
+    
+    Args:
+        file_path: 数据文件路径
+        **kwargs: 首次创建时传给数据管理器的参数，之后的调用会忽略
+        
+    Returns:
+        数据管理器实例
+    """
+    key = os.path.abspath(file_path)
+    with _shared_lock:
+        manager = _shared_managers.get(key)
+        if manager is None:
+            manager = create_data_manager(file_path, **kwargs)
+            _shared_managers[key] = manager
+        return manager
+
+
+def change_from_record(record):
+    """
+    根据变更记录生成通知给订阅者的变更描述
+    
+    Args:
+        record: 变更记录字典
+        
+    Returns:
+        dict: 变更描述，包含op、bank_id和question_ids，移动题目时还包含from_bank_id
+    """
+    op = record['op']
+    change = {'op': op, 'bank_id': record.get('bank_id'), 'question_ids': []}
+    if op == 'add_bank':
+        change['bank_id'] = record['bank']['id']
+    elif op == 'set_questions':
+        change['question_ids'] = [q.get('id') for q in record['questions']]
+    elif op in ('add_question', 'update_question'):
+        change['question_ids'] = [record['question']['id']]
+    elif op in ('delete_question', 'move_question'):
+        change['question_ids'] = [record['question_id']]
+        if op == 'move_question':
+            change['from_bank_id'] = record['from_bank_id']
+    return change
+
+
+class ChangeNotifier:
+    """变更通知类，数据管理器修改数据后通知订阅者
+    
+    默认在修改数据的线程中直接通知。调用deliver_on_thread后只在指定线程中通知，
+    后台加载等其他线程产生的变更先排队，由该线程调用deliver_pending时再通知。
+    """
+    
+    # 通知订阅者的线程，None表示在修改数据的线程中直接通知
+    _notify_thread = None
+    
+    def subscribe(self, callback):
+        """
+        订阅数据变更
+        
+        Args:
+            callback: 回调函数，参数为变更描述列表，批量修改提交时一次性通知；
+                同一批中的题目可能被多次修改，回调中应按ID重新读取题目的当前状态
+            
+        Returns:
+            function: 取消订阅的函数
+        """
+        self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+    
+    def unsubscribe(self, callback):
+        """
+        取消订阅数据变更
+        
+        Args:
+            callback: 订阅时传入的回调函数
+        """
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+    
+    def deliver_on_thread(self, thread=None):
+        """
+        只在指定线程中通知订阅者，用于界面程序：订阅者可以安全地更新界面和缓存
+        
+        Args:
+            thread: 通知订阅者的线程，None表示当前线程
+        """
+        self._queued_changes = []
+        self._queue_lock = threading.Lock()
+        self._notify_thread = thread or threading.current_thread()
+    
+    def deliver_pending(self):
+        """
+        通知其他线程产生的、尚在排队的变更，应在deliver_on_thread指定的线程中定时调用
+        
+        Returns:
+            int: 通知的变更数
+        """
+        if self._notify_thread is None:
+            return 0
+        with self._queue_lock:
+            changes, self._queued_changes = self._queued_changes, []
+        self._deliver(changes)
+        return len(changes)
+    
+    def _notify(self, changes):
+        """
+        通知所有订阅者，不在通知线程中时先排队
+        
+        Args:
+            changes: 变更描述列表
+        """
+        if not changes:
+            return
+        if self._notify_thread is not None:
+            if threading.current_thread() is not self._notify_thread:
+                with self._queue_lock:
+                    self._queued_changes.extend(changes)
+                return
+            # 先通知之前排队的变更，保持变更的先后顺序
+            self.deliver_pending()
+        self._deliver(changes)
+    
+    def _deliver(self, changes):
+        """
+        在当前线程中通知所有订阅者
+        
+        Args:
+            changes: 变更描述列表
+        """
+        if not changes:
+            return
+        for callback in list(self._subscribers):
+            try:
+                callback(changes)
+            except Exception as e:
+                # 订阅者出错不影响数据修改
+                print(f"变更通知处理失败: {e}")
+
+
+class DataManager(ChangeNotifier):
     """数据管理类，负责JSON文件的读写操作"""
     
-    def __init__(self, file_path='questions.json'):
+    def __init__(self, file_path='questions.json', journal=False, compact_threshold=1024 * 1024,
+                 write_behind=False, write_delay=0.5, stream_load=False):
         """
         初始化数据管理器
         
         Args:
             file_path: JSON文件路径
+            journal: 是否启用日志模式，启用后每次修改只追加一条变更记录，
+                日志超过阈值时在后台压缩为新的快照
+            compact_threshold: 日志压缩阈值（字节）
+            write_behind: 是否启用后台写入，启用后修改只标记为待保存，
+                由后台线程合并多次修改后统一写入（日志模式下不生效）
+            write_delay: 后台写入前等待合并修改的秒数
+            stream_load: 是否在后台线程中增量加载JSON文件，加载期间get_banks返回已读到的题库，
+                iter_questions可以立即逐题读取，其他操作等待加载完成
+        
+        文件扩展名为.qbs时使用紧凑二进制快照代替JSON
         """
         self.file_path = file_path
-        self.data = self._load_data()
+        self.binary = os.path.splitext(file_path)[1].lower() == SNAPSHOT_EXTENSION
+        self.journal = MutationJournal(file_path + '.journal', compact_threshold) if journal else None
+        self._compact_thread = None
+        # 保护内存数据，后台线程复制快照时不会看到修改到一半的数据
+        self._lock = threading.RLock()
+        self._writer = None
+        if write_behind and not journal:
+            self._writer = BackgroundWriter(self._write_behind, delay=write_delay)
+            atexit.register(self.flush)
+        # 批量修改的嵌套层数和待持久化的变更记录
+        self._batch_depth = 0
+        self._pending_records = []
+        self._subscribers = []
+        # 题库ID -> 题库字典
+        self._bank_index = {}
+        # 题目ID -> (题库字典, 题目在题库列表中的位置)
+        self._question_index = {}
+        # 题库ID -> {知识点: 题目ID集合}，集合大小即知识点的引用计数
+        self._topic_index = {}
+        # 题库ID（None表示所有题库）-> 排好序的知识点列表，知识点增减时失效
+        self._topic_lists = {}
+        # 增量加载：加载完成事件、通知新题目的条件变量和已读完的题库数
+        self.stream_load = stream_load
+        self._loaded = threading.Event()
+        self._loaded.set()
+        self._load_cond = threading.Condition()
+        self._loaded_bank_count = 0
+        self.reload()
+    
+    def reload(self):
+        """
+        重新从文件加载数据并重建索引
+        """
+        self._wait_loaded()
+        if self.stream_load and not self.binary and os.path.exists(self.file_path):
+            self._start_stream_load()
+            return
+        with self._lock:
+            self.data = self._load_data()
+            self._finish_load()
+        # 重新加载后订阅者需要全部刷新
+        self._notify([{'op': 'reload', 'bank_id': None, 'question_ids': []}])
+    
+    def _finish_load(self):
+        """
+        在加载的数据上重放日志并建立索引
+        """
+        if self.journal:
+            self.journal.replay(self.data)
+            if self.journal.has_rotated():
+                # 上次压缩未完成，当前数据已包含所有日志记录，直接写出新快照
+                self._write_file(self.data)
+                self.journal.clear()
+        self._build_index()
+    
+    def _start_stream_load(self):
+        """
+        启动后台线程增量加载JSON文件
+        """
+        self._loaded.clear()
+        self._loaded_bank_count = 0
+        self.data = {'banks': []}
+        threading.Thread(target=self._stream_load, name='StreamLoader', daemon=True).start()
+    
+    def _stream_load(self):
+        """
+        后台线程：逐题读入数据，加载完成后建立索引并通知订阅者
+        
+        加载期间其他线程只会读取题库列表，修改操作都在等待加载完成，因此这里不需要持有数据锁
+        """
+        data = self.data
+        legacy = False
+        try:
+            for event in iter_bank_events(self.file_path):
+                kind = event[0]
+                if kind == 'question':
+                    questions = event[1]['questions']
+                    questions.append(event[2])
+                    # 按批唤醒等待的读者，避免逐题通知
+                    if len(questions) % 256 == 0:
+                        with self._load_cond:
+                            self._load_cond.notify_all()
+                elif kind == 'bank':
+                    bank = event[1]
+                    bank['questions'] = []
+                    with self._load_cond:
+                        data['banks'].append(bank)
+                        self._load_cond.notify_all()
+                elif kind == 'bank_end':
+                    with self._load_cond:
+                        self._loaded_bank_count += 1
+                        self._load_cond.notify_all()
+                elif kind == 'meta':
+                    data[event[1]] = event[2]
+                elif kind == 'legacy':
+                    legacy = True
+            if legacy:
+                # 将旧数据转换为新结构
+                self._save_data(data)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError) as e:
+            print(f"加载数据失败: {e}")
+            with self._load_cond:
+                # 与一次性加载一致，文件损坏时使用默认数据结构
+                self.data = {'banks': [{'id': 1, 'name': '题库一', 'questions': []}]}
+        try:
+            self._finish_load()
+        finally:
+            with self._load_cond:
+                self._loaded.set()
+                self._load_cond.notify_all()
+        self._notify([{'op': 'reload', 'bank_id': None, 'question_ids': []}])
+    
+    def _wait_loaded(self):
+        """
+        等待后台增量加载完成
+        """
+        self._loaded.wait()
+    
+    def is_loaded(self):
+        """
+        判断数据是否已全部加载
+        
+        Returns:
+            bool: 是否加载完成
+        """
+        return self._loaded.is_set()
+    
+    def get_loaded_questions(self, bank_id, start=0):
+        """
+        获取题库中已读到的题目，增量加载期间不等待后续内容，用于界面在加载过程中陆续显示题目
+        
+        Args:
+            bank_id: 题库ID
+            start: 起始位置，之前已取得的题目不再返回
+            
+        Returns:
+            list: 题目列表
+        """
+        with self._load_cond:
+            for bank in self.data['banks']:
+                if bank.get('id') == bank_id:
+                    return bank.get('questions', [])[start:]
+        return []
+    
+    def _build_index(self):
+        """
+        重建题库索引和题目ID索引，并恢复ID分配器
+        """
+        self._bank_index = {}
+        self._question_index = {}
+        self._topic_index = {}
+        self._topic_lists = {}
+        # 分配器保存在数据中，与已有的最大ID取较大值，兼容没有分配器的旧文件
+        self.data.setdefault('next_question_id', 1)
+        self.data.setdefault('next_bank_id', 1)
+        for bank in self.data['banks']:
+            self._bank_index.setdefault(bank['id'], bank)
+            if bank['id'] >= self.data['next_bank_id']:
+                self.data['next_bank_id'] = bank['id'] + 1
+            self._index_bank(bank)
+    
+    def _index_bank(self, bank, start=0):
+        """
+        索引题库中从指定位置开始的题目，从头索引时同时建立知识点索引
+        
+        Args:
+            bank: 题库字典
+            start: 起始位置，删除题目后只需重新索引其后的题目
+        """
+        questions = bank.get('questions', [])
+        for i in range(start, len(questions)):
+            question_id = questions[i].get('id')
+            entry = self._question_index.get(question_id)
+            # 与逐个遍历的查找一致，重复ID以第一次出现的为准
+            if entry is None or entry[0] is bank:
+                self._question_index[question_id] = (bank, i)
+            if isinstance(question_id, int) and question_id >= self.data['next_question_id']:
+                self.data['next_question_id'] = question_id + 1
+            if not start:
+                self._index_topic(bank, questions[i])
+    
+    def _unindex_bank(self, bank):
+        """
+        移除题库中所有题目的索引
+        
+        Args:
+            bank: 题库字典
+        """
+        for question in bank.get('questions', []):
+            entry = self._question_index.get(question.get('id'))
+            if entry is not None and entry[0] is bank:
+                del self._question_index[question.get('id')]
+        if self._topic_index.pop(bank['id'], None):
+            self._topic_lists.pop(bank['id'], None)
+            self._topic_lists.pop(None, None)
+    
+    def _index_topic(self, bank, question):
+        """
+        将题目加入题库的知识点索引
+        
+        Args:
+            bank: 题库字典
+            question: 题目字典
+        """
+        if 'topic' not in question:
+            return
+        topics = self._topic_index.setdefault(bank['id'], {})
+        question_ids = topics.get(question['topic'])
+        if question_ids is None:
+            question_ids = topics[question['topic']] = set()
+            self._topic_lists.pop(bank['id'], None)
+            self._topic_lists.pop(None, None)
+        question_ids.add(question.get('id'))
+    
+    def _unindex_topic(self, bank, question):
+        """
+        将题目移出题库的知识点索引，知识点没有题目时一并移除
+        
+        Args:
+            bank: 题库字典
+            question: 题目字典
+        """
+        if 'topic' not in question:
+            return
+        topics = self._topic_index.get(bank['id'], {})
+        question_ids = topics.get(question['topic'])
+        if question_ids is None:
+            return
+        question_ids.discard(question.get('id'))
+        if not question_ids:
+            del topics[question['topic']]
+            self._topic_lists.pop(bank['id'], None)
+            self._topic_lists.pop(None, None)
+    
+    def _get_bank(self, bank_id):
+        """
+        根据ID获取题库字典
+        
+        Args:
+            bank_id: 题库ID
+            
+        Returns:
+            dict: 题库字典，不存在时返回None
+        """
+        self._wait_loaded()
+        return self._bank_index.get(bank_id)
+    
+    def _find_question(self, question_id):
+        """
+        根据ID查找题目位置
+        
+        Args:
+            question_id: 题目ID
+            
+        Returns:
+            tuple: (题库字典, 题目位置)，不存在时返回None
+        """
+        self._wait_loaded()
+        return self._question_index.get(question_id)
+    
+    def _all_banks(self):
+        """
+        获取需要遍历全部题目时使用的题库列表
+        
+        Returns:
+            list: 题库列表
+        """
+        self._wait_loaded()
+        return self.data['banks']
     
     def _load_data(self):
         """
@@ -36,24 +522,15 @@ class DataManager:
             return default_data
         
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 兼容旧数据结构
-                if 'questions' in data and 'banks' not in data:
-                    # 将旧数据转换为新结构
-                    new_data = {
-                        'banks': [
-                            {
-                                'id': 1,
-                                'name': '题库一',
-                                'questions': data['questions']
-                            }
-                        ]
-                    }
-                    self._save_data(new_data)
-                    return new_data
-                return data
-        except json.JSONDecodeError:
+            data = self._read_file()
+            # 兼容旧数据结构
+            if is_legacy_data(data):
+                # 将旧数据转换为新结构
+                new_data = convert_legacy_data(data)
+                self._save_data(new_data)
+                return new_data
+            return data
+        except (json.JSONDecodeError, SnapshotError):
             # 如果文件损坏，返回默认数据结构
             return {
                 'banks': [
@@ -67,17 +544,198 @@ class DataManager:
     
     def _save_data(self, data):
         """
-        保存数据到JSON文件
+        保存数据到JSON文件，先写临时文件再原子替换，写入中途崩溃不会损坏原文件
         
         Args:
             data: 要保存的数据
         """
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self._write_file(data)
         except Exception as e:
             print(f"保存数据失败: {e}")
     
+    def _read_file(self):
+        """
+        读取数据文件，根据扩展名选择JSON或紧凑快照格式
+        
+        Returns:
+            dict: 题目数据字典
+        """
+        if self.binary:
+            return load_snapshot(self.file_path)
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_file(self, data):
+        """
+        以原子替换的方式写出数据文件，根据扩展名选择JSON或紧凑快照格式
+        
+        Args:
+            data: 要保存的数据
+        """
+        if self.binary:
+            save_snapshot(self.file_path, data)
+        else:
+            atomic_write_json(self.file_path, data)
+    
+    def _write_behind(self):
+        """
+        后台写入：加锁复制一份快照，在锁外序列化并写文件
+        """
+        with self._lock:
+            snapshot = self._copy_data()
+        self._write_file(snapshot)
+    
+    def flush(self):
+        """
+        立即写入所有尚未保存的修改，并等待后台压缩完成，用于程序退出和测试
+        """
+        if self._writer is not None:
+            self._writer.flush()
+        self.wait_for_compaction()
+    
+    def close(self):
+        """
+        写入所有未保存的修改并停止后台线程
+        """
+        self._wait_loaded()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            atexit.unregister(self.flush)
+        self.wait_for_compaction()
+    
+    def _commit(self, record):
+        """
+        持久化一次修改，批量修改中只记录变更，提交时统一持久化
+        
+        Args:
+            record: 描述本次修改的变更记录
+        """
+        if self._batch_depth:
+            self._pending_records.append(record)
+            return
+        self._persist([record])
+        self._notify([change_from_record(record)])
+    
+    def _persist(self, records):
+        """
+        持久化一组修改
+        
+        日志模式下只追加变更记录，否则重写整个JSON文件
+        
+        Args:
+            records: 变更记录列表
+        """
+        if not records:
+            return
+        if self.journal is None:
+            if self._writer is not None:
+                self._writer.mark_dirty()
+            else:
+                self._save_data(self.data)
+            return
+        self.journal.append_many(records)
+        if self.journal.needs_compaction():
+            self.compact()
+    
+    def _copy_data(self):
+        """
+        复制数据结构，用于快照和回滚
+        
+        题目字典在修改时整体替换，只需复制到题目列表一层
+        
+        Returns:
+            dict: 数据的浅拷贝
+        """
+        return {
+            **self.data,
+            'banks': [
+                # 分片存储中尚未加载的题库没有questions字段，保持未加载状态
+                {**bank, 'questions': list(bank['questions'])} if 'questions' in bank else dict(bank)
+                for bank in self.data['banks']
+            ]
+        }
+    
+    @contextmanager
+    def batch(self):
+        """
+        批量修改，块内的所有修改只在内存中进行，正常结束时统一持久化一次，
+        出现异常时回滚到批量修改开始前的状态
+        
+        支持嵌套，只有最外层结束时才会提交或回滚
+        
+        用法:
+            with data_manager.batch():
+                data_manager.add_question(question, bank_id)
+                data_manager.delete_question(question_id)
+        """
+        self._wait_loaded()
+        with self._lock:
+            if self._batch_depth:
+                self._batch_depth += 1
+                try:
+                    yield self
+                finally:
+                    self._batch_depth -= 1
+                return
+        
+            backup = self._copy_data()
+            self._batch_depth = 1
+            self._pending_records = []
+            try:
+                yield self
+            except BaseException:
+                self.data = backup
+                self._build_index()
+                raise
+            finally:
+                self._batch_depth = 0
+                records = self._pending_records
+                self._pending_records = []
+            self._persist(records)
+            self._notify([change_from_record(record) for record in records])
+    
+    def compact(self, background=True):
+        """
+        将日志压缩为新的快照
+        
+        在调用线程中复制一份浅拷贝并切换日志，序列化和写文件在后台线程完成
+        
+        Args:
+            background: 是否在后台线程中写快照
+        """
+        if self.journal is None:
+            return
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            return
+        if self._batch_depth:
+            # 批量修改尚未提交，不能写入快照
+            return
+        snapshot = self._copy_data()
+        self.journal.rotate()
+        
+        def run():
+            try:
+                self._write_file(snapshot)
+                self.journal.finish_rotation()
+            except Exception as e:
+                # 旧日志保留，下次加载时重放
+                print(f"压缩日志失败: {e}")
+        
+        if background:
+            self._compact_thread = threading.Thread(target=run, daemon=True)
+            self._compact_thread.start()
+        else:
+            run()
+    
+    def wait_for_compaction(self):
+        """
+        等待后台压缩完成
+        """
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+    
     def get_banks(self):
         """
         获取所有题库
@@ -99,17 +757,115 @@ class DataManager:
         """
         if bank_id:
             # 获取指定题库的题目
-            for bank in self.data['banks']:
-                if bank['id'] == bank_id:
-                    return bank.get('questions', [])
-            return []
+            bank = self._get_bank(bank_id)
+            if bank is None:
+                return []
+            return bank.get('questions', [])
         else:
             # 获取所有题库的题目
             all_questions = []
-            for bank in self.data['banks']:
+            for bank in self._all_banks():
                 all_questions.extend(bank.get('questions', []))
             return all_questions
     
+    def iter_questions(self, bank_id=None):
+        """
+        逐题遍历题目
+        
+        增量加载期间不等待加载完成，已读到的题目立即产出，之后的题目读到后继续产出；
+        加载完成后逐个题库遍历，分片存储中每次只加载一个题库
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            
+        Yields:
+            dict: 题目字典
+        """
+        if not self._loaded.is_set():
+            yield from self._iter_loading(bank_id)
+            return
+        if bank_id:
+            banks = [self._get_bank(bank_id)]
+        else:
+            banks = list(self.data['banks'])
+        for bank in banks:
+            if bank is None:
+                continue
+            if 'questions' not in bank:
+                bank = self._get_bank(bank['id'])
+            yield from list(bank.get('questions', []))
+    
+    def _iter_loading(self, bank_id):
+        """
+        增量加载期间逐题遍历，等待后台线程读入新的题目
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            
+        Yields:
+            dict: 题目字典
+        """
+        bank_position = 0
+        while True:
+            with self._load_cond:
+                banks = self.data['banks']
+                while bank_position >= len(banks) and not self._loaded.is_set():
+                    self._load_cond.wait()
+                if bank_position >= len(banks):
+                    return
+                bank = banks[bank_position]
+            bank_position += 1
+            if bank_id and bank.get('id') != bank_id:
+                continue
+            position = 0
+            while True:
+                with self._load_cond:
+                    questions = bank['questions']
+                    while (position >= len(questions) and bank_position > self._loaded_bank_count
+                           and not self._loaded.is_set()):
+                        self._load_cond.wait()
+                    chunk = questions[position:]
+                if not chunk:
+                    break
+                position += len(chunk)
+                yield from chunk
+            if bank_id:
+                return
+    
+    def get_questions_by_topic(self, topic, bank_id=None):
+        """
+        获取指定知识点的题目
+        
+        Args:
+            topic: 知识点
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            list: 题目列表
+        """
+        if topic is None:
+            # 没有topic字段的题目也会匹配None，无法使用知识点索引
+            return [q for q in self.get_questions(bank_id) if q.get('topic') == topic]
+        if bank_id:
+            bank = self._get_bank(bank_id)
+            banks = [bank] if bank is not None else []
+        else:
+            banks = self._all_banks()
+        result = []
+        for bank in banks:
+            question_ids = self._topic_index.get(bank['id'], {}).get(topic)
+            if not question_ids:
+                continue
+            # 按题目在题库中的位置输出，与存储顺序一致
+            positions = []
+            for question_id in question_ids:
+                entry = self._question_index.get(question_id)
+                if entry is not None and entry[0] is bank:
+                    positions.append(entry[1])
+            questions = bank['questions']
+            result.extend(questions[position] for position in sorted(positions))
+        return result
+    
     def save_questions(self, questions, bank_id):
         """
         保存题目列表
@@ -118,11 +874,14 @@ class DataManager:
             questions: 题目列表
             bank_id: 题库ID
         """
-        for bank in self.data['banks']:
-            if bank['id'] == bank_id:
-                bank['questions'] = questions
-                self._save_data(self.data)
-                break
+        with self._lock:
+            bank = self._get_bank(bank_id)
+            if bank is None:
+                return
+            self._unindex_bank(bank)
+            bank['questions'] = questions
+            self._index_bank(bank)
+            self._commit({'op': 'set_questions', 'bank_id': bank_id, 'questions': questions})
     
     def get_question_by_id(self, question_id):
         """
@@ -134,11 +893,11 @@ class DataManager:
         Returns:
             tuple: (题目字典, 题库ID)，如果不存在返回(None, None)
         """
-        for bank in self.data['banks']:
-            for question in bank.get('questions', []):
-                if question.get('id') == question_id:
-                    return question, bank['id']
-        return None, None
+        entry = self._find_question(question_id)
+        if entry is None:
+            return None, None
+        bank, position = entry
+        return bank['questions'][position], bank['id']
     
     def add_question(self, question, bank_id):
         """
@@ -148,20 +907,21 @@ class DataManager:
             question: 题目字典
             bank_id: 题库ID
         """
-        # 生成新ID（全局唯一）
-        max_id = 0
-        for bank in self.data['banks']:
-            for q in bank.get('questions', []):
-                if q.get('id', 0) > max_id:
-                    max_id = q.get('id', 0)
-        question['id'] = max_id + 1
+        with self._lock:
+            bank = self._get_bank(bank_id)
+            if bank is None:
+                return
         
-        # 添加到指定题库
-        for bank in self.data['banks']:
-            if bank['id'] == bank_id:
-                bank.get('questions', []).append(question)
-                self._save_data(self.data)
-                break
+            # 从分配器生成新ID（全局唯一，删除后也不会重复使用）
+            question['id'] = self.data['next_question_id']
+            self.data['next_question_id'] += 1
+        
+            # 添加到指定题库
+            questions = bank.setdefault('questions', [])
+            questions.append(question)
+            self._question_index[question['id']] = (bank, len(questions) - 1)
+            self._index_topic(bank, question)
+            self._commit({'op': 'add_question', 'bank_id': bank_id, 'question': question})
     
     def update_question(self, question_id, updated_question):
         """
@@ -171,14 +931,17 @@ class DataManager:
             question_id: 题目ID
             updated_question: 更新后的题目字典
         """
-        for bank in self.data['banks']:
-            for i, question in enumerate(bank.get('questions', [])):
-                if question.get('id') == question_id:
-                    updated_question['id'] = question_id
-                    bank.get('questions', [])[i] = updated_question
-                    self._save_data(self.data)
-                    return True
-        return False
+        with self._lock:
+            entry = self._find_question(question_id)
+            if entry is None:
+                return False
+            bank, position = entry
+            updated_question['id'] = question_id
+            self._unindex_topic(bank, bank['questions'][position])
+            bank['questions'][position] = updated_question
+            self._index_topic(bank, updated_question)
+            self._commit({'op': 'update_question', 'bank_id': bank['id'], 'question': updated_question})
+            return True
     
     def delete_question(self, question_id):
         """
@@ -187,12 +950,47 @@ class DataManager:
         Args:
             question_id: 题目ID
         """
-        for bank in self.data['banks']:
-            bank['questions'] = [
-                q for q in bank.get('questions', []) 
-                if q.get('id') != question_id
-            ]
-        self._save_data(self.data)
+        with self._lock:
+            entry = self._find_question(question_id)
+            if entry is None:
+                return
+            del self._question_index[question_id]
+            bank, position = entry
+            self._unindex_topic(bank, bank['questions'][position])
+            del bank['questions'][position]
+            # 只需更新被删除题目之后的题目位置
+            self._index_bank(bank, position)
+            self._commit({'op': 'delete_question', 'bank_id': bank['id'], 'question_id': question_id})
+    
+    def move_question(self, question_id, bank_id):
+        """
+        将题目移动到另一个题库
+        
+        Args:
+            question_id: 题目ID
+            bank_id: 目标题库ID
+            
+        Returns:
+            bool: 是否移动成功
+        """
+        with self._lock:
+            target = self._get_bank(bank_id)
+            entry = self._find_question(question_id)
+            if target is None or entry is None:
+                return False
+            bank, position = entry
+            if bank is target:
+                return True
+            question = bank['questions'].pop(position)
+            self._unindex_topic(bank, question)
+            self._index_bank(bank, position)
+            questions = target.setdefault('questions', [])
+            questions.append(question)
+            self._question_index[question_id] = (target, len(questions) - 1)
+            self._index_topic(target, question)
+            self._commit({'op': 'move_question', 'question_id': question_id,
+                          'from_bank_id': bank['id'], 'bank_id': bank_id})
+            return True
     
     def get_unique_topics(self, bank_id=None):
         """
@@ -204,22 +1002,26 @@ class DataManager:
         Returns:
             list: 知识点列表
         """
-        topics = set()
         if bank_id:
             # 获取指定题库的知识点
-            for bank in self.data['banks']:
-                if bank['id'] == bank_id:
-                    for question in bank.get('questions', []):
-                        if 'topic' in question:
-                            topics.add(question['topic'])
-                    break
+            bank = self._get_bank(bank_id)
+            if bank is None:
+                return []
+            key = bank['id']
         else:
             # 获取所有题库的知识点
-            for bank in self.data['banks']:
-                for question in bank.get('questions', []):
-                    if 'topic' in question:
-                        topics.add(question['topic'])
-        return sorted(list(topics))
+            self._all_banks()
+            key = None
+        topics = self._topic_lists.get(key)
+        if topics is None:
+            if key is None:
+                topics = set()
+                for bank_topics in self._topic_index.values():
+                    topics.update(bank_topics)
+            else:
+                topics = self._topic_index.get(key, {})
+            topics = self._topic_lists[key] = sorted(topics)
+        return list(topics)
     
     def add_bank(self, bank_name):
         """
@@ -231,22 +1033,22 @@ class DataManager:
         Returns:
             int: 新题库的ID
         """
-        # 生成新ID
-        max_id = 0
-        for bank in self.data['banks']:
-            if bank['id'] > max_id:
-                max_id = bank['id']
-        new_id = max_id + 1
-        
-        # 添加新题库
-        new_bank = {
-            'id': new_id,
-            'name': bank_name,
-            'questions': []
-        }
-        self.data['banks'].append(new_bank)
-        self._save_data(self.data)
-        return new_id
+        self._wait_loaded()
+        with self._lock:
+            # 从分配器生成新ID
+            new_id = self.data['next_bank_id']
+            self.data['next_bank_id'] += 1
+        
+            # 添加新题库
+            new_bank = {
+                'id': new_id,
+                'name': bank_name,
+                'questions': []
+            }
+            self.data['banks'].append(new_bank)
+            self._bank_index[new_id] = new_bank
+            self._commit({'op': 'add_bank', 'bank': {'id': new_id, 'name': bank_name}})
+            return new_id
     
     def update_bank_name(self, bank_id, new_name):
         """
@@ -256,11 +1058,12 @@ class DataManager:
             bank_id: 题库ID
             new_name: 新题库名称
         """
-        for bank in self.data['banks']:
-            if bank['id'] == bank_id:
+        self._wait_loaded()
+        with self._lock:
+            bank = self._bank_index.get(bank_id)
+            if bank is not None:
                 bank['name'] = new_name
-                self._save_data(self.data)
-                break
+                self._commit({'op': 'rename_bank', 'bank_id': bank_id, 'name': new_name})
     
     def delete_bank(self, bank_id):
         """
@@ -269,10 +1072,15 @@ class DataManager:
         Args:
             bank_id: 题库ID
         """
-        # 确保至少保留一个题库
-        if len(self.data['banks']) > 1:
-            self.data['banks'] = [
-                bank for bank in self.data['banks'] 
-                if bank['id'] != bank_id
-            ]
-            self._save_data(self.data)
+        self._wait_loaded()
+        with self._lock:
+            # 确保至少保留一个题库
+            if len(self.data['banks']) > 1:
+                bank = self._bank_index.pop(bank_id, None)
+                if bank is not None:
+                    self._unindex_bank(bank)
+                self.data['banks'] = [
+                    bank for bank in self.data['banks'] 
+                    if bank['id'] != bank_id
+                ]
+                self._commit({'op': 'delete_bank', 'bank_id': bank_id})
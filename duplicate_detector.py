@@ -0,0 +1,306 @@
+import re
+import zlib
+
+# 默认的相似度阈值、签名长度和字符片段长度
+DEFAULT_THRESHOLD = 0.8
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+
+# 比较时忽略空白和常见标点
+_IGNORED_RE = re.compile(r'[\s\.,;:!?，。；：！？、（）()\[\]【】"“”\'‘’]+')
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_text(question):
+    """
+    获取用于比较的题目文本：题目内容和答案，转为小写并去掉空白和标点
+
+    Args:
+        question: 题目字典
+
+    Returns:
+        str: 规范化后的文本
+    """
+    text = '\n'.join([question.get('content') or '', question.get('answer') or ''])
+    return _IGNORED_RE.sub('', text.lower())
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    将文本切分为相邻字符片段
+
+    Args:
+        text: 规范化后的文本
+        size: 片段长度
+
+    Returns:
+        set: 片段集合，文本短于片段长度时整段作为一个片段
+    """
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    """
+    计算两个集合的Jaccard相似度
+
+    Args:
+        a: 集合
+        b: 集合
+
+    Returns:
+        float: 相似度
+    """
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def minhash_signature(shingle_set, num_perm=NUM_PERM):
+    """
+    计算MinHash签名
+
+    使用单次哈希分桶（one permutation hashing）：每个片段只哈希一次，按哈希值分到
+    num_perm个桶中，每个桶取最小值；空桶借用其后第一个非空桶的值，
+    两个签名同一位置相同的概率近似等于两个集合的Jaccard相似度。
+
+    Args:
+        shingle_set: 片段集合
+        num_perm: 签名长度
+
+    Returns:
+        tuple: 签名
+    """
+    mins = [_MAX_HASH] * num_perm
+    for shingle in shingle_set:
+        h = zlib.crc32(shingle.encode('utf-8'))
+        position = h % num_perm
+        value = h // num_perm
+        if value < mins[position]:
+            mins[position] = value
+    filled = [i for i, value in enumerate(mins) if value != _MAX_HASH]
+    if not filled or len(filled) == num_perm:
+        return tuple(mins)
+    # 空桶按顺时针方向借用最近的非空桶，并加上距离以区分借来的值
+    signature = list(mins)
+    next_filled = filled[0] + num_perm
+    for i in range(num_perm - 1, -1, -1):
+        if mins[i] != _MAX_HASH:
+            next_filled = i
+        else:
+            signature[i] = mins[next_filled % num_perm] + (next_filled - i) * (_MAX_HASH // num_perm + 1)
+    return tuple(signature)
+
+
+def choose_bands(threshold, num_perm=NUM_PERM):
+    """
+    根据相似度阈值选择LSH的分段数和每段行数
+
+    相似度为s的两道题至少在一段中签名完全相同的概率为1-(1-s^r)^b，
+    概率曲线的转折点约为(1/b)^(1/r)。取转折点不高于阈值中最接近阈值的组合，
+    宁可多产生候选，也不漏掉相似题目，候选再按实际相似度校验。
+
+    Args:
+        threshold: 相似度阈值
+        num_perm: 签名长度
+
+    Returns:
+        tuple: (分段数, 每段行数)
+    """
+    best = (num_perm, 1)
+    best_gap = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        turning_point = (1 / bands) ** (1 / rows)
+        if turning_point > threshold:
+            continue
+        gap = threshold - turning_point
+        if best_gap is None or gap < best_gap:
+            best, best_gap = (bands, rows), gap
+    return best
+
+
+class DuplicateDetector:
+    """相似题目检测类，用MinHash签名和LSH分段找出候选，再按片段的Jaccard相似度确认
+
+    每道题只与同一LSH桶中的题目比较，不需要两两比较全部题目，
+    添加和删除题目时只更新该题所在的桶。
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE):
+        """
+        初始化检测器
+
+        Args:
+            threshold: 相似度阈值，按该阈值选择LSH分段，查询时可以使用更高的阈值
+            num_perm: 签名长度
+            shingle_size: 字符片段长度
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        # (分段序号, 分段签名哈希值) -> 题目ID集合
+        self._buckets = {}
+        # 题目ID -> (规范化文本, 各分段的桶键)
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _bucket_keys(self, text):
+        """
+        计算文本在各分段中的桶键
+
+        Args:
+            text: 规范化后的文本
+
+        Returns:
+            list: (分段序号, 分段签名哈希值)列表
+        """
+        signature = minhash_signature(shingles(text, self.shingle_size), self.num_perm)
+        rows = self.rows
+        # 只保存分段签名的哈希值，哈希碰撞只会多产生候选，候选仍会校验
+        return [(band, hash(signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def add(self, question):
+        """
+        加入一道题目，已加入的题目先移除
+
+        Args:
+            question: 题目字典
+        """
+        question_id = question.get('id')
+        if question_id is None:
+            return
+        if question_id in self._entries:
+            self.remove(question_id)
+        text = normalize_text(question)
+        keys = self._bucket_keys(text)
+        self._entries[question_id] = (text, keys)
+        for key in keys:
+            self._buckets.setdefault(key, set()).add(question_id)
+
+    def remove(self, question_id):
+        """
+        移除一道题目
+
+        Args:
+            question_id: 题目ID
+        """
+        entry = self._entries.pop(question_id, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            ids = self._buckets.get(key)
+            if ids is not None:
+                ids.discard(question_id)
+                if not ids:
+                    del self._buckets[key]
+
+    def find_similar(self, question, threshold=None):
+        """
+        查找与一道题目相似的已加入题目，可用于新增或导入前的检查
+
+        Args:
+            question: 题目字典，不需要已经加入检测器
+            threshold: 相似度阈值，默认使用检测器的阈值
+
+        Returns:
+            list: (题目ID, 相似度)列表，按相似度从高到低排列
+        """
+        threshold = self.threshold if threshold is None else threshold
+        question_id = question.get('id')
+        entry = self._entries.get(question_id)
+        if entry is not None:
+            text, keys = entry
+        else:
+            text = normalize_text(question)
+            keys = self._bucket_keys(text)
+        candidates = set()
+        for key in keys:
+            candidates |= self._buckets.get(key, set())
+        candidates.discard(question_id)
+        shingle_set = shingles(text, self.shingle_size)
+        results = []
+        for candidate in candidates:
+            other = shingles(self._entries[candidate][0], self.shingle_size)
+            if min(len(shingle_set), len(other)) < threshold * max(len(shingle_set), len(other)):
+                continue
+            score = jaccard(shingle_set, other)
+            if score >= threshold:
+                results.append((candidate, score))
+        results.sort(key=lambda item: -item[1])
+        return results
+
+    def clusters(self, threshold=None, question_ids=None):
+        """
+        找出相似题目的分组
+
+        同一个桶中的题目只与该桶中已出现的各组的代表题目校验相似度，相似的题目用并查集
+        合并为一组；大量重复题目落在同一个桶中时，比较次数与桶的大小成线性关系，
+        不需要两两比较。
+
+        Args:
+            threshold: 相似度阈值，默认使用检测器的阈值
+            question_ids: 只报告包含这些题目的分组，None表示全部
+
+        Returns:
+            list: 分组列表，每组为按ID排序的题目ID列表，至少包含两道题
+        """
+        threshold = self.threshold if threshold is None else threshold
+        entries = self._entries
+        parent = {}
+
+        def find(x):
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        checked = set()
+        for ids in self._buckets.values():
+            if len(ids) < 2:
+                continue
+            # 片段集合只在处理当前桶时缓存，避免为全部题目常驻内存
+            shingle_sets = {}
+
+            def get_shingles(question_id):
+                result = shingle_sets.get(question_id)
+                if result is None:
+                    result = shingle_sets[question_id] = shingles(entries[question_id][0], self.shingle_size)
+                return result
+
+            representatives = []
+            for question_id in sorted(ids):
+                for representative in representatives:
+                    if find(representative) == find(question_id):
+                        break
+                    pair = (representative, question_id)
+                    if pair in checked:
+                        continue
+                    checked.add(pair)
+                    a, b = get_shingles(representative), get_shingles(question_id)
+                    # 集合大小相差太多时相似度不可能达到阈值
+                    if min(len(a), len(b)) < threshold * max(len(a), len(b)):
+                        continue
+                    if jaccard(a, b) >= threshold:
+                        root = find(representative)
+                        parent[find(question_id)] = root
+                        parent.setdefault(root, root)
+                        break
+                else:
+                    representatives.append(question_id)
+
+        groups = {}
+        for question_id in parent:
+            groups.setdefault(find(question_id), []).append(question_id)
+        result = [sorted(group) for group in groups.values() if len(group) > 1]
+        if question_ids is not None:
+            wanted = set(question_ids)
+            result = [group for group in result if wanted.intersection(group)]
+        result.sort(key=lambda group: (-len(group), group[0]))
+        return result
@@ -1,8 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+import re
+from data_manager import get_data_manager
 from question_manager import QuestionManager
-from paper_generator import PaperGenerator
+from paper_generator import PaperGenerator, new_seed
 from exporter import Exporter
+from query_parser import is_structured_query
+from stratified_sampler import parse_quotas
+from usage_history import UsageHistory
+
+# 按相关度搜索时显示的题目数
+RANKED_SEARCH_LIMIT = 100
+# 边输入边搜索：停止输入多少毫秒后开始搜索，以及最多显示的题目数
+LIVE_SEARCH_DELAY = 250
+LIVE_SEARCH_LIMIT = 500
+# 知识点自动补全最多显示的条数
+TOPIC_COMPLETION_LIMIT = 50
+# 正则搜索时每插入多少道题刷新一次列表
+REGEX_REFRESH_ROWS = 200
+# 每隔多少毫秒在界面线程中处理后台线程产生的数据变更通知
+CHANGE_POLL_INTERVAL = 100
+# 增量加载期间每次最多向列表插入的题目数
+LOADING_ROWS_PER_POLL = 2000
 
 class QuizApp:
     """题库系统GUI应用"""
@@ -18,9 +37,15 @@ class QuizApp:
         self.root.title("个人题库系统")
         self.root.geometry("1000x700")
         
-        # 初始化管理器
-        self.question_manager = QuestionManager()
-        self.paper_generator = PaperGenerator()
+        # 初始化管理器，所有管理器共享同一份数据；修改在后台线程中合并写入，避免保存时界面卡顿；
+        # 题库文件在后台线程中增量读取，先显示已读到的题目
+        data_manager = get_data_manager(write_behind=True, stream_load=True)
+        # 后台线程产生的变更通知（如加载完成）先排队，由界面线程定时处理，订阅者不会在其他线程中修改缓存和界面
+        data_manager.deliver_on_thread()
+        self.question_manager = QuestionManager(data_manager)
+        # 记录每份试卷用到的题目，组卷时可以避开最近用过的题目
+        self.usage_history = UsageHistory()
+        self.paper_generator = PaperGenerator(self.question_manager, self.usage_history)
         self.exporter = Exporter()
         
         # 保存当前选中的题目ID
@@ -28,8 +53,14 @@ class QuizApp:
         # 保存当前生成的试卷和答案
         self.current_paper = None
         self.current_answers = None
+        self.current_variants = None
         # 连续添加模式标志
         self.continuous_add_mode = False
+        # 等待执行的边输入边搜索任务
+        self._live_search_job = None
+        # 增量加载期间列表显示的题库（None表示所有题库）和各题库已显示的题目数
+        self._loading_bank_id = None
+        self._loading_rows = {}
         
         # 创建标签页
         self.notebook = ttk.Notebook(root)
@@ -54,6 +85,59 @@ class QuizApp:
         
         # 加载题目数据
         self._load_questions()
+        
+        if not self._is_loading():
+            self._prepare_indexes()
+        
+        # 关闭窗口前写入尚未保存的修改
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        
+        self._poll_data_changes()
+    
+    def _is_loading(self):
+        """
+        判断题库文件是否还在后台增量加载
+        
+        Returns:
+            bool: 是否正在加载
+        """
+        return not self.question_manager.data_manager.is_loaded()
+    
+    def _prepare_indexes(self):
+        """
+        在后台建立搜索索引和相似题目检测器，搜索和添加题目时不必在界面线程中等待建立
+        """
+        self.question_manager.prepare_search()
+        self.question_manager.prepare_duplicate_check()
+    
+    def _poll_data_changes(self):
+        """
+        在界面线程中处理后台线程产生的数据变更：加载期间继续显示新读到的题目，
+        加载完成或有其他变更时刷新题库和题目列表
+        """
+        try:
+            if self.question_manager.data_manager.deliver_pending():
+                self._load_banks()
+                self._load_questions()
+                if not self._is_loading():
+                    self._prepare_indexes()
+                    self.topic_combobox_edit['values'] = self.question_manager.get_all_topics()
+            elif self._is_loading():
+                self._show_loaded_questions()
+        except Exception as e:
+            print(f"处理数据变更失败: {e}")
+        self.root.after(CHANGE_POLL_INTERVAL, self._poll_data_changes)
+    
+    def _on_close(self):
+        """
+        关闭窗口，先写入所有尚未保存的修改
+        """
+        try:
+            self.question_manager.data_manager.close()
+        except Exception as e:
+            if not messagebox.askyesno("错误", f"保存数据失败: {e}\n是否仍然退出？"):
+                return
+        self.root.destroy()
     
     def _init_question_page(self):
         """
@@ -85,7 +169,14 @@ class QuizApp:
         self.search_var = tk.StringVar()
         search_entry = ttk.Entry(filter_frame, textvariable=self.search_var, width=30)
         search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<KeyRelease>", self._on_search_input)
         ttk.Button(filter_frame, text="搜索", command=self._search_questions).pack(side=tk.LEFT, padx=5)
+        # 勾选后按相关度只显示最匹配的题目
+        self.rank_search_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="按相关度", variable=self.rank_search_var).pack(side=tk.LEFT, padx=5)
+        # 勾选后按正则表达式搜索，边扫描边显示结果
+        self.regex_search_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="正则", variable=self.regex_search_var).pack(side=tk.LEFT, padx=5)
         ttk.Button(filter_frame, text="清空", command=self._clear_search).pack(side=tk.LEFT, padx=5)
         
         # 中间列表区域
@@ -140,8 +231,8 @@ class QuizApp:
         self.topic_combobox_edit = ttk.Combobox(topic_frame, textvariable=self.edit_topic_var, width=40)
         # 显式设置为可编辑状态
         self.topic_combobox_edit.configure(state='normal')
-        # 初始加载所有知识点
-        all_topics = self.question_manager.get_all_topics()
+        # 初始加载所有知识点，增量加载期间为空，加载完成后更新
+        all_topics = [] if self._is_loading() else self.question_manager.get_all_topics()
         self.topic_combobox_edit['values'] = all_topics
         self.topic_combobox_edit.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         # 为知识点输入框添加自动完成功能
@@ -208,6 +299,29 @@ class QuizApp:
         self.question_count_var = tk.StringVar(value="10")
         ttk.Entry(param_frame, textvariable=self.question_count_var, width=10).pack(side=tk.LEFT, padx=5)
         
+        # 知识点配额，例如“OSPF:3, IP:5”，填写后按配额抽题
+        ttk.Label(param_frame, text="配额:").pack(side=tk.LEFT, padx=5)
+        self.quota_var = tk.StringVar()
+        ttk.Entry(param_frame, textvariable=self.quota_var, width=25).pack(side=tk.LEFT, padx=5)
+        
+        # 一次生成多套试卷（A卷、B卷……），以及任意两套试卷最多相同的题目数，不填表示不限制
+        ttk.Label(param_frame, text="套数:").pack(side=tk.LEFT, padx=5)
+        self.variant_count_var = tk.StringVar(value="1")
+        ttk.Entry(param_frame, textvariable=self.variant_count_var, width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(param_frame, text="相同题目上限:").pack(side=tk.LEFT, padx=5)
+        self.max_overlap_var = tk.StringVar()
+        ttk.Entry(param_frame, textvariable=self.max_overlap_var, width=5).pack(side=tk.LEFT, padx=5)
+        
+        # 随机种子，填写后相同的种子和题目生成相同的试卷，不填表示随机
+        ttk.Label(param_frame, text="种子:").pack(side=tk.LEFT, padx=5)
+        self.seed_var = tk.StringVar()
+        ttk.Entry(param_frame, textvariable=self.seed_var, width=12).pack(side=tk.LEFT, padx=5)
+        
+        # 尽量不使用最近几份试卷用过的题目，不填或0表示不避开
+        ttk.Label(param_frame, text="避开最近试卷数:").pack(side=tk.LEFT, padx=5)
+        self.avoid_papers_var = tk.StringVar()
+        ttk.Entry(param_frame, textvariable=self.avoid_papers_var, width=5).pack(side=tk.LEFT, padx=5)
+        
         ttk.Button(param_frame, text="生成试卷", command=self._generate_paper).pack(side=tk.LEFT, padx=5)
         
         # 中间显示区域
@@ -255,8 +369,9 @@ class QuizApp:
             self.paper_bank_combobox['values'] = bank_names
             if bank_names:
                 self.paper_bank_combobox.current(0)  # 默认选择第一个题库
-                # 手动触发事件，更新知识点列表
-                self._filter_paper_by_bank()
+                # 手动触发事件，更新知识点列表；增量加载期间等加载完成后再更新
+                if not self._is_loading():
+                    self._filter_paper_by_bank()
     
     def _load_questions(self, bank_id=None):
         """
@@ -269,6 +384,13 @@ class QuizApp:
         for item in self.question_tree.get_children():
             self.question_tree.delete(item)
         
+        if self._is_loading():
+            # 增量加载期间先显示已读到的题目，之后由_poll_data_changes继续显示，加载完成后重新加载
+            self._loading_bank_id = bank_id
+            self._loading_rows = {}
+            self._show_loaded_questions()
+            return
+        
         # 加载所有题库信息
         banks = self.question_manager.get_banks()
         bank_map = {bank['id']: bank['name'] for bank in banks}
@@ -298,6 +420,24 @@ class QuizApp:
         for topic in topics:
             self.topic_listbox.insert(tk.END, topic)
     
+    def _show_loaded_questions(self):
+        """
+        增量加载期间向列表追加新读到的题目，每次最多LOADING_ROWS_PER_POLL道
+        """
+        data_manager = self.question_manager.data_manager
+        remaining = LOADING_ROWS_PER_POLL
+        for bank in list(self.question_manager.get_banks()):
+            if self._loading_bank_id and bank['id'] != self._loading_bank_id:
+                continue
+            start = self._loading_rows.get(bank['id'], 0)
+            questions = data_manager.get_loaded_questions(bank['id'], start)[:remaining]
+            self._loading_rows[bank['id']] = start + len(questions)
+            for q in questions:
+                self.question_tree.insert("", tk.END, values=(q['id'], bank['name'], q['topic'], q['content']))
+            remaining -= len(questions)
+            if not remaining:
+                break
+    
     def _filter_by_bank(self, event=None):
         """
         根据题库筛选题目
@@ -389,11 +529,92 @@ class QuizApp:
         for item in self.question_tree.get_children():
             self.question_tree.delete(item)
         
-        # 搜索题目
-        questions = self.question_manager.search_questions(keyword, bank_id)
+        if keyword and self.regex_search_var.get():
+            self._search_regex(keyword, bank_id)
+            return
+        
+        # 搜索题目，使用了查询语法时按查询条件搜索
+        if is_structured_query(keyword):
+            questions = self.question_manager.query(keyword, bank_id)
+        elif keyword and self.rank_search_var.get():
+            ranked = self.question_manager.search_questions_ranked(keyword, bank_id, top_k=RANKED_SEARCH_LIMIT)
+            questions = [q for q, _ in ranked]
+        else:
+            questions = self.question_manager.search_questions(keyword, bank_id)
         for q in questions:
             self.question_tree.insert("", tk.END, values=(q['id'], q['topic'], q['content']))
     
+    def _search_regex(self, pattern, bank_id):
+        """
+        按正则表达式搜索题目，扫描过程中陆续显示已找到的题目
+        
+        Args:
+            pattern: 正则表达式
+            bank_id: 题库ID，None表示所有题库
+        """
+        try:
+            for count, q in enumerate(self.question_manager.search_regex(pattern, bank_id), 1):
+                self.question_tree.insert("", tk.END, values=(q['id'], q['topic'], q['content']))
+                if count == 1 or count % REGEX_REFRESH_ROWS == 0:
+                    self.root.update_idletasks()
+        except re.error as e:
+            messagebox.showerror("错误", f"正则表达式错误: {e}")
+    
+    def _on_search_input(self, event=None):
+        """
+        搜索框输入时延迟搜索，连续输入只在停顿后搜索一次
+        
+        Args:
+            event: 键盘事件
+        """
+        if self._live_search_job is not None:
+            self.root.after_cancel(self._live_search_job)
+        self._live_search_job = self.root.after(LIVE_SEARCH_DELAY, self._live_search)
+    
+    def _live_search(self):
+        """
+        边输入边搜索，在上一次输入的结果中继续筛选，只显示前LIVE_SEARCH_LIMIT道题
+        """
+        self._live_search_job = None
+        keyword = self.search_var.get()
+        if not keyword:
+            self._filter_by_bank()
+            return
+        if self.regex_search_var.get():
+            # 输入过程中的表达式往往不完整，正则搜索只在点击搜索时执行
+            return
+        selected_bank = self.bank_var.get()
+        
+        # 找到选中题库的ID
+        bank_id = None
+        if selected_bank != '所有题库':
+            banks = self.question_manager.get_banks()
+            for bank in banks:
+                if bank['name'] == selected_bank:
+                    bank_id = bank['id']
+                    break
+        
+        # 相关度排序和查询语法需要搜索索引，索引还在后台建立时不在输入过程中等待：
+        # 相关度排序先显示普通搜索的结果，查询语法只在点击搜索时执行
+        search_ready = self.question_manager.search_ready(bank_id)
+        if is_structured_query(keyword):
+            if not search_ready:
+                return
+        elif self.rank_search_var.get() and search_ready:
+            self._search_questions()
+            return
+        
+        # 清空列表
+        for item in self.question_tree.get_children():
+            self.question_tree.delete(item)
+        
+        if is_structured_query(keyword):
+            questions = self.question_manager.query(keyword, bank_id)
+        else:
+            questions = self.question_manager.search_as_you_type(keyword, bank_id)
+        for q in questions[:LIVE_SEARCH_LIMIT]:
+            self.question_tree.insert("", tk.END, values=(q['id'], q['topic'], q['content']))
+    
     def _clear_search(self):
         """
         清空搜索
@@ -555,6 +776,16 @@ class QuizApp:
                 'content': content,
                 'answer': answer
             }
+            # 已有相似题目时提示用户确认；检测器还在后台建立时不检查，避免界面卡顿
+            similar = self.question_manager.find_similar_questions(question_data, wait=False)
+            if similar:
+                question, score = similar[0]
+                preview = question.get('content', '')[:50]
+                if not messagebox.askyesno(
+                    "相似题目",
+                    f"已有 {len(similar)} 道相似题目，最相似的一道（相似度 {score:.0%}）：\n{preview}\n是否仍然添加？"
+                ):
+                    return
             self.question_manager.add_question(question_data, bank_id)
             
             # 重新加载题目列表
@@ -675,11 +906,9 @@ class QuizApp:
         # 显示确认对话框
         if messagebox.askyesno("确认", f"确定要删除这 {len(selected_ids)} 道题目吗？"):
             try:
-                # 批量删除题目
-                deleted_count = 0
-                for question_id in selected_ids:
-                    self.question_manager.delete_question(question_id)
-                    deleted_count += 1
+                # 批量删除题目，只保存一次
+                self.question_manager.delete_questions(selected_ids)
+                deleted_count = len(selected_ids)
                 
                 # 重新加载题目列表
                 self._load_questions()
@@ -834,20 +1063,31 @@ class QuizApp:
                 messagebox.showerror("错误", "未找到可用的题库")
                 return
             
-            # 批量添加题目
-            added_count = 0
-            for q in questions:
-                try:
-                    question_data = {
-                        'topic': topic,
-                        'content': q['content'],
-                        'answer': q['answer']
-                    }
-                    self.question_manager.add_question(question_data, bank_id)
-                    added_count += 1
-                except Exception as e:
-                    messagebox.showerror("错误", f"添加题目失败: {e}")
-                    continue
+            # 批量添加题目，只保存一次，失败时全部回滚
+            question_list = [
+                {
+                    'topic': topic,
+                    'content': q['content'],
+                    'answer': q['answer']
+                }
+                for q in questions
+            ]
+            # 与已有题目相似的题目由用户决定是否跳过；检测器还在后台建立时不检查
+            duplicates = [q for q in question_list if self.question_manager.find_similar_questions(q, wait=False)]
+            if duplicates and messagebox.askyesno(
+                "相似题目",
+                f"其中 {len(duplicates)} 道题目与已有题目相似，是否跳过这些题目？"
+            ):
+                duplicate_ids = {id(q) for q in duplicates}
+                question_list = [q for q in question_list if id(q) not in duplicate_ids]
+                if not question_list:
+                    messagebox.showinfo("提示", "没有需要添加的题目")
+                    return
+            try:
+                added_count = len(self.question_manager.add_questions(question_list, bank_id))
+            except Exception as e:
+                messagebox.showerror("错误", f"添加题目失败: {e}")
+                return
             
             # 重新加载题目列表
             self._load_questions()
@@ -936,16 +1176,10 @@ class QuizApp:
             event: 键盘事件
         """
         # 获取当前输入的文本
-        current_input = self.edit_topic_var.get().lower()
+        current_input = self.edit_topic_var.get()
         
-        # 获取所有知识点
-        all_topics = self.question_manager.get_all_topics()
-        
-        # 筛选匹配的知识点
-        if current_input:
-            matched_topics = [topic for topic in all_topics if current_input in topic.lower()]
-        else:
-            matched_topics = all_topics
+        # 匹配的知识点，以输入开头的在前，常用的在前
+        matched_topics = self.question_manager.complete_topics(current_input, TOPIC_COMPLETION_LIMIT)
         
         # 更新Combobox的下拉列表
         self.topic_combobox_edit['values'] = matched_topics
@@ -993,67 +1227,88 @@ class QuizApp:
             return
         
         try:
-            # 获取指定题库的题目
-            questions = self.question_manager.get_all_questions(selected_bank_id)
-            
-            # 根据知识点筛选题目
-            if selected_topics:
-                filtered_questions = []
-                for q in questions:
-                    if q.get('topic') in selected_topics:
-                        filtered_questions.append(q)
-                questions = filtered_questions
+            variant_count = int(self.variant_count_var.get())
+            overlap_text = self.max_overlap_var.get().strip()
+            max_overlap = int(overlap_text) if overlap_text else None
+            if variant_count < 1 or (max_overlap is not None and max_overlap < 0):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的套数和相同题目上限")
+            return
+        
+        try:
+            seed_text = self.seed_var.get().strip()
+            seed = int(seed_text) if seed_text else new_seed()
+        except ValueError:
+            messagebox.showerror("错误", "随机种子应为整数")
+            return
+        
+        try:
+            avoid_text = self.avoid_papers_var.get().strip()
+            avoid_papers = int(avoid_text) if avoid_text else 0
+            if avoid_papers < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("错误", "请输入有效的避开试卷数")
+            return
+        # 填写种子是为了重新生成相同的试卷，此时不避开最近的题目（其中包括原试卷的题目）
+        avoid = None if seed_text else self.usage_history.recent(papers=avoid_papers)
+        
+        try:
+            quota_text = self.quota_var.get().strip()
+            # 按配额抽题时不使用选中的知识点
+            quotas = parse_quotas(quota_text) if quota_text else None
+            if variant_count > 1:
+                variants = self.paper_generator.generate_papers(
+                    variant_count, selected_topics, question_count, selected_bank_id, quotas, max_overlap, seed,
+                    avoid=avoid)
+            elif quotas:
+                paper_questions, answers, shortfalls = self.paper_generator.generate_paper_by_quota(
+                    quotas, question_count, selected_bank_id, seed, avoid)
+                variants = [{'variant': None, 'questions': paper_questions, 'answers': answers, 'shortfalls': shortfalls}]
+            else:
+                paper_questions, answers = self.paper_generator.generate_paper(
+                    selected_topics, question_count, selected_bank_id, seed, avoid)
+                variants = [{'variant': None, 'questions': paper_questions, 'answers': answers, 'shortfalls': {}}]
             
-            if not questions:
+            if not any(variant['questions'] for variant in variants):
                 messagebox.showinfo("提示", "未找到符合条件的题目")
                 return
             
-            # 随机打乱题目顺序
-            import random
-            random.shuffle(questions)
-            
-            # 截取指定数量的题目
-            actual_count = min(question_count, len(questions))
-            selected_questions = questions[:actual_count]
+            self.current_paper = variants[0]['questions']
+            self.current_answers = variants[0]['answers']
+            # 多套试卷时分别导出
+            self.current_variants = variants if variant_count > 1 else None
             
-            # 生成试卷题目列表（不含答案）
-            paper_questions = []
-            for i, q in enumerate(selected_questions, 1):
-                paper_question = {
-                    'id': i,
-                    'content': q['content'],
-                    'topic': q['topic']
-                }
-                paper_questions.append(paper_question)
-            
-            # 生成答案列表
-            answers = []
-            for i, q in enumerate(selected_questions, 1):
-                answer = {
-                    'id': i,
-                    'content': q['content'],
-                    'answer': q['answer'],
-                    'topic': q['topic']
-                }
-                answers.append(answer)
-            
-            self.current_paper = paper_questions
-            self.current_answers = answers
-            
-            # 显示试卷
             self.paper_text.delete(1.0, tk.END)
-            for q in paper_questions:
-                self.paper_text.insert(tk.END, f"{q['id']}. {q['topic']}\n")
-                self.paper_text.insert(tk.END, f"{q['content']}\n\n")
-            
-            # 显示答案
             self.answer_text.delete(1.0, tk.END)
-            for ans in answers:
-                self.answer_text.insert(tk.END, f"{ans['id']}. {ans['topic']}\n")
-                self.answer_text.insert(tk.END, f"题目: {ans['content']}\n")
-                self.answer_text.insert(tk.END, f"答案: {ans['answer']}\n\n")
+            for variant in variants:
+                if variant['variant']:
+                    self.paper_text.insert(tk.END, f"======== {variant['variant']}卷 ========\n\n")
+                    self.answer_text.insert(tk.END, f"======== {variant['variant']}卷 ========\n\n")
+                
+                # 显示试卷
+                for q in variant['questions']:
+                    self.paper_text.insert(tk.END, f"{q['id']}. {q['topic']}\n")
+                    self.paper_text.insert(tk.END, f"{q['content']}\n\n")
+                
+                # 显示答案
+                for ans in variant['answers']:
+                    self.answer_text.insert(tk.END, f"{ans['id']}. {ans['topic']}\n")
+                    self.answer_text.insert(tk.END, f"题目: {ans['content']}\n")
+                    self.answer_text.insert(tk.END, f"答案: {ans['answer']}\n\n")
             
-            messagebox.showinfo("成功", "试卷生成成功")
+            lines = []
+            for variant in variants:
+                prefix = f"{variant['variant']}卷 " if variant['variant'] else ""
+                for topic, (count, available) in variant['shortfalls'].items():
+                    lines.append(f"{prefix}{topic or '所选题目'}: 需要{count}道，只选出{available}道")
+            if lines:
+                messagebox.showwarning("题目不足", "以下题目不足（或受相同题目上限限制），已尽量选用：\n" + "\n".join(lines)
+                                       + f"\n\n随机种子: {seed}")
+            else:
+                message = f"已生成{variant_count}套试卷" if variant_count > 1 else "试卷生成成功"
+                messagebox.showinfo("成功", f"{message}\n随机种子: {seed}，填入\"种子\"可重新生成相同的试卷")
         except Exception as e:
             messagebox.showerror("错误", f"生成试卷失败: {e}")
     
@@ -1066,8 +1321,13 @@ class QuizApp:
             return
         
         try:
-            self.exporter.export_paper_to_word(self.current_paper)
-            messagebox.showinfo("成功", "试卷导出为Word成功")
+            if self.current_variants:
+                for variant in self.current_variants:
+                    self.exporter.export_paper_to_word(variant['questions'], f"试卷{variant['variant']}.docx")
+                messagebox.showinfo("成功", f"{len(self.current_variants)}套试卷导出为Word成功")
+            else:
+                self.exporter.export_paper_to_word(self.current_paper)
+                messagebox.showinfo("成功", "试卷导出为Word成功")
         except Exception as e:
             messagebox.showerror("错误", f"导出失败: {e}")
     
@@ -1080,8 +1340,13 @@ class QuizApp:
             return
         
         try:
-            self.exporter.export_paper_to_pdf(self.current_paper)
-            messagebox.showinfo("成功", "试卷导出为PDF成功")
+            if self.current_variants:
+                for variant in self.current_variants:
+                    self.exporter.export_paper_to_pdf(variant['questions'], f"试卷{variant['variant']}.pdf")
+                messagebox.showinfo("成功", f"{len(self.current_variants)}套试卷导出为PDF成功")
+            else:
+                self.exporter.export_paper_to_pdf(self.current_paper)
+                messagebox.showinfo("成功", "试卷导出为PDF成功")
         except Exception as e:
             messagebox.showerror("错误", f"导出失败: {e}")
     
@@ -1094,8 +1359,13 @@ class QuizApp:
             return
         
         try:
-            self.exporter.export_answers_to_word(self.current_answers)
-            messagebox.showinfo("成功", "答案导出为Word成功")
+            if self.current_variants:
+                for variant in self.current_variants:
+                    self.exporter.export_answers_to_word(variant['answers'], f"答案{variant['variant']}.docx")
+                messagebox.showinfo("成功", f"{len(self.current_variants)}套答案导出为Word成功")
+            else:
+                self.exporter.export_answers_to_word(self.current_answers)
+                messagebox.showinfo("成功", "答案导出为Word成功")
         except Exception as e:
             messagebox.showerror("错误", f"导出失败: {e}")
     
@@ -1108,7 +1378,12 @@ class QuizApp:
             return
         
         try:
-            self.exporter.export_answers_to_pdf(self.current_answers)
-            messagebox.showinfo("成功", "答案导出为PDF成功")
+            if self.current_variants:
+                for variant in self.current_variants:
+                    self.exporter.export_answers_to_pdf(variant['answers'], f"答案{variant['variant']}.pdf")
+                messagebox.showinfo("成功", f"{len(self.current_variants)}套答案导出为PDF成功")
+            else:
+                self.exporter.export_answers_to_pdf(self.current_answers)
+                messagebox.showinfo("成功", "答案导出为PDF成功")
         except Exception as e:
             messagebox.showerror("错误", f"导出失败: {e}")
@@ -0,0 +1,325 @@
+import json
+import os
+
+# 重放期间被删除或移走的题目在题库列表中的占位，重放结束后统一移除
+_REMOVED = object()
+
+
+class _ReplayIndex:
+    """重放日志时使用的题库和题目位置索引
+
+    在重放开始时建立一次，之后随每条记录更新，查找题目不必遍历所有题库。
+    删除和移走的题目先留下占位，位置保持不变，重放结束后由finish统一移除。
+    """
+
+    def __init__(self, data):
+        """
+        为数据建立索引
+
+        Args:
+            data: 题目数据字典
+        """
+        self.data = data
+        # 题库ID -> 题库字典
+        self.banks = {}
+        # 题目ID -> [(题库字典, 题目位置)]，通常只有一项，快照中有重复ID时按出现顺序排列
+        self.locations = {}
+        # 含有占位的题库，id(题库字典) -> 题库字典
+        self._dirty = {}
+        for bank in data.setdefault('banks', []):
+            self.banks.setdefault(bank['id'], bank)
+            self._index_questions(bank)
+
+    def _index_questions(self, bank):
+        """
+        索引题库中的所有题目
+
+        Args:
+            bank: 题库字典
+        """
+        for i, question in enumerate(bank.get('questions', [])):
+            self.locations.setdefault(question.get('id'), []).append((bank, i))
+
+    def _unindex_questions(self, bank):
+        """
+        移除题库中所有题目的索引
+
+        Args:
+            bank: 题库字典
+        """
+        for question in bank.get('questions', []):
+            if question is _REMOVED:
+                continue
+            question_id = question.get('id')
+            entries = [entry for entry in self.locations.get(question_id, ()) if entry[0] is not bank]
+            if entries:
+                self.locations[question_id] = entries
+            else:
+                self.locations.pop(question_id, None)
+
+    def _entries(self, question_id):
+        """
+        获取题目的所有位置，按题库顺序和题目位置排列，与逐个遍历题库时遇到的顺序一致
+
+        Args:
+            question_id: 题目ID
+
+        Returns:
+            list: [(题库字典, 题目位置)]，题目不存在时为空列表
+        """
+        entries = self.locations.get(question_id, [])
+        if len(entries) > 1:
+            order = {id(bank): i for i, bank in enumerate(self.data['banks'])}
+            entries.sort(key=lambda entry: (order[id(entry[0])], entry[1]))
+        return entries
+
+    def _append(self, bank, question):
+        """
+        将题目加入题库末尾并记录位置
+
+        Args:
+            bank: 题库字典
+            question: 题目字典
+        """
+        questions = bank.setdefault('questions', [])
+        questions.append(question)
+        self.locations.setdefault(question.get('id'), []).append((bank, len(questions) - 1))
+
+    def _remove(self, bank, position):
+        """
+        将题目替换为占位
+
+        Args:
+            bank: 题库字典
+            position: 题目位置
+
+        Returns:
+            dict: 被移除的题目
+        """
+        question = bank['questions'][position]
+        bank['questions'][position] = _REMOVED
+        self._dirty[id(bank)] = bank
+        return question
+
+    def apply(self, record):
+        """
+        将一条变更记录应用到数据上
+
+        Args:
+            record: 变更记录字典
+        """
+        op = record.get('op')
+        data = self.data
+        banks = data['banks']
+
+        if op == 'add_bank':
+            bank = record['bank']
+            data['next_bank_id'] = max(data.get('next_bank_id', 1), bank['id'] + 1)
+            if bank['id'] not in self.banks:
+                bank = {'id': bank['id'], 'name': bank['name'], 'questions': []}
+                banks.append(bank)
+                self.banks[bank['id']] = bank
+        elif op == 'rename_bank':
+            bank = self.banks.get(record['bank_id'])
+            if bank is not None:
+                bank['name'] = record['name']
+        elif op == 'delete_bank':
+            for bank in banks:
+                if bank['id'] == record['bank_id']:
+                    self._unindex_questions(bank)
+            data['banks'] = [b for b in banks if b['id'] != record['bank_id']]
+            self.banks.pop(record['bank_id'], None)
+            for bank in data['banks']:
+                self.banks.setdefault(bank['id'], bank)
+        elif op == 'set_questions':
+            bank = self.banks.get(record['bank_id'])
+            if bank is not None:
+                self._unindex_questions(bank)
+                bank['questions'] = record['questions']
+                self._index_questions(bank)
+        elif op == 'add_question':
+            question = record['question']
+            data['next_question_id'] = max(data.get('next_question_id', 1), question['id'] + 1)
+            # 题目已在任意题库中（快照已包含这条记录，之后可能还被移动过）时不再添加
+            if question['id'] in self.locations:
+                return
+            bank = self.banks.get(record['bank_id'])
+            if bank is not None:
+                self._append(bank, question)
+        elif op == 'update_question':
+            question = record['question']
+            entries = self._entries(question['id'])
+            if entries:
+                bank, position = entries[0]
+                bank['questions'][position] = question
+        elif op == 'move_question':
+            target = self.banks.get(record['bank_id'])
+            if target is None:
+                return
+            question_id = record['question_id']
+            # 移除其他题库中的所有副本，目标题库中还没有该题时才加入
+            moved = None
+            source = None
+            kept = []
+            for bank, position in self._entries(question_id):
+                if bank is target:
+                    kept.append((bank, position))
+                    continue
+                question = self._remove(bank, position)
+                # 与逐个遍历题库时一致，保留最后一个题库中位置最前的副本
+                if bank is not source:
+                    moved, source = question, bank
+            if kept:
+                self.locations[question_id] = kept
+            else:
+                self.locations.pop(question_id, None)
+                if moved is not None:
+                    self._append(target, moved)
+        elif op == 'delete_question':
+            entries = self._entries(record['question_id'])
+            if entries:
+                bank, position = entries.pop(0)
+                self._remove(bank, position)
+                if not entries:
+                    del self.locations[record['question_id']]
+
+    def finish(self):
+        """
+        移除重放期间留下的占位
+        """
+        for bank in self._dirty.values():
+            questions = bank.get('questions')
+            if questions is not None:
+                questions[:] = [q for q in questions if q is not _REMOVED]
+        self._dirty = {}
+
+
+def apply_record(data, record):
+    """
+    将一条变更记录应用到数据上
+
+    记录中保存的都是变更后的完整值，重复应用同一条记录结果不变，
+    因此在快照之上重放已包含在快照中的记录也是安全的。
+    逐条调用时每次都要建立索引，重放整个日志时应使用MutationJournal.replay。
+
+    Args:
+        data: 题目数据字典
+        record: 变更记录字典
+    """
+    index = _ReplayIndex(data)
+    index.apply(record)
+    index.finish()
+
+
+class MutationJournal:
+    """变更日志类，负责以追加方式记录数据变更，并配合快照进行压缩"""
+
+    def __init__(self, file_path, compact_threshold=1024 * 1024):
+        """
+        初始化变更日志
+
+        Args:
+            file_path: 日志文件路径
+            compact_threshold: 日志超过该字节数时需要压缩为快照
+        """
+        self.file_path = file_path
+        self.compact_threshold = compact_threshold
+        # 正在压缩的旧日志，快照写入完成后删除
+        self.rotated_path = file_path + '.compacting'
+        self._size = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+
+    def replay(self, data):
+        """
+        按顺序将日志中的记录重放到数据上
+
+        Args:
+            data: 从快照加载的题目数据字典
+
+        Returns:
+            int: 重放的记录数
+        """
+        count = 0
+        index = _ReplayIndex(data)
+        for path in (self.rotated_path, self.file_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时最后一条记录可能只写了一半，忽略之后的内容
+                        break
+                    index.apply(record)
+                    count += 1
+        index.finish()
+        return count
+
+    def append(self, record):
+        """
+        追加一条变更记录
+
+        Args:
+            record: 变更记录字典
+        """
+        self.append_many([record])
+
+    def append_many(self, records):
+        """
+        一次写入追加多条变更记录
+
+        Args:
+            records: 变更记录列表
+        """
+        text = ''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for record in records
+        )
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            f.write(text)
+        self._size += len(text.encode('utf-8'))
+
+    def needs_compaction(self):
+        """
+        判断日志是否超过压缩阈值
+
+        Returns:
+            bool: 是否需要压缩
+        """
+        return self._size >= self.compact_threshold
+
+    def has_rotated(self):
+        """
+        判断是否存在未完成压缩的旧日志
+
+        Returns:
+            bool: 是否存在旧日志
+        """
+        return os.path.exists(self.rotated_path)
+
+    def rotate(self):
+        """
+        将当前日志转为待压缩的旧日志，之后的记录写入新日志
+        """
+        if os.path.exists(self.file_path):
+            os.replace(self.file_path, self.rotated_path)
+        self._size = 0
+
+    def finish_rotation(self):
+        """
+        快照写入完成后删除旧日志
+        """
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def clear(self):
+        """
+        删除所有日志，用于快照已包含全部记录的情况
+        """
+        self.finish_rotation()
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        self._size = 0
@@ -1,7 +1,11 @@
+import multiprocessing
 import tkinter as tk
 from gui import QuizApp
 
 if __name__ == "__main__":
+    # 打包为exe后，正则搜索的子进程需要此调用才能正常启动
+    multiprocessing.freeze_support()
+    
     # 创建主窗口
     root = tk.Tk()
     
@@ -0,0 +1,200 @@
+import base64
+import heapq
+import json
+from bisect import bisect_left, bisect_right, insort
+
+# 支持的排序方式：题目ID；知识点（同一知识点按题目ID）；题库（同一题库按题目ID）
+SORT_ORDERS = ('id', 'topic', 'bank')
+# 默认每页题目数
+DEFAULT_PAGE_SIZE = 50
+
+
+def sort_key(order, question, bank_id):
+    """
+    计算题目在指定排序方式下的排序键，排序键的最后一项总是题目ID，保证顺序唯一
+
+    Args:
+        order: 排序方式
+        question: 题目字典
+        bank_id: 题目所在题库ID
+
+    Returns:
+        tuple: 排序键
+    """
+    question_id = question.get('id')
+    if order == 'id':
+        return (question_id,)
+    if order == 'topic':
+        topic = question.get('topic')
+        return (topic if isinstance(topic, str) else '', question_id)
+    return (bank_id, question_id)
+
+
+def encode_cursor(order, key):
+    """
+    将上一页最后一道题的排序键编码为游标
+
+    Args:
+        order: 排序方式
+        key: 排序键
+
+    Returns:
+        str: 游标
+    """
+    payload = json.dumps([order, list(key)], ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, order):
+    """
+    解码游标
+
+    Args:
+        cursor: encode_cursor生成的游标
+        order: 当前的排序方式，必须与生成游标时相同
+
+    Returns:
+        tuple: 排序键
+
+    Raises:
+        ValueError: 游标无效或排序方式不一致
+    """
+    try:
+        cursor_order, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"无效的分页游标: {e}")
+    if cursor_order != order or not isinstance(key, list) or not key:
+        raise ValueError("无效的分页游标")
+    return tuple(key)
+
+
+class _Top:
+    """比任何值都大的哨兵，用于定位以某个前缀开头的排序键的结束位置"""
+
+    def __eq__(self, other):
+        return isinstance(other, _Top)
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return not isinstance(other, _Top)
+
+
+_TOP = _Top()
+
+
+class OrderedIndex:
+    """有序索引类，按排序键保存题目，支持从任意排序键开始按页读取
+
+    排序键保存在有序列表中，用二分查找定位游标，读取一页只需要查看这一页的题目。
+    """
+
+    def __init__(self):
+        """
+        初始化空索引
+        """
+        # 有序的排序键列表
+        self._keys = []
+        # 题目ID -> 排序键
+        self._key_by_id = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def build(self, keys):
+        """
+        一次性建立索引
+
+        Args:
+            keys: 排序键序列，每个键的最后一项为题目ID
+        """
+        self._keys = sorted(keys)
+        self._key_by_id = {key[-1]: key for key in self._keys}
+
+    def add(self, key):
+        """
+        加入一道题目，已存在的题目先移除
+
+        Args:
+            key: 排序键，最后一项为题目ID
+        """
+        self.remove(key[-1])
+        insort(self._keys, key)
+        self._key_by_id[key[-1]] = key
+
+    def remove(self, question_id):
+        """
+        移除一道题目
+
+        Args:
+            question_id: 题目ID
+        """
+        key = self._key_by_id.pop(question_id, None)
+        if key is not None:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def key_of(self, question_id):
+        """
+        获取题目的排序键
+
+        Args:
+            question_id: 题目ID
+
+        Returns:
+            tuple: 排序键，题目不在索引中时返回None
+        """
+        return self._key_by_id.get(question_id)
+
+    def prefix_ids(self, prefix):
+        """
+        获取排序键以指定前缀开头的题目ID，这些题目在索引中是连续的
+
+        Args:
+            prefix: 排序键前缀
+
+        Returns:
+            set: 题目ID集合
+        """
+        keys = self._keys
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + (_TOP,), start)
+        return {key[-1] for key in keys[start:end]}
+
+    def page(self, after, limit, question_ids=None, prefix=None):
+        """
+        读取排序键大于after的前limit道题
+
+        Args:
+            after: 上一页最后一道题的排序键，None表示从头开始
+            limit: 最多读取的题目数
+            question_ids: 只读取这些题目，None表示全部
+            prefix: 只读取以该前缀开头的排序键，这些键是连续的，直接定位
+
+        Returns:
+            list: 排序键列表
+        """
+        keys = self._keys
+        start = 0 if after is None else bisect_right(keys, after)
+        if prefix is not None:
+            start = max(start, bisect_left(keys, prefix))
+            end = bisect_left(keys, prefix + (_TOP,), start)
+            return keys[start:min(end, start + limit)]
+        if question_ids is None:
+            return keys[start:start + limit]
+        # 匹配的题目较多时沿索引顺序挑选，平均查看limit * 剩余题目数 / 匹配数个键就能凑满一页；
+        # 较少时直接从匹配的题目中选出最小的limit个
+        remaining = len(keys) - start
+        if len(question_ids) ** 2 <= limit * remaining:
+            key_by_id = self._key_by_id
+            candidates = (key_by_id[question_id] for question_id in question_ids if question_id in key_by_id)
+            if after is not None:
+                candidates = (key for key in candidates if key > after)
+            return heapq.nsmallest(limit, candidates)
+        result = []
+        for i in range(start, len(keys)):
+            if keys[i][-1] in question_ids:
+                result.append(keys[i])
+                if len(result) >= limit:
+                    break
+        return result
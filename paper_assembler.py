@@ -0,0 +1,593 @@
+import math
+import random
+import re
+from collections import Counter
+from stratified_sampler import iter_pools_random
+
+# 题型及其名称：题目没有单独的题型字段，按答案推断
+QUESTION_KINDS = {'choice': '选择题', 'short': '简答题'}
+# 选择题（含判断题）的答案以大写选项字母开头，字母之间可以用逗号或顿号分隔，之后是结尾或非字母数字，
+# 例如“D”、“BCD”、“A、C”、“A正确”、“B .tracert”；“each”、“Bad”等英文单词不算
+_CHOICE_ANSWER_RE = re.compile(r'\s*[A-H](?:\s*[,，、]?\s*[A-H])*(?![A-Za-z0-9])')
+# 组卷要求中的字段
+BLUEPRINT_FIELDS = ('question_count', 'bank_id', 'topics', 'kinds', 'length', 'include', 'exclude')
+# 贪心选题后最多修复的轮数，无法满足时每轮都要查看所有候选题目
+REPAIR_ROUNDS = 2
+
+
+class AssemblyError(ValueError):
+    """组卷要求无法满足
+
+    problems为问题列表，每一项说明一条无法满足的要求以及需要和可用的题目数。
+    """
+
+    def __init__(self, problems):
+        super().__init__('；'.join(problems))
+        self.problems = problems
+
+
+def question_kind(question):
+    """
+    获取题目的题型：答案以大写选项字母开头的为选择题，其余为简答题
+
+    Args:
+        question: 题目字典
+
+    Returns:
+        str: QUESTION_KINDS中的题型
+    """
+    return 'choice' if _CHOICE_ANSWER_RE.match(question.get('answer') or '') else 'short'
+
+
+def question_length(question):
+    """
+    获取题目的长度（题目内容的字数），用于限制试卷的总长度
+
+    Args:
+        question: 题目字典
+
+    Returns:
+        int: 字数
+    """
+    return len(question.get('content') or '')
+
+
+def _parse_range(name, value):
+    """
+    解析数量要求：整数表示恰好这么多，[下限, 上限]表示范围，None表示不限
+
+    Args:
+        name: 要求的名称，用于错误信息
+        value: 整数、None或两项的列表/元组
+
+    Returns:
+        tuple: (下限, 上限)，上限可能为math.inf
+
+    Raises:
+        ValueError: 格式错误
+    """
+    if value is None:
+        return 0, math.inf
+    if isinstance(value, int) and not isinstance(value, bool):
+        low, high = value, value
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        low, high = value
+        low = 0 if low is None else low
+        high = math.inf if high is None else high
+    else:
+        raise ValueError(f"无效的组卷要求: {name}={value!r}，应为整数或[下限, 上限]")
+    for bound in (low, high):
+        if isinstance(bound, bool) or not isinstance(bound, (int, float)) or bound < 0 \
+                or (bound != math.inf and bound != int(bound)):
+            raise ValueError(f"无效的组卷要求: {name}={value!r}，数量应为非负整数")
+    if low > high:
+        raise ValueError(f"无效的组卷要求: {name}={value!r}，下限大于上限")
+    return int(low), high
+
+
+def parse_blueprint(blueprint):
+    """
+    检查并规范化组卷要求
+
+    组卷要求是一个字典，例如::
+
+        {
+            'question_count': 20,                  # 总题数
+            'bank_id': 1,                          # 题库ID，省略表示所有题库
+            'topics': {'OSPF': 5, 'IP': [3, 6]},   # 各知识点的题数，省略表示不限知识点
+            'kinds': {'choice': [15, None], 'short': 2},   # 各题型的题数
+            'length': [None, 5000],                # 题目内容的总字数
+            'include': [12, 35],                   # 必须包含的题目ID
+            'exclude': [7],                        # 不能使用的题目ID
+        }
+
+    数量可以是整数（恰好这么多）或[下限, 上限]，None表示该侧不限。
+    指定了topics时只从这些知识点中选题。
+
+    Args:
+        blueprint: 组卷要求字典
+
+    Returns:
+        dict: 规范化后的组卷要求，数量均为(下限, 上限)
+
+    Raises:
+        ValueError: 格式错误
+    """
+    unknown = set(blueprint) - set(BLUEPRINT_FIELDS)
+    if unknown:
+        raise ValueError(f"无效的组卷要求: 未知字段{', '.join(sorted(map(str, unknown)))}")
+    question_count = blueprint.get('question_count')
+    if isinstance(question_count, bool) or not isinstance(question_count, int) or question_count < 0:
+        raise ValueError(f"无效的组卷要求: question_count={question_count!r}，应为非负整数")
+    topics = blueprint.get('topics') or None
+    if topics is not None:
+        topics = {topic: _parse_range(f"topics[{topic}]", value) for topic, value in topics.items()}
+    kinds = {}
+    for kind, value in (blueprint.get('kinds') or {}).items():
+        if kind not in QUESTION_KINDS:
+            raise ValueError(f"无效的组卷要求: 未知题型{kind}，应为{'、'.join(QUESTION_KINDS)}之一")
+        kinds[kind] = _parse_range(f"kinds[{kind}]", value)
+    include = list(dict.fromkeys(blueprint.get('include') or ()))
+    return {
+        'question_count': question_count,
+        'bank_id': blueprint.get('bank_id'),
+        'topics': topics,
+        'kinds': kinds,
+        'length': _parse_range('length', blueprint.get('length')),
+        'include': include,
+        'exclude': set(blueprint.get('exclude') or ()),
+    }
+
+
+class PaperAssembler:
+    """按组卷要求选题，先贪心选题再通过替换修复未满足的要求
+
+    候选题目来自题目管理器中按知识点建立的题目池，按随机顺序逐个取出，
+    只查看选题过程中实际用到的题目，题库很大时耗时也主要取决于试卷的题数。
+    每次选题时检查剩余的题位是否还够满足各知识点和题型的下限，避免贪心选题走进死路；
+    仍有题数、题型或总字数不满足时，用其他候选题目替换已选的题目。
+    无法满足时抛出AssemblyError，逐条说明不满足的要求。
+    """
+
+    def __init__(self, question_manager, blueprint, rng=random):
+        """
+        初始化一次组卷
+
+        Args:
+            question_manager: 题目管理器
+            blueprint: 组卷要求，格式见parse_blueprint
+            rng: 随机数生成器，需要提供randrange和shuffle方法
+
+        Raises:
+            ValueError: 组卷要求格式错误
+        """
+        self.question_manager = question_manager
+        self.blueprint = parse_blueprint(blueprint)
+        self.rng = rng
+        self.question_count = self.blueprint['question_count']
+        self.topic_ranges = self.blueprint['topics']
+        self.kind_ranges = {kind: self.blueprint['kinds'].get(kind, (0, math.inf)) for kind in QUESTION_KINDS}
+        self.length_range = self.blueprint['length']
+        self.excluded = self.blueprint['exclude']
+        self.required = set(self.blueprint['include'])
+        # 题目ID -> 题目，按选入的顺序
+        self.selected = {}
+        self.topic_counts = Counter()
+        self.kind_counts = Counter()
+        self.total_length = 0
+        # 各知识点和各题型距离下限还差的题数之和
+        self.topic_deficit = sum(low for low, _ in self.topic_ranges.values()) if self.topic_ranges else 0
+        self.kind_deficit = sum(low for low, _ in self.kind_ranges.values())
+        # 题目ID -> 题型，每道题只推断一次
+        self._kinds = {}
+        # 题目ID -> 已读取的候选题目，修复时再次查看候选题目不必重新读取
+        self._questions = {}
+
+    def assemble(self):
+        """
+        按组卷要求选题
+
+        Returns:
+            list: 题目列表，指定了知识点时按知识点的顺序分组排列
+
+        Raises:
+            AssemblyError: 组卷要求无法满足
+        """
+        problems = self._check_required() + self._check_totals()
+        if problems:
+            raise AssemblyError(problems)
+        for question_id in self.blueprint['include']:
+            self._add(self.question_manager.get_question(question_id)[0])
+        problems = self._check_selected_limits()
+        if problems:
+            raise AssemblyError(problems)
+
+        if self.topic_ranges:
+            # 先满足各知识点的下限
+            for topic, (low, _) in self.topic_ranges.items():
+                if self.topic_counts[topic] >= low:
+                    continue
+                for question in self._candidates([topic]):
+                    if self.topic_counts[topic] >= low:
+                        break
+                    if self._fits(question):
+                        self._add(question)
+        # 再从所有候选题目中补足总题数
+        self._fill()
+        # 替换一道题可能使另一项要求变得可以满足，因此修复后再补足题数，有进展时再修复一轮
+        for _ in range(REPAIR_ROUNDS):
+            if self._satisfied():
+                break
+            shortage = self._shortage()
+            self._repair_count()
+            self._repair_kinds()
+            self._repair_length()
+            self._fill()
+            if self._shortage() >= shortage:
+                break
+
+        problems = self._report()
+        if problems:
+            raise AssemblyError(problems)
+        selected = list(self.selected.values())
+        if self.topic_ranges:
+            order = {topic: i for i, topic in enumerate(self.topic_ranges)}
+            selected.sort(key=lambda q: order[q.get('topic')])
+        return selected
+
+    def _kind(self, question):
+        question_id = question.get('id')
+        kind = self._kinds.get(question_id)
+        if kind is None:
+            kind = self._kinds[question_id] = question_kind(question)
+        return kind
+
+    def _candidates(self, topics=None):
+        """
+        按随机顺序逐个产出可用的候选题目（未选入、未排除、属于题库和指定的知识点）
+
+        Args:
+            topics: 知识点列表，None表示组卷要求中的所有知识点（未指定知识点时为题库中的所有题目）
+
+        Yields:
+            dict: 题目
+        """
+        bank_id = self.blueprint['bank_id']
+        question_manager = self.question_manager
+        if topics is None and self.topic_ranges is None:
+            for question in iter_pools_random([question_manager.get_all_questions(bank_id)], self.rng):
+                if question.get('id') not in self.selected and question.get('id') not in self.excluded:
+                    yield question
+            return
+        if topics is None:
+            topics = list(self.topic_ranges)
+        questions = self._questions
+        for question_id in question_manager.iter_topic_question_ids_random(topics, bank_id, self.rng):
+            if question_id in self.selected or question_id in self.excluded:
+                continue
+            question = questions.get(question_id)
+            if question is None:
+                question = questions[question_id] = question_manager.get_question(question_id)[0]
+            if question is not None:
+                yield question
+
+    def _add(self, question):
+        topic, kind = question.get('topic'), self._kind(question)
+        self.selected[question.get('id')] = question
+        if self.topic_ranges and topic in self.topic_ranges and self.topic_counts[topic] < self.topic_ranges[topic][0]:
+            self.topic_deficit -= 1
+        if self.kind_counts[kind] < self.kind_ranges[kind][0]:
+            self.kind_deficit -= 1
+        self.topic_counts[topic] += 1
+        self.kind_counts[kind] += 1
+        self.total_length += question_length(question)
+
+    def _remove(self, question):
+        topic, kind = question.get('topic'), self._kind(question)
+        del self.selected[question.get('id')]
+        self.topic_counts[topic] -= 1
+        self.kind_counts[kind] -= 1
+        if self.topic_ranges and topic in self.topic_ranges and self.topic_counts[topic] < self.topic_ranges[topic][0]:
+            self.topic_deficit += 1
+        if self.kind_counts[kind] < self.kind_ranges[kind][0]:
+            self.kind_deficit += 1
+        self.total_length -= question_length(question)
+
+    def _fits(self, question):
+        """
+        判断选入题目后是否不超过各项上限，且剩余的题位仍够满足各知识点和题型的下限
+
+        Args:
+            question: 候选题目
+
+        Returns:
+            bool: 是否可以选入
+        """
+        if len(self.selected) >= self.question_count \
+                or self.total_length + question_length(question) > self.length_range[1]:
+            return False
+        topic, kind = question.get('topic'), self._kind(question)
+        topic_deficit = self.topic_deficit
+        if self.topic_ranges is not None:
+            low, high = self.topic_ranges.get(topic, (0, 0))
+            if self.topic_counts[topic] >= high:
+                return False
+            if self.topic_counts[topic] < low:
+                topic_deficit -= 1
+        low, high = self.kind_ranges[kind]
+        if self.kind_counts[kind] >= high:
+            return False
+        kind_deficit = self.kind_deficit - (1 if self.kind_counts[kind] < low else 0)
+        remaining = self.question_count - len(self.selected) - 1
+        return topic_deficit <= remaining and kind_deficit <= remaining
+
+    def _swappable(self, old, new):
+        """
+        判断能否用候选题目new替换已选的题目old，替换后不超过各项上限也不产生新的缺额
+
+        Args:
+            old: 已选的题目
+            new: 候选题目
+
+        Returns:
+            bool: 是否可以替换
+        """
+        if old.get('id') in self.required:
+            return False
+        old_topic, new_topic = old.get('topic'), new.get('topic')
+        if old_topic != new_topic and self.topic_ranges is not None:
+            low, high = self.topic_ranges.get(new_topic, (0, 0))
+            if self.topic_counts[new_topic] >= high or self.topic_counts[old_topic] <= self.topic_ranges[old_topic][0]:
+                return False
+        old_kind, new_kind = self._kind(old), self._kind(new)
+        if old_kind != new_kind:
+            if self.kind_counts[new_kind] >= self.kind_ranges[new_kind][1] \
+                    or self.kind_counts[old_kind] <= self.kind_ranges[old_kind][0]:
+                return False
+        return self.total_length - question_length(old) + question_length(new) <= self.length_range[1]
+
+    def _fill(self):
+        """
+        从所有候选题目中补足总题数
+        """
+        if len(self.selected) >= self.question_count:
+            return
+        for question in self._candidates():
+            if len(self.selected) >= self.question_count:
+                break
+            if self._fits(question):
+                self._add(question)
+
+    def _shortage(self):
+        """
+        获取已选的题目距离满足各项下限还差多少，用于判断修复是否有进展（上限在选题时已保证）
+
+        Returns:
+            tuple: (缺少的题数, 知识点和题型的缺额, 缺少的字数)，全为0表示满足所有要求
+        """
+        return (
+            self.question_count - len(self.selected),
+            self.topic_deficit + self.kind_deficit,
+            max(self.length_range[0] - self.total_length, 0)
+        )
+
+    def _satisfied(self):
+        """
+        判断已选的题目是否满足所有要求
+
+        Returns:
+            bool: 是否满足
+        """
+        return not any(self._shortage())
+
+    def _repair_count(self):
+        """
+        总字数的上限使题数不足时，用较短的候选题目替换已选的较长题目，腾出字数再补足题数
+        """
+        if len(self.selected) >= self.question_count or self.length_range[1] == math.inf:
+            return
+        longest = max(map(question_length, self.selected.values()), default=0)
+        for question in self._candidates():
+            if len(self.selected) >= self.question_count:
+                break
+            if self._fits(question):
+                self._add(question)
+                continue
+            length = question_length(question)
+            if length >= longest:
+                continue
+            victims = sorted(
+                (q for q in self.selected.values() if question_length(q) > length),
+                key=question_length, reverse=True
+            )
+            for victim in victims:
+                if self._swappable(victim, question):
+                    self._remove(victim)
+                    self._add(question)
+                    longest = max(map(question_length, self.selected.values()))
+                    break
+
+    def _repair_kinds(self):
+        """
+        题型未达到下限时，选入该题型的题目，题位已满时替换其他题型中超出下限的题目
+        """
+        for kind, (low, _) in self.kind_ranges.items():
+            if self.kind_counts[kind] >= low:
+                continue
+            for question in self._candidates():
+                if self.kind_counts[kind] >= low:
+                    break
+                if self._kind(question) != kind:
+                    continue
+                if self._fits(question):
+                    self._add(question)
+                    continue
+                # 优先替换同一知识点的题目，知识点的题数不变
+                victims = sorted(
+                    (q for q in self.selected.values() if self._kind(q) != kind),
+                    key=lambda q: q.get('topic') != question.get('topic')
+                )
+                for victim in victims:
+                    if self._swappable(victim, question):
+                        self._remove(victim)
+                        self._add(question)
+                        break
+
+    def _repair_length(self):
+        """
+        总字数未达到下限时，用更长的候选题目替换已选的最短的可替换题目
+        """
+        low = self.length_range[0]
+        if self.total_length >= low:
+            return
+        for question in self._candidates():
+            if self.total_length >= low:
+                break
+            length = question_length(question)
+            victims = sorted(
+                (q for q in self.selected.values() if question_length(q) < length),
+                key=question_length
+            )
+            for victim in victims:
+                if self._swappable(victim, question):
+                    self._remove(victim)
+                    self._add(question)
+                    break
+
+    def _check_required(self):
+        """
+        检查必选题目是否存在、未被排除、属于题库和指定的知识点
+
+        Returns:
+            list: 问题列表
+        """
+        problems = []
+        bank_id = self.blueprint['bank_id']
+        for question_id in self.blueprint['include']:
+            question, question_bank_id = self.question_manager.get_question(question_id)
+            if question is None:
+                problems.append(f"必选题目{question_id}不存在")
+            elif question_id in self.excluded:
+                problems.append(f"题目{question_id}同时被指定为必选和排除")
+            elif bank_id is not None and question_bank_id != bank_id:
+                problems.append(f"必选题目{question_id}不在题库{bank_id}中")
+            elif self.topic_ranges is not None and question.get('topic') not in self.topic_ranges:
+                problems.append(f"必选题目{question_id}的知识点“{question.get('topic')}”不在要求的知识点中")
+        if len(self.required) > self.question_count:
+            problems.append(f"必选题目有{len(self.required)}道，超过总题数{self.question_count}")
+        return problems
+
+    def _check_totals(self):
+        """
+        检查各项数量要求之间是否矛盾，以及各知识点的题目是否足够
+
+        Returns:
+            list: 问题列表
+        """
+        problems = []
+        count = self.question_count
+        for name, ranges in (('知识点', self.topic_ranges), ('题型', self.kind_ranges)):
+            if not ranges:
+                continue
+            low = sum(low for low, _ in ranges.values())
+            high = sum(high for _, high in ranges.values())
+            if low > count:
+                problems.append(f"各{name}的题数下限之和为{low}，超过总题数{count}")
+            if high < count:
+                problems.append(f"各{name}的题数上限之和为{high}，少于总题数{count}")
+        bank_id = self.blueprint['bank_id']
+        excluded = self._excluded_counts()
+        if self.topic_ranges:
+            for topic, (low, _) in self.topic_ranges.items():
+                available = len(self.question_manager.get_topic_question_ids([topic], bank_id)) - excluded[topic]
+                if available < low:
+                    problems.append(f"知识点“{topic}”至少需要{low}道题，可用的只有{available}道")
+        else:
+            available = len(self.question_manager.get_all_questions(bank_id)) - sum(excluded.values())
+            if available < count:
+                problems.append(f"总题数需要{count}道，可用的只有{available}道")
+        return problems
+
+    def _excluded_counts(self):
+        """
+        按知识点统计排除的题目中属于题库的题目数
+
+        Returns:
+            Counter: 知识点 -> 题目数
+        """
+        bank_id = self.blueprint['bank_id']
+        counts = Counter()
+        for question_id in self.excluded:
+            question, question_bank_id = self.question_manager.get_question(question_id)
+            if question is not None and (bank_id is None or question_bank_id == bank_id):
+                counts[question.get('topic')] += 1
+        return counts
+
+    def _check_selected_limits(self):
+        """
+        检查必选题目本身是否已经超过各项上限
+
+        Returns:
+            list: 问题列表
+        """
+        problems = []
+        if self.topic_ranges:
+            for topic, (_, high) in self.topic_ranges.items():
+                if self.topic_counts[topic] > high:
+                    problems.append(f"知识点“{topic}”最多{high}道题，必选题目中已有{self.topic_counts[topic]}道")
+        for kind, (_, high) in self.kind_ranges.items():
+            if self.kind_counts[kind] > high:
+                problems.append(f"{QUESTION_KINDS[kind]}最多{high}道，必选题目中已有{self.kind_counts[kind]}道")
+        if self.total_length > self.length_range[1]:
+            problems.append(f"总字数最多{self.length_range[1]}，必选题目已有{self.total_length}字")
+        return problems
+
+    def _report(self):
+        """
+        选题结束后列出仍未满足的要求，题型不足时统计候选题目中该题型的总数
+
+        Returns:
+            list: 问题列表
+        """
+        problems = []
+        if self.topic_ranges:
+            for topic, (low, _) in self.topic_ranges.items():
+                if self.topic_counts[topic] < low:
+                    problems.append(f"知识点“{topic}”至少需要{low}道题，只能选出{self.topic_counts[topic]}道")
+        short_kinds = [kind for kind, (low, _) in self.kind_ranges.items() if self.kind_counts[kind] < low]
+        if short_kinds:
+            available = Counter(self._kind(q) for q in self._candidates())
+            for kind in short_kinds:
+                total = available[kind] + self.kind_counts[kind]
+                low = self.kind_ranges[kind][0]
+                if total < low:
+                    problems.append(f"{QUESTION_KINDS[kind]}至少需要{low}道，可用的只有{total}道")
+                else:
+                    problems.append(
+                        f"{QUESTION_KINDS[kind]}至少需要{low}道，可用{total}道，"
+                        f"但与其他要求同时满足时只能选出{self.kind_counts[kind]}道"
+                    )
+        if len(self.selected) < self.question_count:
+            problems.append(f"总题数需要{self.question_count}道，满足其他要求时只能选出{len(self.selected)}道")
+        if self.total_length < self.length_range[0]:
+            problems.append(f"总字数至少需要{self.length_range[0]}，满足其他要求时只能达到{self.total_length}字")
+        return problems
+
+
+def assemble_paper(question_manager, blueprint, rng=random):
+    """
+    按组卷要求选题，见PaperAssembler
+
+    Args:
+        question_manager: 题目管理器
+        blueprint: 组卷要求，格式见parse_blueprint
+        rng: 随机数生成器
+
+    Returns:
+        list: 题目列表
+
+    Raises:
+        ValueError: 组卷要求格式错误
+        AssemblyError: 组卷要求无法满足
+    """
+    return PaperAssembler(question_manager, blueprint, rng).assemble()
@@ -1,59 +1,377 @@
+import json
 import random
-import time
+import zlib
+from paper_assembler import assemble_paper
 from question_manager import QuestionManager
+from stratified_sampler import allocate_quotas, draw_variants, sample_pools_avoiding, variant_label
+
+# 试卷清单的字段：随机种子、题库ID、题目ID列表、题目指纹，多套试卷时还有套号
+MANIFEST_FIELDS = ('seed', 'bank_id', 'question_ids', 'fingerprint', 'variant')
+
+
+def new_seed():
+    """
+    生成新的随机种子，不使用也不改变random模块的全局状态
+    
+    Returns:
+        int: 随机种子
+    """
+    return random.SystemRandom().getrandbits(32)
+
+
+def questions_fingerprint(questions):
+    """
+    计算一组题目的指纹，题目内容、答案或知识点有任何变化时指纹都会改变
+    
+    Args:
+        questions: 题目列表
+        
+    Returns:
+        str: 8位十六进制指纹
+    """
+    crc = 0
+    for q in questions:
+        data = json.dumps([q.get('id'), q.get('content'), q.get('answer'), q.get('topic')], ensure_ascii=False)
+        crc = zlib.crc32(data.encode('utf-8'), crc)
+    return f'{crc:08x}'
+
+
+def to_manifest(paper):
+    """
+    取出试卷的清单字段，清单只包含题目ID，可以用json保存，需要时用expand_manifest还原
+    
+    Args:
+        paper: create_manifest或generate_papers的结果
+        
+    Returns:
+        dict: 试卷清单
+    """
+    return {field: paper[field] for field in MANIFEST_FIELDS if field in paper}
+
 
 class PaperGenerator:
-    """组卷功能类，负责按知识点随机抽题和试卷生成"""
+    """组卷功能类，负责按知识点随机抽题和试卷生成
     
-    def __init__(self):
+    每次组卷使用独立的random.Random(seed)，相同的种子在题目相同时抽到相同的题目；
+    试卷可以只保存为清单（种子、题库、题目ID和题目指纹），需要时再还原为试卷和答案。
+    提供使用记录时，每份生成的试卷都记录用到的题目（一次生成的多套试卷合并为一条记录），组卷时可以通过avoid参数避开
+    最近用过的题目（如usage_history.recent(papers=5)），此时还需要使用记录相同才能重现试卷。
+    """
+    
+    def __init__(self, question_manager=None, usage_history=None):
         """
         初始化组卷生成器
+        
+        Args:
+            question_manager: 题目管理器，None表示使用共享数据的新题目管理器
+            usage_history: 试卷使用记录（UsageHistory），None表示不记录
         """
-        self.question_manager = QuestionManager()
-        # 初始化随机种子，确保每次生成的试卷都不同
-        random.seed(time.time())
+        self.question_manager = question_manager if question_manager is not None else QuestionManager()
+        self.usage_history = usage_history
     
-    def generate_paper(self, topic=None, question_count=10):
+    def generate_paper(self, topic=None, question_count=10, bank_id=None, seed=None, avoid=None):
         """
         生成试卷
         
         Args:
             topic: 知识点，None表示所有知识点，列表表示多个知识点
             question_count: 题目数量
+            bank_id: 题库ID，None表示所有题库
+            seed: 随机种子，None表示使用新的随机种子
+            avoid: 需要避开的题目ID，只在其他题目不够时才使用，None表示不避开
             
         Returns:
             tuple: (试卷题目列表, 答案列表)
         """
-        # 获取符合条件的题目
-        if isinstance(topic, list) and topic:
-            # 多个知识点
-            questions = []
-            for t in topic:
-                questions.extend(self.question_manager.get_questions_by_topic(t))
+        selected_questions, _ = self._select(topic, question_count, bank_id, None, seed, avoid)
+        return self._build_paper(selected_questions)
+    
+    def sample_by_quota(self, quotas, question_count=None, bank_id=None, rng=random, avoid=None):
+        """
+        按知识点配额分层抽题，例如 {'OSPF': 3, 'IP': 5, '每日问答': 2}
+        
+        每个知识点从预先建立的题目池中抽取，耗时只与抽取的题目数有关。
+        
+        Args:
+            quotas: 知识点 -> 题目数（整数）或占总题数的比例（小数），按试卷中的顺序排列
+            question_count: 试卷总题数，使用比例配额时必须提供；只有整数配额时不使用
+            bank_id: 题库ID，None表示所有题库
+            rng: 随机数生成器，需要提供sample方法（避开题目时还需要randrange和shuffle方法）
+            avoid: 需要避开的题目ID，只在知识点的其他题目不够时才使用，None表示不避开
+            
+        Returns:
+            tuple: (题目列表, 缺额)，题目按配额中知识点的顺序分组排列；
+                缺额为知识点 -> (需要的题目数, 实际抽到的题目数)，只包含题目不足的知识点
+            
+        Raises:
+            ValueError: 配额无效
+        """
+        counts = allocate_quotas(quotas, question_count)
+        selected_questions = []
+        shortfalls = {}
+        for topic, count in counts.items():
+            if count <= 0:
+                continue
+            questions = self.question_manager.sample_questions_by_topic([topic], count, bank_id, rng, avoid)
+            selected_questions.extend(questions)
+            if len(questions) < count:
+                shortfalls[topic] = (count, len(questions))
+        return selected_questions, shortfalls
+    
+    def generate_paper_by_quota(self, quotas, question_count=None, bank_id=None, seed=None, avoid=None):
+        """
+        按知识点配额生成试卷，参数见sample_by_quota
+        
+        Returns:
+            tuple: (试卷题目列表, 答案列表, 缺额)
+            
+        Raises:
+            ValueError: 配额无效
+        """
+        selected_questions, shortfalls = self._select(None, question_count, bank_id, quotas, seed, avoid)
+        paper_questions, answers = self._build_paper(selected_questions)
+        return paper_questions, answers, shortfalls
+    
+    def create_manifest(self, topic=None, question_count=10, bank_id=None, quotas=None, seed=None, avoid=None):
+        """
+        抽题并只生成试卷清单，不生成试卷和答案
+        
+        Args:
+            topic: 知识点，None表示所有知识点，列表表示多个知识点；使用配额时不使用
+            question_count: 题目数量
+            bank_id: 题库ID，None表示所有题库
+            quotas: 知识点配额，格式见sample_by_quota，None表示不按配额抽题
+            seed: 随机种子，None表示使用新的随机种子
+            avoid: 需要避开的题目ID，只在其他题目不够时才使用，None表示不避开
+            
+        Returns:
+            tuple: (试卷清单, 缺额)，清单为包含MANIFEST_FIELDS中各字段（套号除外）的字典
+            
+        Raises:
+            ValueError: 配额无效
+        """
+        if seed is None:
+            seed = new_seed()
+        selected_questions, shortfalls = self._select(topic, question_count, bank_id, quotas, seed, avoid)
+        return self._manifest(seed, bank_id, selected_questions), shortfalls
+    
+    def expand_manifest(self, manifest, strict=True):
+        """
+        将试卷清单还原为试卷和答案
+        
+        Args:
+            manifest: 试卷清单，也可以是包含清单字段的generate_papers结果
+            strict: 为True时题目已被删除或修改则报错；为False时跳过已删除的题目，
+                按题目的当前内容还原
+            
+        Returns:
+            tuple: (试卷题目列表, 答案列表)
+            
+        Raises:
+            ValueError: strict为True且题目已被删除或修改
+        """
+        selected_questions = []
+        for question_id in manifest['question_ids']:
+            question, _ = self.question_manager.get_question(question_id)
+            if question is None:
+                if strict:
+                    raise ValueError(f"试卷中的题目已被删除: {question_id}")
+                continue
+            selected_questions.append(question)
+        fingerprint = manifest.get('fingerprint')
+        if strict and fingerprint and questions_fingerprint(selected_questions) != fingerprint:
+            raise ValueError("试卷中的题目在组卷后被修改过，无法按原样还原")
+        return self._build_paper(selected_questions)
+    
+    def assemble_paper(self, blueprint, seed=None, expand=True):
+        """
+        按组卷要求（总题数、各知识点和题型的题数、总字数、必选和排除的题目）生成试卷
+        
+        Args:
+            blueprint: 组卷要求，格式见paper_assembler.parse_blueprint
+            seed: 随机种子，None表示使用新的随机种子
+            expand: 是否生成试卷和答案；为False时只返回清单
+            
+        Returns:
+            dict: 试卷清单（见to_manifest），expand为True时还有questions和answers
+            
+        Raises:
+            ValueError: 组卷要求格式错误
+            AssemblyError: 组卷要求无法满足，problems属性逐条列出不满足的要求
+        """
+        if seed is None:
+            seed = new_seed()
+        selected_questions = assemble_paper(self.question_manager, blueprint, random.Random(seed))
+        self._record(selected_questions)
+        paper = self._manifest(seed, blueprint.get('bank_id'), selected_questions)
+        if expand:
+            paper['questions'], paper['answers'] = self._build_paper(selected_questions)
+        return paper
+    
+    def _select(self, topic, question_count, bank_id, quotas, seed, avoid=None):
+        """
+        按知识点或配额抽题，并记录到使用记录中
+        
+        Args:
+            topic: 知识点，None表示所有知识点，列表表示多个知识点；使用配额时不使用
+            question_count: 题目数量
+            bank_id: 题库ID，None表示所有题库
+            quotas: 知识点配额，None表示不按配额抽题
+            seed: 随机种子，None表示使用新的随机种子
+            avoid: 需要避开的题目ID，None表示不避开
+            
+        Returns:
+            tuple: (题目列表, 缺额)
+        """
+        rng = random.Random(new_seed() if seed is None else seed)
+        question_manager = self.question_manager
+        shortfalls = {}
+        if quotas:
+            selected_questions, shortfalls = self.sample_by_quota(quotas, question_count, bank_id, rng, avoid)
         elif topic:
-            # 单个知识点
-            questions = self.question_manager.get_questions_by_topic(topic)
+            # 一个或多个知识点，从它们的题目池中一起抽取
+            topics = topic if isinstance(topic, list) else [topic]
+            selected_questions = question_manager.sample_questions_by_topic(topics, question_count, bank_id, rng, avoid)
+        elif avoid is None:
+            # 所有知识点，只选出需要的题目，不打乱整个列表
+            questions = question_manager.get_all_questions(bank_id)
+            selected_questions = rng.sample(questions, max(min(question_count, len(questions)), 0))
         else:
-            # 所有知识点
-            questions = self.question_manager.get_all_questions()
+            question_ids = [q.get('id') for q in question_manager.get_all_questions(bank_id)]
+            selected_questions = [
+                question_manager.get_question(question_id)[0]
+                for question_id in sample_pools_avoiding([question_ids], question_count, avoid, rng)
+            ]
+        self._record(selected_questions)
+        return selected_questions, shortfalls
+    
+    def _record(self, selected_questions):
+        """
+        将试卷用到的题目记录到使用记录中
+        
+        Args:
+            selected_questions: 题目列表
+        """
+        if self.usage_history is not None and selected_questions:
+            self.usage_history.record([q.get('id') for q in selected_questions])
+    
+    def _manifest(self, seed, bank_id, selected_questions, variant=None):
+        """
+        生成试卷清单
+        
+        Args:
+            seed: 随机种子
+            bank_id: 题库ID
+            selected_questions: 题目列表
+            variant: 套号，None表示单套试卷
+            
+        Returns:
+            dict: 试卷清单
+        """
+        manifest = {
+            'seed': seed,
+            'bank_id': bank_id,
+            'question_ids': [q.get('id') for q in selected_questions],
+            'fingerprint': questions_fingerprint(selected_questions)
+        }
+        if variant is not None:
+            manifest['variant'] = variant
+        return manifest
+    
+    def generate_papers(self, n_variants, topic=None, question_count=10, bank_id=None,
+                        quotas=None, max_overlap=None, seed=None, expand=True, avoid=None):
+        """
+        一次生成多套试卷（A卷、B卷……）
         
-        # 确保题目数量不超过可用题目数
-        available_count = len(questions)
-        if available_count == 0:
-            return [], []
+        各套试卷尽量均匀地使用题目，被使用次数少的题目优先；任意两套试卷的相同题目
+        不超过max_overlap道，无法满足时该套试卷少选题目并记录缺额。
         
-        # 调整题目数量
-        actual_count = min(question_count, available_count)
+        Args:
+            n_variants: 试卷套数
+            topic: 知识点，None表示所有知识点，列表表示多个知识点；使用配额时不使用
+            question_count: 每套试卷的题目数量
+            bank_id: 题库ID，None表示所有题库
+            quotas: 知识点配额，格式见sample_by_quota，None表示不按配额抽题
+            max_overlap: 任意两套试卷最多相同的题目数，None表示不限制
+            seed: 随机种子，各套试卷共用，None表示使用新的随机种子
+            expand: 是否生成试卷和答案；为False时只返回清单，可用expand_manifest还原
+            avoid: 需要避开的题目ID，某层不在其中的题目够一套试卷使用时只从这些题目中抽取，
+                None表示不避开；各套试卷用到的题目合并为一条使用记录，算作一份试卷
+            
+        Returns:
+            list: 每套试卷一个字典，包含
+                variant: 套号，如'A'
+                seed、bank_id、question_ids、fingerprint: 试卷清单，见to_manifest
+                questions: 试卷题目列表，可直接导出，expand为False时没有
+                answers: 答案列表，可直接导出，expand为False时没有
+                shortfalls: 缺额，知识点 -> (需要的题目数, 实际抽到的题目数)，
+                    不按配额抽题时键为None
+            
+        Raises:
+            ValueError: 配额无效
+        """
+        if seed is None:
+            seed = new_seed()
+        question_manager = self.question_manager
+        if quotas:
+            counts = allocate_quotas(quotas, question_count)
+            labels = [topic for topic, count in counts.items() if count > 0]
+            strata = [(question_manager.get_topic_question_ids(topic, bank_id), counts[topic]) for topic in labels]
+        else:
+            labels = [None]
+            if isinstance(topic, list) and topic:
+                question_ids = question_manager.get_topic_question_ids(topic, bank_id)
+            elif topic:
+                question_ids = question_manager.get_topic_question_ids([topic], bank_id)
+            else:
+                question_ids = [q.get('id') for q in question_manager.get_all_questions(bank_id)]
+            strata = [(question_ids, max(question_count, 0))]
+        if avoid is not None:
+            strata = [(self._prefer_unused(question_ids, count, avoid), count) for question_ids, count in strata]
         
-        # 使用更可靠的随机方法：先创建索引列表，打乱后根据索引选择题目
-        # 这样可以确保完全随机，不受原始列表顺序影响
-        indices = list(range(len(questions)))
-        random.shuffle(indices)
-        selected_indices = indices[:actual_count]
+        papers = []
+        used_questions = {}
+        variants = draw_variants(strata, n_variants, max_overlap, random.Random(seed))
+        for index, (chosen, drawn) in enumerate(variants):
+            selected_questions = [question_manager.get_question(question_id)[0] for question_id in chosen]
+            paper = self._manifest(seed, bank_id, selected_questions, variant_label(index))
+            used_questions.update((q.get('id'), q) for q in selected_questions)
+            paper['shortfalls'] = {
+                label: (count, got)
+                for label, (_, count), got in zip(labels, strata, drawn) if got < count
+            }
+            if expand:
+                paper['questions'], paper['answers'] = self._build_paper(selected_questions)
+            papers.append(paper)
+        # 同一次生成的各套试卷属于同一场考试，合并为一条使用记录
+        self._record(list(used_questions.values()))
+        return papers
+    
+    def _prefer_unused(self, question_ids, count, avoid):
+        """
+        去掉需要避开的题目，剩下的题目不够一套试卷使用时保留全部题目
         
-        # 根据随机索引选择题目
-        selected_questions = [questions[i] for i in selected_indices]
+        Args:
+            question_ids: 一层的题目ID列表
+            count: 每套试卷从该层抽取的题目数
+            avoid: 需要避开的题目ID
+            
+        Returns:
+            list: 题目ID列表
+        """
+        fresh = [question_id for question_id in question_ids if question_id not in avoid]
+        return fresh if len(fresh) >= count else question_ids
+    
+    def _build_paper(self, selected_questions):
+        """
+        根据选出的题目生成试卷和答案，题号从1开始
         
+        Args:
+            selected_questions: 题目列表
+            
+        Returns:
+            tuple: (试卷题目列表, 答案列表)
+        """
         # 生成试卷题目列表（不含答案）
         paper_questions = []
         for i, q in enumerate(selected_questions, 1):
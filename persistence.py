@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+
+
+def atomic_write(file_path, write, binary=False):
+    """
+    以原子替换的方式写出文件
+
+    先写入同目录下的临时文件并fsync，再重命名覆盖原文件，
+    写入过程中崩溃不会损坏原文件。
+
+    Args:
+        file_path: 目标文件路径
+        write: 写入函数，参数为打开的临时文件对象
+        binary: 是否以二进制模式写入
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if binary:
+            f = open(tmp_path, 'wb')
+        else:
+            f = open(tmp_path, 'w', encoding='utf-8')
+        with f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # 同步目录项，确保重命名本身也已落盘
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def atomic_write_json(file_path, data, indent=2):
+    """
+    以原子替换的方式写出JSON文件
+
+    Args:
+        file_path: 目标文件路径
+        data: 要保存的数据
+        indent: 缩进空格数，None表示紧凑格式
+    """
+    atomic_write(file_path, lambda f: json.dump(data, f, ensure_ascii=False, indent=indent))
+
+
+class BackgroundWriter:
+    """后台写入类，合并一段时间内的多次修改，在后台线程中统一写入"""
+
+    def __init__(self, write, delay=0.5, max_delay=5.0):
+        """
+        初始化后台写入器
+
+        Args:
+            write: 执行一次完整写入的函数
+            delay: 最后一次修改后等待的秒数，期间的新修改会合并到同一次写入
+            max_delay: 持续修改时两次写入之间的最长间隔（秒）
+        """
+        self._write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._writing = False
+        self._closed = False
+        self._first_mark = 0
+        self._last_mark = 0
+        self._thread = threading.Thread(target=self._run, name='BackgroundWriter', daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self):
+        """
+        标记数据已修改，等待后台写入
+        """
+        with self._cond:
+            now = time.monotonic()
+            if not self._dirty:
+                self._first_mark = now
+            self._dirty = True
+            self._last_mark = now
+            self._cond.notify_all()
+
+    def is_dirty(self):
+        """
+        判断是否有尚未写入的修改
+
+        Returns:
+            bool: 是否有未写入的修改
+        """
+        with self._cond:
+            return self._dirty or self._writing
+
+    def _run(self):
+        """
+        后台线程主循环
+        """
+        while True:
+            with self._cond:
+                # flush正在写入时也等待，写入结束后会收到通知
+                while (not self._dirty or self._writing) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # 等待修改停止一段时间，持续修改时不超过最长间隔
+                while self._dirty and not self._closed:
+                    now = time.monotonic()
+                    deadline = min(self._last_mark + self.delay, self._first_mark + self.max_delay)
+                    if now >= deadline:
+                        break
+                    self._cond.wait(deadline - now)
+                if not self._dirty or self._closed or self._writing:
+                    # 已被flush写入或正在关闭
+                    continue
+                self._dirty = False
+                self._writing = True
+            try:
+                self._write()
+            except Exception as e:
+                print(f"后台保存数据失败: {e}")
+                with self._cond:
+                    # 保留修改标记，稍后重试
+                    if not self._dirty:
+                        self._first_mark = time.monotonic()
+                    self._dirty = True
+                    self._last_mark = time.monotonic()
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def flush(self):
+        """
+        立即在调用线程中写入所有未保存的修改，写入失败时抛出异常
+        """
+        with self._cond:
+            while self._writing:
+                self._cond.wait()
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._writing = True
+        try:
+            self._write()
+        except BaseException:
+            with self._cond:
+                self._dirty = True
+            raise
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+    def close(self):
+        """
+        写入未保存的修改并停止后台线程
+        """
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
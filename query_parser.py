@@ -0,0 +1,90 @@
+import re
+
+# 查询语句中可以指定的字段
+QUERY_FIELDS = ('topic', 'content', 'answer', 'bank')
+
+# 一个查询条件：可选的排除符号、可选的字段名，以及带引号的短语或不含空白的词
+_CLAUSE_RE = re.compile(r'(-)?(?:([A-Za-z]+):)?(?:"([^"]*)"?|(\S+))')
+
+
+class Query:
+    """解析后的查询条件
+
+    Attributes:
+        terms: 需要包含的关键词，与search_questions相同，匹配content、answer和topic
+        excluded_terms: 不能包含的关键词
+        fields: 字段名 -> 该字段需要包含的值列表
+        excluded_fields: 字段名 -> 该字段不能包含的值列表
+    """
+
+    def __init__(self):
+        self.terms = []
+        self.excluded_terms = []
+        self.fields = {}
+        self.excluded_fields = {}
+
+    def __bool__(self):
+        return bool(self.terms or self.excluded_terms or self.fields or self.excluded_fields)
+
+    def __repr__(self):
+        return (f"Query(terms={self.terms!r}, excluded_terms={self.excluded_terms!r}, "
+                f"fields={self.fields!r}, excluded_fields={self.excluded_fields!r})")
+
+
+def parse_query(text):
+    """
+    解析查询语句
+
+    语法（条件之间以空白分隔，同时满足所有条件）:
+        词             题目内容、答案或知识点包含该词
+        "短语"          包含整个短语，短语中可以有空白
+        字段:值         指定字段包含该值，字段为topic、content、answer或bank（题库名称），
+                       值也可以是带引号的短语
+        -条件           排除满足该条件的题目
+
+    匹配均忽略大小写、全半角和空白的差异（见search_index.normalize_search_text）；未知的字段名按普通的词处理，缺少右引号时引号延续到末尾。
+
+    Args:
+        text: 查询语句
+
+    Returns:
+        Query: 查询条件
+    """
+    query = Query()
+    for match in _CLAUSE_RE.finditer(text):
+        negated, field, phrase, word = match.groups()
+        value = phrase if phrase is not None else word
+        if field is not None and field.lower() not in QUERY_FIELDS:
+            # 不是查询字段，例如时间“10:30”，整体作为一个词
+            value = match.group(0)[1:] if negated else match.group(0)
+            field = None
+        if not value or (field is None and value[-1] == ':' and value[:-1].lower() in QUERY_FIELDS):
+            # 空短语，或者还没有输入值的字段条件
+            continue
+        if field is None:
+            (query.excluded_terms if negated else query.terms).append(value)
+        else:
+            fields = query.excluded_fields if negated else query.fields
+            fields.setdefault(field.lower(), []).append(value)
+    return query
+
+
+def is_structured_query(text):
+    """
+    判断输入是否使用了查询语法，未使用时应按单个关键词搜索
+
+    Args:
+        text: 输入的文本
+
+    Returns:
+        bool: 是否包含引号、排除条件或字段条件
+    """
+    if '"' in text:
+        return True
+    for word in text.split():
+        if len(word) > 1 and word[0] == '-':
+            return True
+        field, sep, value = word.partition(':')
+        if sep and field.lower() in QUERY_FIELDS:
+            return True
+    return False
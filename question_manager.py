@@ -1,13 +1,481 @@
-from data_manager import DataManager
+import heapq
+import random
+import re
+import threading
+from collections import OrderedDict
+from data_manager import get_data_manager
+from search_index import SearchIndex, SEARCH_FIELDS, normalize_search_text, scan_questions
+from duplicate_detector import DuplicateDetector, DEFAULT_THRESHOLD
+from topic_completer import TopicCompleter
+from query_parser import parse_query
+import regex_search
+from stratified_sampler import TopicPool, sample_pools, sample_pools_avoiding, iter_pools_random
+from pagination import (
+    OrderedIndex, SORT_ORDERS, DEFAULT_PAGE_SIZE, sort_key, encode_cursor, decode_cursor
+)
+
+# 边输入边搜索的结果缓存条数
+LIVE_SEARCH_CACHE_SIZE = 32
+
+
+class _BackgroundBuild:
+    """在后台线程中建立索引
+
+    题目列表在启动时取得快照，建立期间发生变更的题目ID记录在touched中，
+    由使用索引的线程在取用结果时按当前数据重新索引这些题目。
+    """
+
+    def __init__(self, index, questions):
+        """
+        启动后台线程，将题目逐个加入索引
+
+        Args:
+            index: 空索引，需要提供add方法
+            questions: 题目列表的快照
+        """
+        self.index = index
+        self.touched = set()
+        self._questions = questions
+        self._error = None
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name='IndexBuilder', daemon=True).start()
+
+    def _run(self):
+        """
+        后台线程：建立索引
+        """
+        try:
+            for question in self._questions:
+                self.index.add(question)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._questions = None
+            self._done.set()
+
+    def ready(self):
+        """
+        判断索引是否已建立完成
+
+        Returns:
+            bool: 是否已完成
+        """
+        return self._done.is_set()
+
+    def result(self):
+        """
+        等待建立完成并返回索引
+
+        Returns:
+            建立好的索引
+
+        Raises:
+            Exception: 建立索引时发生的错误
+        """
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self.index
+
 
 class QuestionManager:
     """题目管理类，负责题目的增删改查和知识点分类"""
     
-    def __init__(self):
+    def __init__(self, data_manager=None):
         """
         初始化题目管理器
+        
+        Args:
+            data_manager: 数据管理器，可以是DataManager或SQLiteDataManager，
+                None表示使用进程内共享的questions.json数据管理器
         """
-        self.data_manager = DataManager()
+        self.data_manager = data_manager if data_manager is not None else get_data_manager()
+        # 关键词搜索的倒排索引和题目顺序，按题库分别建立；
+        # 倒排索引在prepare_search或第一次搜索该题库时在后台建立，建立期间搜索逐题扫描
+        self._search_indexes = {}
+        self._search_builds = {}
+        self._search_orders = {}
+        # 数据版本，每次变更加一；边输入边搜索的结果按(题库ID, 规范化后的关键词, 数据版本)缓存
+        self._store_version = 0
+        self._live_cache = OrderedDict()
+        # 跨题库的相似题目检测器，在prepare_duplicate_check或第一次查重时在后台建立
+        self._duplicate_detector = None
+        self._duplicate_build = None
+        # 知识点自动补全器、题目ID -> (题库ID, 知识点)和按知识点抽题用的题目池
+        # 知识点 -> {题库ID: TopicPool}，第一次补全或抽题时一起建立
+        self._topic_completer = None
+        self._question_topics = {}
+        self._topic_pools = {}
+        # 分页用的有序索引，(排序方式, 题库ID或None) -> OrderedIndex，第一次分页读取时建立
+        self._page_indexes = {}
+        self.data_manager.subscribe(self._on_data_changed)
+    
+    def _on_data_changed(self, changes):
+        """
+        根据数据变更增量更新搜索索引、相似题目检测器和知识点补全器
+        
+        Args:
+            changes: 变更描述列表
+        """
+        self._store_version += 1
+        # 旧版本的缓存不会再命中，直接清空
+        self._live_cache.clear()
+        for change in changes:
+            op = change['op']
+            if op == 'reload':
+                self._search_indexes = {}
+                self._search_builds = {}
+                self._search_orders = {}
+                self._duplicate_detector = None
+                self._duplicate_build = None
+                self._topic_completer = None
+                self._question_topics = {}
+                self._topic_pools = {}
+                self._page_indexes = {}
+                return
+            bank_ids = [change['bank_id'], change.get('from_bank_id')]
+            for bank_id in bank_ids:
+                self._search_orders.pop(bank_id, None)
+            if op in ('set_questions', 'delete_bank'):
+                # 整个题库发生变化，下次搜索或查重时重建
+                self._search_indexes.pop(change['bank_id'], None)
+                self._search_builds.pop(change['bank_id'], None)
+                self._duplicate_detector = None
+                self._duplicate_build = None
+                if self._topic_completer is not None:
+                    self._reindex_bank_topics(change['bank_id'], op == 'set_questions')
+                self._page_indexes = {}
+                continue
+            detector = self._duplicate_detector
+            completer = self._topic_completer
+            for question_id in change['question_ids']:
+                for bank_id in bank_ids:
+                    index = self._search_indexes.get(bank_id)
+                    if index is not None:
+                        index.remove(question_id)
+                    build = self._search_builds.get(bank_id)
+                    if build is not None:
+                        build.touched.add(question_id)
+                if detector is not None:
+                    detector.remove(question_id)
+                if self._duplicate_build is not None:
+                    self._duplicate_build.touched.add(question_id)
+                if completer is not None:
+                    self._unindex_question_topic(question_id)
+                for page_index in self._page_indexes.values():
+                    page_index.remove(question_id)
+                # 批量修改中题目可能被多次修改，按当前状态重新索引
+                question, bank_id = self.data_manager.get_question_by_id(question_id)
+                if question is None:
+                    continue
+                index = self._search_indexes.get(bank_id)
+                if index is not None:
+                    index.add(question)
+                if detector is not None:
+                    detector.add(question)
+                if completer is not None:
+                    self._index_question_topic(question, bank_id)
+                for (order, scope), page_index in self._page_indexes.items():
+                    if scope is None or scope == bank_id:
+                        page_index.add(sort_key(order, question, bank_id))
+    
+    def prepare_search(self, bank_id=None):
+        """
+        在后台线程中建立搜索索引，例如在加载数据后调用，第一次搜索时不必等待
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+        """
+        for current_bank_id in self._search_bank_ids(bank_id):
+            if current_bank_id not in self._search_indexes and current_bank_id not in self._search_builds:
+                self._start_search_build(current_bank_id)
+    
+    def _start_search_build(self, bank_id):
+        """
+        启动题库搜索索引的后台建立
+        
+        Args:
+            bank_id: 题库ID
+            
+        Returns:
+            _BackgroundBuild: 后台建立任务
+        """
+        build = _BackgroundBuild(SearchIndex(), list(self.data_manager.iter_questions(bank_id)))
+        self._search_builds[bank_id] = build
+        return build
+    
+    def _get_search_index(self, bank_id, wait=True):
+        """
+        获取题库的搜索索引，尚未建立时在后台建立
+        
+        Args:
+            bank_id: 题库ID
+            wait: 索引尚未建立完成时是否等待
+            
+        Returns:
+            SearchIndex: 倒排索引，不等待且尚未建立完成时为None
+        """
+        index = self._search_indexes.get(bank_id)
+        if index is not None:
+            return index
+        build = self._search_builds.get(bank_id)
+        if build is None:
+            build = self._start_search_build(bank_id)
+        if not wait and not build.ready():
+            return None
+        index = build.result()
+        # 按当前数据重新索引建立期间发生变更的题目
+        for question_id in build.touched:
+            index.remove(question_id)
+            question, current_bank_id = self.data_manager.get_question_by_id(question_id)
+            if question is not None and current_bank_id == bank_id:
+                index.add(question)
+        del self._search_builds[bank_id]
+        self._search_indexes[bank_id] = index
+        return index
+    
+    def _get_search_order(self, bank_id):
+        """
+        获取题库的题目列表和题目ID到位置的映射，用于按存储顺序输出搜索结果
+        
+        Args:
+            bank_id: 题库ID
+            
+        Returns:
+            tuple: (题目列表, 题目ID -> 位置)
+        """
+        order = self._search_orders.get(bank_id)
+        if order is None:
+            questions = self.data_manager.get_questions(bank_id)
+            positions = {}
+            for position, question in enumerate(questions):
+                positions.setdefault(question.get('id'), position)
+            order = self._search_orders[bank_id] = (questions, positions)
+        return order
+    
+    def prepare_duplicate_check(self, threshold=DEFAULT_THRESHOLD):
+        """
+        在后台线程中建立相似题目检测器，例如在加载数据后调用，第一次查重时不必等待
+        
+        Args:
+            threshold: 相似度阈值
+        """
+        self._get_duplicate_detector(threshold, wait=False)
+    
+    def _get_duplicate_detector(self, threshold, wait=True):
+        """
+        获取相似题目检测器，尚未建立或建立时的阈值高于所需阈值时在后台重新建立
+        
+        Args:
+            threshold: 相似度阈值
+            wait: 检测器尚未建立完成时是否等待
+            
+        Returns:
+            DuplicateDetector: 检测器，不等待且尚未建立完成时为None
+        """
+        detector = self._duplicate_detector
+        if detector is not None and detector.threshold <= threshold:
+            return detector
+        build = self._duplicate_build
+        if build is None or build.index.threshold > threshold:
+            build = self._duplicate_build = _BackgroundBuild(
+                DuplicateDetector(threshold), list(self.data_manager.iter_questions()))
+        if not wait and not build.ready():
+            return None
+        detector = build.result()
+        # 按当前数据重新加入建立期间发生变更的题目
+        for question_id in build.touched:
+            detector.remove(question_id)
+            question, _ = self.data_manager.get_question_by_id(question_id)
+            if question is not None:
+                detector.add(question)
+        self._duplicate_build = None
+        self._duplicate_detector = detector
+        return detector
+    
+    def _index_question_topic(self, question, bank_id):
+        """
+        在知识点补全器和题目池中登记题目的知识点
+        
+        Args:
+            question: 题目字典
+            bank_id: 题目所在题库ID
+        """
+        topic = question.get('topic')
+        if isinstance(topic, str) and topic:
+            question_id = question.get('id')
+            self._question_topics[question_id] = (bank_id, topic)
+            self._topic_completer.add(topic)
+            self._topic_pools.setdefault(topic, {}).setdefault(bank_id, TopicPool()).add(question_id)
+    
+    def _unindex_question_topic(self, question_id):
+        """
+        从知识点补全器和题目池中移除题目
+        
+        Args:
+            question_id: 题目ID
+        """
+        entry = self._question_topics.pop(question_id, None)
+        if entry is None:
+            return
+        bank_id, topic = entry
+        self._topic_completer.remove(topic)
+        pools = self._topic_pools[topic]
+        pool = pools[bank_id]
+        pool.remove(question_id)
+        if not pool:
+            del pools[bank_id]
+            if not pools:
+                del self._topic_pools[topic]
+    
+    def _reindex_bank_topics(self, bank_id, reload_bank):
+        """
+        整个题库发生变化时更新知识点补全器和题目池
+        
+        Args:
+            bank_id: 题库ID
+            reload_bank: 是否重新登记题库中的当前题目，题库被删除时为False
+        """
+        stale = [
+            question_id for question_id, (current_bank_id, _) in self._question_topics.items()
+            if current_bank_id == bank_id
+        ]
+        for question_id in stale:
+            self._unindex_question_topic(question_id)
+        if reload_bank:
+            for question in self.data_manager.iter_questions(bank_id):
+                self._index_question_topic(question, bank_id)
+    
+    def _get_topic_completer(self):
+        """
+        获取知识点补全器，尚未建立时遍历所有题目建立，同时建立题目池
+        
+        Returns:
+            TopicCompleter: 知识点补全器
+        """
+        if self._topic_completer is None:
+            self._topic_completer = TopicCompleter()
+            self._question_topics = {}
+            self._topic_pools = {}
+            for bank in self.data_manager.get_banks():
+                for question in self.data_manager.iter_questions(bank['id']):
+                    self._index_question_topic(question, bank['id'])
+        return self._topic_completer
+    
+    def _get_page_index(self, order, bank_id):
+        """
+        获取分页用的有序索引，尚未建立时遍历题目建立
+        
+        Args:
+            order: 排序方式
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            OrderedIndex: 有序索引
+        """
+        if order not in SORT_ORDERS:
+            raise ValueError(f"不支持的排序方式: {order}")
+        index = self._page_indexes.get((order, bank_id))
+        if index is None:
+            index = OrderedIndex()
+            index.build(
+                sort_key(order, question, current_bank_id)
+                for current_bank_id in self._search_bank_ids(bank_id)
+                for question in self.data_manager.iter_questions(current_bank_id)
+            )
+            self._page_indexes[(order, bank_id)] = index
+        return index
+    
+    def _page(self, order, bank_id, limit, cursor, question_ids=None, prefix=None):
+        """
+        按有序索引读取一页题目
+        
+        Args:
+            order: 排序方式
+            bank_id: 题库ID，None表示所有题库
+            limit: 每页题目数
+            cursor: 上一页返回的游标，None表示第一页
+            question_ids: 只读取这些题目，None表示全部
+            prefix: 只读取排序键以该前缀开头的题目
+            
+        Returns:
+            tuple: (题目列表, 下一页的游标，没有下一页时为None)
+        """
+        if limit <= 0:
+            raise ValueError("每页题目数必须大于0")
+        index = self._get_page_index(order, bank_id)
+        after = decode_cursor(cursor, order) if cursor else None
+        # 多取一道题，判断是否还有下一页
+        keys = index.page(after, limit + 1, question_ids, prefix)
+        next_cursor = encode_cursor(order, keys[limit - 1]) if len(keys) > limit else None
+        questions = [self.data_manager.get_question_by_id(key[-1])[0] for key in keys[:limit]]
+        return questions, next_cursor
+    
+    def page_questions(self, bank_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None, order='id'):
+        """
+        分页获取题目
+        
+        游标记录上一页最后一道题的排序键，读取下一页时从该位置继续，
+        不需要重新读取前面的页；翻页期间增删题目也不会导致题目重复或遗漏。
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            limit: 每页题目数
+            cursor: 上一页返回的游标，None表示第一页
+            order: 排序方式，'id'、'topic'（知识点，同一知识点按ID）或'bank'（题库，同一题库按ID）
+            
+        Returns:
+            tuple: (题目列表, 下一页的游标，没有下一页时为None)
+            
+        Raises:
+            ValueError: 排序方式不支持或游标无效
+        """
+        return self._page(order, bank_id, limit, cursor)
+    
+    def page_questions_by_topic(self, topic, bank_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None, order='id'):
+        """
+        分页获取指定知识点的题目，参数和返回值与page_questions相同
+        
+        Args:
+            topic: 知识点
+            bank_id: 题库ID，None表示所有题库
+            limit: 每页题目数
+            cursor: 上一页返回的游标，None表示第一页
+            order: 排序方式
+            
+        Returns:
+            tuple: (题目列表, 下一页的游标，没有下一页时为None)
+        """
+        if not topic or not isinstance(topic, str):
+            # 排序键中空知识点和缺少知识点的题目无法区分，按知识点精确查找
+            question_ids = {q.get('id') for q in self.data_manager.get_questions_by_topic(topic, bank_id)}
+            return self._page(order, bank_id, limit, cursor, question_ids)
+        if order == 'topic':
+            # 按知识点排序时同一知识点的题目是连续的一段，直接定位
+            return self._page(order, bank_id, limit, cursor, prefix=(topic,))
+        question_ids = self._get_page_index('topic', bank_id).prefix_ids((topic,))
+        return self._page(order, bank_id, limit, cursor, question_ids)
+    
+    def page_search(self, keyword, bank_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None, order='id'):
+        """
+        分页搜索题目，匹配规则与search_questions相同，参数和返回值与page_questions相同
+        
+        Args:
+            keyword: 搜索关键词
+            bank_id: 题库ID，None表示所有题库
+            limit: 每页题目数
+            cursor: 上一页返回的游标，None表示第一页
+            order: 排序方式
+            
+        Returns:
+            tuple: (题目列表, 下一页的游标，没有下一页时为None)
+        """
+        if not keyword:
+            return self._page(order, bank_id, limit, cursor)
+        question_ids = set()
+        for current_bank_id in self._search_bank_ids(bank_id):
+            question_ids |= self._get_search_index(current_bank_id).search(keyword)
+        return self._page(order, bank_id, limit, cursor, question_ids)
     
     def get_all_questions(self, bank_id=None):
         """
@@ -21,6 +489,18 @@ class QuestionManager:
         """
         return self.data_manager.get_questions(bank_id)
     
+    def iter_questions(self, bank_id=None):
+        """
+        逐题遍历题目，增量加载期间已读到的题目可以立即使用
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            
+        Yields:
+            dict: 题目字典
+        """
+        return self.data_manager.iter_questions(bank_id)
+    
     def get_questions_by_topic(self, topic, bank_id=None):
         """
         根据知识点获取题目
@@ -32,10 +512,9 @@ class QuestionManager:
         Returns:
             list: 题目列表
         """
-        questions = self.data_manager.get_questions(bank_id)
         if not topic:
-            return questions
-        return [q for q in questions if q.get('topic') == topic]
+            return self.data_manager.get_questions(bank_id)
+        return self.data_manager.get_questions_by_topic(topic, bank_id)
     
     def add_question(self, question_data, bank_id):
         """
@@ -56,6 +535,27 @@ class QuestionManager:
         self.data_manager.add_question(question_data, bank_id)
         return question_data['id']
     
+    def add_questions(self, questions, bank_id):
+        """
+        批量添加题目，所有题目添加完成后只持久化一次
+        
+        Args:
+            questions: 题目数据字典列表
+            bank_id: 题库ID
+            
+        Returns:
+            list: 新题目的ID列表
+        """
+        # 先验证全部题目，避免部分添加
+        for question_data in questions:
+            if not self._validate_question(question_data):
+                raise ValueError("题目数据不完整")
+        
+        with self.data_manager.batch():
+            for question_data in questions:
+                self.data_manager.add_question(question_data, bank_id)
+        return [question_data['id'] for question_data in questions]
+    
     def update_question(self, question_id, question_data):
         """
         更新题目
@@ -82,6 +582,44 @@ class QuestionManager:
         """
         self.data_manager.delete_question(question_id)
     
+    def delete_questions(self, question_ids):
+        """
+        批量删除题目，所有题目删除完成后只持久化一次
+        
+        Args:
+            question_ids: 题目ID列表
+        """
+        with self.data_manager.batch():
+            for question_id in question_ids:
+                self.data_manager.delete_question(question_id)
+    
+    def move_question(self, question_id, bank_id):
+        """
+        将题目移动到另一个题库
+        
+        Args:
+            question_id: 题目ID
+            bank_id: 目标题库ID
+            
+        Returns:
+            bool: 是否移动成功
+        """
+        return self.data_manager.move_question(question_id, bank_id)
+    
+    def batch(self):
+        """
+        批量修改，块内的增删改和移动只在最后持久化一次，出现异常时回滚
+        
+        用法:
+            with question_manager.batch():
+                question_manager.add_question(question_data, bank_id)
+                question_manager.delete_question(question_id)
+        
+        Returns:
+            上下文管理器
+        """
+        return self.data_manager.batch()
+    
     def get_question(self, question_id):
         """
         获取单个题目
@@ -106,6 +644,103 @@ class QuestionManager:
         """
         return self.data_manager.get_unique_topics(bank_id)
     
+    def complete_topics(self, text, limit=None):
+        """
+        知识点自动补全，忽略大小写、全半角和空白的差异
+        
+        以输入开头的知识点排在前面，其次是在中间位置包含输入的知识点，
+        各自按使用该知识点的题目数从多到少排列；没有输入时返回全部知识点。
+        
+        Args:
+            text: 已输入的文本
+            limit: 最多返回的知识点数，None表示全部
+            
+        Returns:
+            list: 知识点列表
+        """
+        return self._get_topic_completer().complete(text, limit)
+    
+    def sample_questions_by_topic(self, topics, count, bank_id=None, rng=random, avoid=None):
+        """
+        从一个或多个知识点的题目中不重复地随机抽取题目，每道题被抽中的概率相同
+        
+        题目池按知识点预先建立并随数据变更更新，抽取的耗时只与抽取数量有关，
+        不需要取出或打乱知识点的全部题目。
+        
+        Args:
+            topics: 知识点或知识点列表
+            count: 抽取的题目数，可用题目不足时全部取出
+            bank_id: 题库ID，None表示所有题库
+            rng: 随机数生成器，需要提供sample、randrange和shuffle方法
+            avoid: 需要避开的题目ID（如最近用过的题目），只在其他题目不够时才抽取，None表示不避开
+            
+        Returns:
+            list: 题目列表，顺序随机
+        """
+        pools = self._get_topic_pools(topics, bank_id)
+        if avoid is None:
+            question_ids = sample_pools(pools, count, rng)
+        else:
+            question_ids = sample_pools_avoiding(pools, count, avoid, rng)
+        questions = []
+        for question_id in question_ids:
+            question, _ = self.data_manager.get_question_by_id(question_id)
+            if question is not None:
+                questions.append(question)
+        return questions
+    
+    def get_topic_question_ids(self, topics, bank_id=None):
+        """
+        从题目池中取出一个或多个知识点的题目ID，不需要读取题目
+        
+        Args:
+            topics: 知识点或知识点列表
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            list: 题目ID列表，按知识点、题库ID和题目ID排列
+        """
+        return [question_id for pool in self._get_topic_pools(topics, bank_id) for question_id in pool]
+    
+    def iter_topic_question_ids_random(self, topics, bank_id=None, rng=random):
+        """
+        按随机顺序逐个产出一个或多个知识点的题目ID，只取少量题目时不需要打乱全部题目
+        
+        Args:
+            topics: 知识点或知识点列表
+            bank_id: 题库ID，None表示所有题库
+            rng: 随机数生成器，需要提供randrange和shuffle方法
+            
+        Yields:
+            题目ID，迭代期间不能修改题目
+        """
+        return iter_pools_random(self._get_topic_pools(topics, bank_id), rng)
+    
+    def _get_topic_pools(self, topics, bank_id):
+        """
+        获取知识点在题库中的题目池
+        
+        Args:
+            topics: 知识点或知识点列表
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            list: TopicPool列表，顺序只取决于题目池的内容
+        """
+        if isinstance(topics, str):
+            topics = [topics]
+        self._get_topic_completer()
+        pools = []
+        for topic in dict.fromkeys(topics):
+            bank_pools = self._topic_pools.get(topic, {})
+            if bank_id:
+                if bank_id in bank_pools:
+                    pools.append(bank_pools[bank_id])
+            else:
+                # 按题库ID排列，顺序与题库的建立和修改过程无关
+                pools.extend(pool for _, pool in sorted(bank_pools.items(), key=lambda item: item[0]))
+        return pools
+    
     def _validate_question(self, question_data):
         """
         验证题目数据
@@ -133,15 +768,365 @@ class QuestionManager:
         Returns:
             list: 匹配的题目列表
         """
-        questions = self.data_manager.get_questions(bank_id)
         if not keyword:
-            return questions
+            return self.data_manager.get_questions(bank_id)
+        
+        return self._search_banks(keyword, bank_id)[1]
+    
+    def _search_banks(self, keyword, bank_id):
+        """
+        逐个题库通过倒排索引得到匹配的题目，再按存储顺序输出；索引还在建立的题库逐题扫描
+        
+        Args:
+            keyword: 搜索关键词
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            tuple: (题库ID -> 匹配的题目ID集合, 按存储顺序排列的题目列表)
+        """
+        matched = {}
+        results = []
+        for current_bank_id in self._search_bank_ids(bank_id):
+            index = self._get_search_index(current_bank_id, wait=False)
+            if index is None:
+                questions = scan_questions(self.data_manager.iter_questions(current_bank_id), keyword)
+                matched[current_bank_id] = {q.get('id') for q in questions}
+            else:
+                matched[current_bank_id] = index.search(keyword)
+                questions = self._ordered_results({current_bank_id: matched[current_bank_id]})
+            results.extend(questions)
+        return matched, results
+    
+    def search_ready(self, bank_id=None):
+        """
+        判断搜索索引是否已建立完成，尚未开始建立的索引在后台开始建立
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            bool: 是否已建立完成
+        """
+        return all(self._get_search_index(current_bank_id, wait=False) is not None
+                   for current_bank_id in self._search_bank_ids(bank_id))
+    
+    def _search_bank_ids(self, bank_id):
+        """
+        获取需要搜索的题库ID
+        
+        Args:
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            list: 题库ID列表
+        """
+        if bank_id:
+            return [bank_id]
+        return [bank['id'] for bank in self.data_manager.get_banks()]
+    
+    def _ordered_results(self, matched):
+        """
+        将各题库匹配的题目ID按存储顺序转换为题目列表
+        
+        Args:
+            matched: 题库ID -> 匹配的题目ID集合，按题库顺序排列
+            
+        Returns:
+            list: 题目列表
+        """
+        results = []
+        for current_bank_id, question_ids in matched.items():
+            if not question_ids:
+                continue
+            questions, positions = self._get_search_order(current_bank_id)
+            results.extend(questions[position] for position in sorted(
+                positions[question_id] for question_id in question_ids if question_id in positions))
+        return results
+    
+    def search_as_you_type(self, keyword, bank_id=None):
+        """
+        边输入边搜索，结果与search_questions相同
+        
+        关键词逐字增长时，从缓存中找到被新关键词包含的最长的旧关键词，
+        只在它的结果中继续筛选，不需要重新搜索整个题库；
+        退格和重复输入直接命中缓存。数据变更后缓存失效。
+        不等待搜索索引建立，索引还在后台建立的题库逐题扫描。
+        
+        Args:
+            keyword: 搜索关键词
+            bank_id: 题库ID，None表示所有题库
+            
+        Returns:
+            list: 匹配的题目列表
+        """
+        if not keyword:
+            return self.data_manager.get_questions(bank_id)
+        # 按规范化后的关键词缓存，只是大小写、全半角或空白不同的输入共用结果
+        lowered = normalize_search_text(keyword)
+        key = (bank_id, lowered, self._store_version)
+        entry = self._live_cache.get(key)
+        if entry is not None:
+            self._live_cache.move_to_end(key)
+            return list(entry[1])
+        
+        # 包含在新关键词中的旧关键词，其结果一定包含新关键词的结果
+        base = None
+        for (cached_bank_id, cached_keyword, version), cached in self._live_cache.items():
+            if (cached_bank_id == bank_id and version == self._store_version
+                    and cached_keyword in lowered
+                    and (base is None or len(cached_keyword) > len(base[0]))):
+                base = (cached_keyword, cached)
+        if base is not None:
+            base_matched, base_results = base[1]
+            # 索引还在建立的题库在旧结果中逐题扫描
+            scanned = None
+            matched = {}
+            for current_bank_id, question_ids in base_matched.items():
+                index = self._get_search_index(current_bank_id, wait=False)
+                if index is not None:
+                    matched[current_bank_id] = index.filter(lowered, question_ids)
+                else:
+                    if scanned is None:
+                        scanned = {q.get('id') for q in scan_questions(base_results, lowered)}
+                    matched[current_bank_id] = question_ids & scanned
+            # 旧结果已按存储顺序排列，筛选后顺序不变
+            matched_ids = set().union(*matched.values())
+            results = [q for q in base_results if q.get('id') in matched_ids]
+        else:
+            matched, results = self._search_banks(lowered, bank_id)
+        
+        self._live_cache[key] = (matched, results)
+        if len(self._live_cache) > LIVE_SEARCH_CACHE_SIZE:
+            self._live_cache.popitem(last=False)
+        return list(results)
+    
+    def search_questions_ranked(self, keyword, bank_id=None, top_k=20, topic_boost=2.0):
+        """
+        按BM25相关度搜索题目，只返回得分最高的top_k道题
+        
+        匹配范围与search_questions相同，用大小为top_k的堆选出最高分，不对全部结果排序；
+        得分相同的题目按存储顺序排列。
+        
+        Args:
+            keyword: 搜索关键词
+            bank_id: 题库ID，None表示所有题库
+            top_k: 返回的题目数
+            topic_boost: 知识点字段中匹配的权重，content和answer的权重为1
+            
+        Returns:
+            list: (题目字典, 相关度)列表，按相关度从高到低排列
+        """
+        if not keyword:
+            # 与search_questions一致，没有关键词时按存储顺序返回
+            return [(q, 0.0) for q in self.data_manager.get_questions(bank_id)[:top_k]]
+        bank_ids = self._search_bank_ids(bank_id)
+        field_weights = {'topic': topic_boost}
+        
+        def scored():
+            for bank_rank, current_bank_id in enumerate(bank_ids):
+                index = self._get_search_index(current_bank_id)
+                matched = index.search(keyword)
+                if not matched:
+                    continue
+                questions, positions = self._get_search_order(current_bank_id)
+                for question_id, score in index.score(keyword, matched, field_weights):
+                    position = positions.get(question_id)
+                    if position is not None:
+                        # 同分时题库和位置靠前的优先
+                        yield score, -bank_rank, -position, questions
+        
+        best = heapq.nlargest(top_k, scored())
+        return [(questions[-position], score) for score, _, position, questions in best]
+    
+    def search_regex(self, pattern, bank_id=None, fields=SEARCH_FIELDS, ignore_case=True):
+        """
+        按正则表达式搜索题目，逐题扫描，结果边扫描边产出
+        
+        题目按题库分区，每个题库再按固定大小分块；题目总数较多时在进程池中并行扫描，
+        结果仍按存储顺序产出。扫描开始时取得题目列表的快照，之后的修改不影响本次结果。
+        
+        Args:
+            pattern: 正则表达式，任一字段中找到匹配即可
+            bank_id: 题库ID，None表示所有题库
+            fields: 需要匹配的字段
+            ignore_case: 是否忽略大小写
+            
+        Yields:
+            dict: 匹配的题目
+            
+        Raises:
+            re.error: 表达式语法错误
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        partitions = [
+            (current_bank_id, list(self._get_search_order(current_bank_id)[0]))
+            for current_bank_id in self._search_bank_ids(bank_id)
+        ]
+        snapshots = dict(partitions)
+        for current_bank_id, positions in regex_search.scan(pattern, partitions, fields, flags):
+            questions = snapshots[current_bank_id]
+            for position in positions:
+                yield questions[position]
+    
+    def query(self, text, bank_id=None):
+        """
+        按查询语句搜索题目，语法见query_parser.parse_query，
+        例如 topic:OSPF answer:D bank:计算机网络 "DR 选举" -ping
         
-        keyword = keyword.lower()
-        return [q for q in questions if 
-                keyword in q.get('content', '').lower() or 
-                keyword in q.get('answer', '').lower() or 
-                keyword in q.get('topic', '').lower()]
+        每个题库按估计的匹配数从少到多执行可以使用索引的条件（知识点索引、倒排索引），
+        逐步求交集；候选题目比索引查找的结果还少时，剩余条件直接在候选题目上校验，
+        最后排除不能满足的条件。结果与逐题检查所有条件一致。
+        
+        Args:
+            text: 查询语句，或parse_query的结果
+            bank_id: 题库ID，None表示所有题库；与bank:条件同时使用时取交集
+            
+        Returns:
+            list: 匹配的题目列表，按存储顺序排列
+        """
+        query = parse_query(text) if isinstance(text, str) else text
+        if not query:
+            return self.data_manager.get_questions(bank_id)
+        
+        banks = self.data_manager.get_banks()
+        if bank_id:
+            banks = [bank for bank in banks if bank['id'] == bank_id]
+        for value in query.fields.get('bank', []):
+            value = normalize_search_text(value)
+            banks = [bank for bank in banks if value in normalize_search_text(bank['name'])]
+        for value in query.excluded_fields.get('bank', []):
+            value = normalize_search_text(value)
+            banks = [bank for bank in banks if value not in normalize_search_text(bank['name'])]
+        
+        # 知识点条件先在补全器中找出包含该值的知识点，再按知识点索引取题目
+        completer = self._get_topic_completer()
+        topic_conditions = {}
+        for value in query.fields.get('topic', []) + query.excluded_fields.get('topic', []):
+            if value not in topic_conditions:
+                topics = completer.complete(value)
+                topic_conditions[value] = (topics, sum(completer.count(topic) for topic in topics))
+        
+        matched = {
+            bank['id']: self._run_query(query, bank['id'], topic_conditions)
+            for bank in banks
+        }
+        return self._ordered_results(matched)
+    
+    def _run_query(self, query, bank_id, topic_conditions):
+        """
+        在一个题库中执行查询
+        
+        Args:
+            query: 查询条件
+            bank_id: 题库ID
+            topic_conditions: 知识点条件的值 -> (包含该值的知识点, 使用这些知识点的题目数)
+            
+        Returns:
+            set: 匹配的题目ID集合
+        """
+        index = self._get_search_index(bank_id)
+        
+        def lookup(field, value):
+            # 通过索引取出满足一个条件的全部题目
+            if field == 'topic':
+                return {
+                    q.get('id') for topic in topic_conditions[value][0]
+                    for q in self.data_manager.get_questions_by_topic(topic, bank_id)
+                }
+            ids = index.search(value)
+            return ids if field is None else index.filter(value, ids, field)
+        
+        def estimate(field, value):
+            if field == 'topic':
+                return topic_conditions[value][1]
+            return index.estimate(value)
+        
+        conditions = [(None, term) for term in query.terms]
+        excluded = [(None, term) for term in query.excluded_terms]
+        for field in ('topic', 'content', 'answer'):
+            conditions.extend((field, value) for value in query.fields.get(field, []))
+            excluded.extend((field, value) for value in query.excluded_fields.get(field, []))
+        
+        # 从估计匹配最少的条件开始
+        candidates = None
+        planned = sorted(((estimate(field, value), field, value) for field, value in conditions), key=lambda item: item[0])
+        for cost, field, value in planned:
+            if candidates is None:
+                candidates = lookup(field, value)
+            elif cost < len(candidates):
+                candidates &= lookup(field, value)
+            else:
+                candidates = index.filter(value, candidates, field)
+            if not candidates:
+                return set()
+        if candidates is None:
+            # 只有排除条件
+            candidates = set(index)
+        for field, value in excluded:
+            if estimate(field, value) < len(candidates):
+                candidates -= lookup(field, value)
+            else:
+                candidates -= index.filter(value, candidates, field)
+            if not candidates:
+                break
+        return candidates
+    
+    def find_duplicate_clusters(self, threshold=DEFAULT_THRESHOLD, bank_id=None):
+        """
+        找出相似题目的分组，相似度为题目内容和答案的字符片段Jaccard相似度
+        
+        Args:
+            threshold: 相似度阈值，0到1之间
+            bank_id: 只报告包含该题库题目的分组，None表示所有题库；
+                分组中仍包含其他题库的相似题目
+            
+        Returns:
+            list: 分组列表，每组为题目列表，题目数多的分组在前
+        """
+        detector = self._get_duplicate_detector(threshold)
+        question_ids = None
+        if bank_id:
+            question_ids = [q.get('id') for q in self.data_manager.iter_questions(bank_id)]
+        clusters = []
+        for group in detector.clusters(threshold, question_ids):
+            questions = [self.data_manager.get_question_by_id(question_id)[0] for question_id in group]
+            clusters.append([q for q in questions if q is not None])
+        return clusters
+    
+    def find_similar_questions(self, question_data, threshold=DEFAULT_THRESHOLD, wait=True):
+        """
+        查找与给定题目相似的已有题目，用于新增或导入题目前的检查
+        
+        Args:
+            question_data: 题目数据，有id时不会与自身比较
+            threshold: 相似度阈值，0到1之间
+            wait: 检测器还在后台建立时是否等待，不等待时不做检查
+            
+        Returns:
+            list: (题目字典, 相似度)列表，按相似度从高到低排列；
+                不等待且检测器尚未建立完成时为None
+        """
+        detector = self._get_duplicate_detector(threshold, wait)
+        if detector is None:
+            return None
+        results = []
+        for question_id, score in detector.find_similar(question_data, threshold):
+            question, _ = self.data_manager.get_question_by_id(question_id)
+            if question is not None:
+                results.append((question, score))
+        return results
+    
+    def subscribe(self, callback):
+        """
+        订阅数据变更
+        
+        Args:
+            callback: 回调函数，参数为变更描述列表
+            
+        Returns:
+            function: 取消订阅的函数
+        """
+        return self.data_manager.subscribe(callback)
     
     def get_banks(self):
         """
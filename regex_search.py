@@ -0,0 +1,129 @@
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+# 题目数达到该值时使用多进程扫描，较少时进程启动和传输数据的开销大于收益
+PARALLEL_SCAN_THRESHOLD = 20000
+# 每个扫描任务包含的题目数
+SCAN_CHUNK_SIZE = 5000
+# 多进程扫描时每个进程最多同时提交的任务数，取回结果后再提交后续任务
+TASKS_PER_WORKER = 2
+# 编译结果缓存的表达式个数
+PATTERN_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern, flags=re.IGNORECASE):
+    """
+    编译正则表达式并缓存，同一表达式重复搜索时不再编译
+
+    Args:
+        pattern: 正则表达式
+        flags: 编译标志
+
+    Returns:
+        re.Pattern: 编译后的表达式
+
+    Raises:
+        re.error: 表达式语法错误
+    """
+    return re.compile(pattern, flags)
+
+
+def scan_chunk(pattern, flags, rows):
+    """
+    扫描一块题目，在子进程中执行
+
+    Args:
+        pattern: 正则表达式
+        flags: 编译标志
+        rows: 每道题目需要匹配的字段文本元组列表
+
+    Returns:
+        list: 匹配的题目在rows中的位置
+    """
+    search = compile_pattern(pattern, flags).search
+    return [i for i, fields in enumerate(rows) if any(search(text) for text in fields)]
+
+
+def iter_chunks(partitions, fields, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    将各分区再按固定大小切分为扫描任务，只取出需要匹配的字段文本
+
+    Args:
+        partitions: (分区键, 题目列表)序列，通常每个题库为一个分区
+        fields: 需要匹配的字段
+        chunk_size: 每块的题目数
+
+    Yields:
+        tuple: (分区键, 块在分区中的起始位置, 字段文本元组列表)
+    """
+    for key, questions in partitions:
+        for start in range(0, len(questions), chunk_size):
+            rows = [tuple(q.get(field) or '' for field in fields) for q in questions[start:start + chunk_size]]
+            yield key, start, rows
+
+
+def scan(pattern, partitions, fields, flags=re.IGNORECASE, workers=None,
+         threshold=PARALLEL_SCAN_THRESHOLD, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    扫描所有分区，按分区和块的顺序逐块产出匹配结果
+
+    题目总数达到阈值且有多个CPU时在进程池中并行扫描，结果仍按原顺序产出，
+    前面的块扫描完即可产出，不需要等待全部完成；同时提交的任务数有上限，
+    取回一块的结果后才提交后续的块，不必先把所有题目传给子进程。否则在当前进程中逐块扫描。
+    进程池无法启动时退回当前进程扫描。
+
+    Args:
+        pattern: 正则表达式
+        partitions: (分区键, 题目列表)列表
+        fields: 需要匹配的字段，任一字段中找到匹配即可
+        flags: 编译标志
+        workers: 进程数，None表示CPU数
+        threshold: 使用多进程的题目数阈值
+        chunk_size: 每个任务的题目数
+
+    Yields:
+        tuple: (分区键, 匹配的题目在分区中的位置列表)，没有匹配的块不产出
+
+    Raises:
+        re.error: 表达式语法错误
+    """
+    # 先在当前进程编译，语法错误时立即报告
+    compile_pattern(pattern, flags)
+    workers = workers or os.cpu_count() or 1
+    total = sum(len(questions) for _, questions in partitions)
+    executor = None
+    if workers > 1 and total >= threshold and total > chunk_size:
+        workers = min(workers, -(-total // chunk_size))
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        except (OSError, NotImplementedError, ImportError) as e:
+            print(f"启动搜索进程失败，改为单进程搜索: {e}")
+    if executor is None:
+        for key, start, rows in iter_chunks(partitions, fields, chunk_size):
+            matches = scan_chunk(pattern, flags, rows)
+            if matches:
+                yield key, [start + i for i in matches]
+        return
+    try:
+        # 按顺序提交任务，结果也按顺序取回，前面的块完成后即可产出；
+        # 每取回一块的结果再提交一块，进程保持忙碌，同时提交的任务数不超过上限
+        chunks = iter_chunks(partitions, fields, chunk_size)
+        futures = deque(
+            (key, start, executor.submit(scan_chunk, pattern, flags, rows))
+            for key, start, rows in islice(chunks, workers * TASKS_PER_WORKER)
+        )
+        while futures:
+            key, start, future = futures.popleft()
+            for next_key, next_start, rows in islice(chunks, 1):
+                futures.append((next_key, next_start, executor.submit(scan_chunk, pattern, flags, rows)))
+            matches = future.result()
+            if matches:
+                yield key, [start + i for i in matches]
+    finally:
+        # 调用方提前停止读取结果时，取消尚未开始的任务
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,449 @@
+import math
+import re
+
+# 参与搜索的字段，与search_questions的匹配范围一致
+SEARCH_FIELDS = ('content', 'answer', 'topic')
+# 索引中各字段文本之间的分隔符，关键词不会跨字段匹配
+FIELD_SEPARATOR = '\x00'
+
+# 拉丁字母和数字按整词切分，其余非空白字符（中文、标点等）按相邻两字切分
+_SEGMENT_RE = re.compile(r'([a-z0-9]+)|([^a-z0-9\s\x00]+)')
+_LATIN_CHARS = frozenset('0123456789abcdefghijklmnopqrstuvwxyz')
+
+# 全角字符及其对应的半角字符，全角空格对应普通空格
+_FULLWIDTH_RE = re.compile('[\uff01-\uff5e\u3000]')
+_HALFWIDTH = {chr(code): chr(code - 0xfee0) for code in range(0xff01, 0xff5f)}
+_HALFWIDTH['\u3000'] = ' '
+# 与标点（包括字段分隔符）相邻的空格，去掉后“A.”与“A .”一致
+_PUNCT_SPACE_RE = re.compile(r' (?:(?=[^\w ])|(?<=[^\w ] ))')
+
+# 索引尚未建立时逐题扫描，用关键词中的几个字符预先排除题目
+SCAN_FILTER_CHARS = 3
+# 字符 -> 规范化后会产生该字符的其他原始字符，第一次扫描时建立
+_SOURCE_CHARS = None
+
+# BM25参数：词频饱和度和文档长度归一化程度
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_search_text(text):
+    """
+    规范化用于匹配的文本：全角字母、数字、标点和空格转为半角，忽略大小写（casefold），
+    连续空白合并为一个空格，去掉首尾和标点两侧的空白
+
+    题目文本和关键词都按此规范化后再做子串匹配，因此“Ａ．”、“a.”和“A .”可以互相匹配。
+    没有使用完整的NFKC规范化，它在建立索引时的耗时是上面几步的数倍。
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 规范化后的文本
+    """
+    if not text.isascii():
+        text = _FULLWIDTH_RE.sub(lambda match: _HALFWIDTH[match.group()], text)
+    text = ' '.join(text.casefold().split())
+    if ' ' in text:
+        text = _PUNCT_SPACE_RE.sub('', text)
+    return text
+
+
+def tokenize(text):
+    """
+    将已规范化的文本切分为索引词
+
+    拉丁字母和数字组成的整词（如ospf、tracert）作为一个词，
+    中文等其他字符按相邻两字切分，只有一个字的片段保留单字。
+
+    Args:
+        text: 规范化后的文本
+
+    Returns:
+        set: 索引词集合
+    """
+    tokens = set()
+    for latin, other in _SEGMENT_RE.findall(text):
+        if latin:
+            tokens.add(latin)
+        elif len(other) == 1:
+            tokens.add(other)
+        else:
+            tokens.update([other[i:i + 2] for i in range(len(other) - 1)])
+    return tokens
+
+
+def search_text(question):
+    """
+    获取题目各搜索字段规范化后的文本，以分隔符连接
+
+    Args:
+        question: 题目字典
+
+    Returns:
+        str: 连接后的规范化文本
+    """
+    # 分隔符不是空白，整体规范化与逐个字段规范化的结果相同
+    return normalize_search_text(FIELD_SEPARATOR.join([question.get(field) or '' for field in SEARCH_FIELDS]))
+
+
+def _source_chars(char):
+    """
+    获取规范化后会产生该字符的原始字符，包括它本身、大写和全角形式
+
+    Args:
+        char: 基本多文种平面中的非空白字符
+
+    Returns:
+        set: 原始字符集合
+    """
+    global _SOURCE_CHARS
+    if _SOURCE_CHARS is None:
+        # 基本多文种平面之外的字符折叠后不会落入基本多文种平面，只需遍历前65536个字符
+        sources = {}
+        for code in range(0x10000):
+            original = chr(code)
+            folded = _HALFWIDTH.get(original, original).casefold()
+            if folded != original:
+                for folded_char in folded:
+                    sources.setdefault(folded_char, set()).add(original)
+        _SOURCE_CHARS = sources
+    return _SOURCE_CHARS.get(char, set()) | {char}
+
+
+def scan_questions(questions, keyword):
+    """
+    逐题查找关键词，结果与SearchIndex.search一致，用于索引尚未建立时
+
+    规范化后的关键词原样出现在原始文本（或忽略大小写后的原始文本）中时一定匹配；
+    否则先检查关键词中的几个字符（或其大写、全角形式）是否都出现在原始文本中，
+    都出现时才规范化题目文本确认，大多数题目不需要规范化。
+
+    Args:
+        questions: 题目列表
+        keyword: 关键词
+
+    Returns:
+        list: 匹配的题目列表，顺序与输入相同
+    """
+    keyword = normalize_search_text(keyword)
+    if FIELD_SEPARATOR in keyword:
+        return [q for q in questions if any(keyword in text for text in search_text(q).split(FIELD_SEPARATOR))]
+    # 非拉丁字符在题目中通常更少见，优先用来排除题目
+    chars = sorted({char for char in keyword if char != ' ' and char <= '\uffff'},
+                   key=lambda char: (char.isascii(), char))[:SCAN_FILTER_CHARS]
+    patterns = [re.compile('[' + ''.join(map(re.escape, sorted(_source_chars(char)))) + ']') for char in chars]
+    results = []
+    for q in questions:
+        text = FIELD_SEPARATOR.join([q.get(field) or '' for field in SEARCH_FIELDS])
+        if keyword in text or (all(pattern.search(text) for pattern in patterns) and (
+                keyword in text.casefold() or keyword in normalize_search_text(text))):
+            results.append(q)
+    return results
+
+
+def _grams(text):
+    """
+    获取文本中的单字和相邻两字，用于在词表中查找包含某个片段的整词
+
+    Args:
+        text: 文本
+
+    Returns:
+        set: 单字和两字片段
+    """
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class SearchIndex:
+    """倒排索引类，按索引词记录包含它的题目ID，用于关键词搜索
+
+    每道题保存一份规范化后的文本，只在加入索引时计算一次，搜索时不再逐题转换。
+    索引只用来缩小候选范围，候选题目最后仍按子串匹配校验，
+    因此结果与逐题在规范化文本中查找关键词完全一致。
+    """
+
+    def __init__(self):
+        """
+        初始化空索引
+        """
+        # 索引词 -> 题目ID集合
+        self._postings = {}
+        # 单字 -> 包含该字的中文两字词，用于单字查询
+        self._char_tokens = {}
+        # 单字或两字片段 -> 包含它的拉丁整词，用于查询整词的一部分
+        self._latin_grams = {}
+        # 题目ID -> 连接后的规范化文本，用于删除索引和校验候选
+        self._texts = {}
+        # 所有题目文本的总长度，用于计算BM25的平均文档长度
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __iter__(self):
+        return iter(self._texts)
+
+    def __contains__(self, question_id):
+        return question_id in self._texts
+
+    def add(self, question):
+        """
+        索引一道题目，已索引的题目先移除旧索引
+
+        Args:
+            question: 题目字典
+        """
+        question_id = question.get('id')
+        if question_id is None:
+            return
+        if question_id in self._texts:
+            self.remove(question_id)
+        text = search_text(question)
+        self._texts[question_id] = text
+        self._total_length += len(text)
+        postings = self._postings
+        for token in tokenize(text):
+            ids = postings.get(token)
+            if ids is None:
+                ids = postings[token] = set()
+                self._add_token(token)
+            ids.add(question_id)
+
+    def _add_token(self, token):
+        """
+        登记新出现的索引词
+
+        Args:
+            token: 索引词
+        """
+        if token[0] in _LATIN_CHARS:
+            for gram in _grams(token):
+                self._latin_grams.setdefault(gram, set()).add(token)
+        elif len(token) == 2:
+            for char in token:
+                self._char_tokens.setdefault(char, set()).add(token)
+
+    def _remove_token(self, token):
+        """
+        注销已没有题目的索引词
+
+        Args:
+            token: 索引词
+        """
+        if token[0] in _LATIN_CHARS:
+            lookup, keys = self._latin_grams, _grams(token)
+        elif len(token) == 2:
+            lookup, keys = self._char_tokens, set(token)
+        else:
+            return
+        for key in keys:
+            tokens = lookup.get(key)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del lookup[key]
+
+    def remove(self, question_id):
+        """
+        移除题目的索引
+
+        Args:
+            question_id: 题目ID
+        """
+        text = self._texts.pop(question_id, None)
+        if text is None:
+            return
+        self._total_length -= len(text)
+        for token in tokenize(text):
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(question_id)
+            if not ids:
+                del self._postings[token]
+                self._remove_token(token)
+
+    def _latin_candidates(self, segment, open_start, open_end):
+        """
+        获取包含拉丁片段的候选题目
+
+        Args:
+            segment: 拉丁字母和数字组成的片段
+            open_start: 片段前面是否可能还有字母数字（片段位于关键词开头）
+            open_end: 片段后面是否可能还有字母数字（片段位于关键词结尾）
+
+        Returns:
+            list: 题目ID集合的列表，候选为它们的并集
+        """
+        if not open_start and not open_end:
+            # 两侧都不是字母数字，文本中必须有完全相同的整词
+            ids = self._postings.get(segment)
+            return [ids] if ids is not None else []
+        # 在词表中查找包含片段的整词，先按片段中的字和两字缩小范围
+        groups = sorted((self._latin_grams.get(gram, set()) for gram in _grams(segment)), key=len)
+        tokens = groups[0]
+        for group in groups[1:]:
+            if not tokens:
+                break
+            tokens = tokens & group
+        if open_start and open_end:
+            tokens = [token for token in tokens if segment in token]
+        elif open_start:
+            tokens = [token for token in tokens if token.endswith(segment)]
+        else:
+            tokens = [token for token in tokens if token.startswith(segment)]
+        return [self._postings[token] for token in tokens]
+
+    def _other_candidates(self, segment):
+        """
+        获取包含中文等其他字符片段的候选题目
+
+        Args:
+            segment: 不含字母数字和空白的片段
+
+        Returns:
+            list: 题目ID集合的列表，候选为它们的并集
+        """
+        postings = self._postings
+        if len(segment) == 1:
+            groups = [postings[token] for token in self._char_tokens.get(segment, ())]
+            if segment in postings:
+                groups.append(postings[segment])
+            return groups
+        # 多字片段必须包含其中每一个两字词，从最少的开始求交集
+        groups = sorted((postings.get(segment[i:i + 2], set()) for i in range(len(segment) - 1)), key=len)
+        ids = groups[0]
+        for group in groups[1:]:
+            if not ids:
+                break
+            ids = ids & group
+        return [ids]
+
+    def search(self, keyword):
+        """
+        搜索包含关键词的题目
+
+        Args:
+            keyword: 关键词，按规范化后的子串匹配content、answer和topic
+
+        Returns:
+            set: 匹配的题目ID集合
+        """
+        keyword = normalize_search_text(keyword)
+        candidates = None
+        for match in _SEGMENT_RE.finditer(keyword):
+            latin, other = match.groups()
+            if latin:
+                groups = self._latin_candidates(latin, match.start() == 0, match.end() == len(keyword))
+            else:
+                groups = self._other_candidates(other)
+            if not groups:
+                return set()
+            ids = groups[0] if len(groups) == 1 else set().union(*groups)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return set()
+        if candidates is None:
+            # 关键词只有空白，无法使用索引
+            candidates = self._texts
+        return self.filter(keyword, candidates)
+
+    def estimate(self, keyword):
+        """
+        估计包含关键词的题目数的上限，用于安排查询顺序，不做完整搜索
+
+        只查看关键词中可以直接定位的索引词（中文两字词、两侧完整的拉丁整词），
+        取其中最少的题目数；没有这样的索引词时返回题目总数。
+
+        Args:
+            keyword: 关键词
+
+        Returns:
+            int: 估计的题目数
+        """
+        keyword = normalize_search_text(keyword)
+        postings = self._postings
+        best = len(self._texts)
+        for match in _SEGMENT_RE.finditer(keyword):
+            latin, other = match.groups()
+            if latin:
+                if match.start() > 0 and match.end() < len(keyword):
+                    best = min(best, len(postings.get(latin, ())))
+            elif len(other) > 1:
+                best = min(best, min(len(postings.get(other[i:i + 2], ())) for i in range(len(other) - 1)))
+        return best
+
+    def filter(self, keyword, question_ids, field=None):
+        """
+        从给定题目中筛选包含关键词的题目
+
+        Args:
+            keyword: 关键词，按规范化后的子串匹配
+            question_ids: 候选题目ID，未索引的题目会被忽略
+            field: 只在该字段中查找，字段为SEARCH_FIELDS之一，None表示所有字段
+
+        Returns:
+            set: 匹配的题目ID集合
+        """
+        keyword = normalize_search_text(keyword)
+        texts = self._texts
+        if field is not None:
+            position = SEARCH_FIELDS.index(field)
+            return {
+                question_id for question_id in question_ids if question_id in texts
+                and keyword in texts[question_id].split(FIELD_SEPARATOR)[position]
+            }
+        if FIELD_SEPARATOR in keyword:
+            return {
+                question_id for question_id in question_ids if question_id in texts
+                and any(keyword in text for text in texts[question_id].split(FIELD_SEPARATOR))
+            }
+        return {
+            question_id for question_id in question_ids
+            if question_id in texts and keyword in texts[question_id]
+        }
+
+    def score(self, keyword, question_ids, field_weights=None):
+        """
+        按BM25计算题目与关键词的相关度
+
+        关键词按索引的方式切分为词，每个词在各字段中的出现次数按字段权重加权后
+        作为词频，文档长度为各字段文本的总长度。
+
+        Args:
+            keyword: 关键词
+            question_ids: 需要评分的题目ID，通常是search的结果
+            field_weights: 字段 -> 权重，未指定的字段权重为1
+
+        Yields:
+            tuple: (题目ID, 相关度)
+        """
+        field_weights = field_weights or {}
+        # 先按权重1在整段文本中计数，只对权重不为1的字段补上差值
+        extra_weights = [
+            (i, field_weights[field] - 1) for i, field in enumerate(SEARCH_FIELDS)
+            if field_weights.get(field, 1) != 1
+        ]
+        total = len(self._texts)
+        average_length = self._total_length / total if total else 1
+        idf = []
+        for term in tokenize(normalize_search_text(keyword)):
+            df = len(self._postings.get(term, ()))
+            idf.append((term, math.log(1 + (total - df + 0.5) / (df + 0.5))))
+        k1 = BM25_K1
+        length_factor = BM25_B / (average_length or 1)
+        for question_id in question_ids:
+            text = self._texts[question_id]
+            fields = text.split(FIELD_SEPARATOR) if extra_weights else None
+            norm = k1 * (1 - BM25_B + length_factor * len(text))
+            score = 0.0
+            for term, term_idf in idf:
+                tf = text.count(term)
+                if not tf:
+                    continue
+                for i, weight in extra_weights:
+                    tf += weight * fields[i].count(term)
+                if tf > 0:
+                    score += term_idf * tf * (k1 + 1) / (tf + norm)
+            yield question_id, score
@@ -0,0 +1,325 @@
+import json
+import os
+from data_manager import DataManager, is_legacy_data, convert_legacy_data
+from persistence import atomic_write_json
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def shard_file_name(bank_id):
+    """
+    获取题库分片文件名
+
+    Args:
+        bank_id: 题库ID
+
+    Returns:
+        str: 分片文件名
+    """
+    return f"bank_{bank_id}.json"
+
+
+class ShardedDataManager(DataManager):
+    """分片数据管理类，题库清单和每个题库的题目分别保存在目录下的不同文件中
+
+    目录结构:
+        manifest.json   题库清单（ID、名称、题目数）和ID分配器
+        bank_<id>.json  单个题库的题目
+
+    题库的题目在第一次访问时才加载，修改时只重写发生变化的题库文件。
+    """
+
+    def __init__(self, dir_path='questions', journal=False, compact_threshold=1024 * 1024,
+                 write_behind=False, write_delay=0.5, stream_load=False):
+        """
+        初始化分片数据管理器
+
+        参数与DataManager相同；每次修改只重写变化的题库文件，题库在首次访问时才加载，
+        因此不使用日志模式和增量加载，对应的参数会被忽略。
+
+        Args:
+            dir_path: 分片目录路径
+            journal: 不使用
+            compact_threshold: 不使用
+            write_behind: 是否启用后台写入
+            write_delay: 后台写入前等待合并修改的秒数
+            stream_load: 不使用
+        """
+        # 待写入的题库、待删除的题库文件和清单是否需要重写
+        self._dirty_banks = set()
+        self._deleted_banks = set()
+        self._manifest_dirty = False
+        super().__init__(dir_path, write_behind=write_behind, write_delay=write_delay)
+
+    @property
+    def manifest_path(self):
+        """
+        清单文件路径
+        """
+        return os.path.join(self.file_path, MANIFEST_NAME)
+
+    def _shard_path(self, bank_id):
+        """
+        获取题库分片文件路径
+
+        Args:
+            bank_id: 题库ID
+
+        Returns:
+            str: 分片文件路径
+        """
+        return os.path.join(self.file_path, shard_file_name(bank_id))
+
+    def _load_data(self):
+        """
+        加载题库清单，题目延迟到访问题库时加载
+
+        Returns:
+            dict: 只包含题库信息的数据字典
+        """
+        self._dirty_banks = set()
+        self._deleted_banks = set()
+        self._manifest_dirty = False
+        if not os.path.exists(self.manifest_path):
+            # 如果目录不存在，创建包含默认题库的分片目录
+            data = {
+                'banks': [{'id': 1, 'name': '题库一', 'questions': []}],
+                'next_question_id': 1,
+                'next_bank_id': 2
+            }
+            write_shards(self.file_path, data)
+            return data
+
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        return {
+            'banks': [
+                {'id': bank['id'], 'name': bank['name'], 'count': bank.get('count', 0)}
+                for bank in manifest.get('banks', [])
+            ],
+            'next_question_id': manifest.get('next_question_id', 1),
+            'next_bank_id': manifest.get('next_bank_id', 1)
+        }
+
+    def _load_bank(self, bank):
+        """
+        加载题库分片并建立索引
+
+        Args:
+            bank: 尚未加载题目的题库字典
+        """
+        path = self._shard_path(bank['id'])
+        questions = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                questions = json.load(f).get('questions', [])
+        bank['questions'] = questions
+        self._index_bank(bank)
+
+    def _get_bank(self, bank_id):
+        """
+        根据ID获取题库字典，第一次访问时加载题库分片
+
+        Args:
+            bank_id: 题库ID
+
+        Returns:
+            dict: 题库字典，不存在时返回None
+        """
+        with self._lock:
+            bank = self._bank_index.get(bank_id)
+            if bank is not None and 'questions' not in bank:
+                self._load_bank(bank)
+            return bank
+
+    def _find_question(self, question_id):
+        """
+        根据ID查找题目位置，未找到且还有未加载的题库时加载全部题库后再查找
+
+        Args:
+            question_id: 题目ID
+
+        Returns:
+            tuple: (题库字典, 题目位置)，不存在时返回None
+        """
+        entry = self._question_index.get(question_id)
+        if entry is None and self._load_all():
+            entry = self._question_index.get(question_id)
+        return entry
+
+    def _all_banks(self):
+        """
+        加载全部题库后返回题库列表
+
+        Returns:
+            list: 题库列表
+        """
+        self._load_all()
+        return self.data['banks']
+
+    def _load_all(self):
+        """
+        加载所有尚未加载的题库
+
+        Returns:
+            bool: 是否加载了新的题库
+        """
+        loaded = False
+        with self._lock:
+            for bank in self.data['banks']:
+                if 'questions' not in bank:
+                    self._load_bank(bank)
+                    loaded = True
+        return loaded
+
+    def loaded_bank_ids(self):
+        """
+        获取已加载题目的题库ID
+
+        Returns:
+            list: 题库ID列表
+        """
+        return [bank['id'] for bank in self.data['banks'] if 'questions' in bank]
+
+    def _persist(self, records):
+        """
+        根据变更记录标记需要重写的分片，再写入或交给后台线程
+
+        Args:
+            records: 变更记录列表
+        """
+        if not records:
+            return
+        for record in records:
+            op = record['op']
+            if op in ('add_bank', 'rename_bank'):
+                self._manifest_dirty = True
+                if op == 'add_bank':
+                    self._dirty_banks.add(record['bank']['id'])
+            elif op == 'delete_bank':
+                self._manifest_dirty = True
+                self._dirty_banks.discard(record['bank_id'])
+                self._deleted_banks.add(record['bank_id'])
+            else:
+                self._dirty_banks.add(record['bank_id'])
+                if op == 'move_question':
+                    self._dirty_banks.add(record['from_bank_id'])
+                # 清单中的题目数和ID分配器也会变化
+                self._manifest_dirty = True
+        if self._writer is not None:
+            self._writer.mark_dirty()
+        else:
+            try:
+                self._write_dirty()
+            except Exception as e:
+                print(f"保存数据失败: {e}")
+
+    def _write_dirty(self):
+        """
+        只写入发生变化的题库分片和清单
+        """
+        with self._lock:
+            dirty_banks = self._dirty_banks
+            deleted_banks = self._deleted_banks
+            manifest_dirty = self._manifest_dirty
+            self._dirty_banks = set()
+            self._deleted_banks = set()
+            self._manifest_dirty = False
+            shards = []
+            for bank_id in dirty_banks:
+                bank = self._bank_index.get(bank_id)
+                if bank is not None and 'questions' in bank:
+                    shards.append((bank_id, list(bank['questions'])))
+            manifest = build_manifest(self.data) if manifest_dirty else None
+        try:
+            for bank_id, questions in shards:
+                atomic_write_json(self._shard_path(bank_id), {'id': bank_id, 'questions': questions})
+            # 先写分片再写清单，清单中不会出现没有分片文件的题库
+            if manifest is not None:
+                atomic_write_json(self.manifest_path, manifest)
+            for bank_id in deleted_banks:
+                path = self._shard_path(bank_id)
+                if os.path.exists(path):
+                    os.remove(path)
+        except BaseException:
+            with self._lock:
+                # 写入失败，保留标记等待下次写入
+                self._dirty_banks |= {bank_id for bank_id, _ in shards}
+                self._deleted_banks |= deleted_banks
+                self._manifest_dirty = self._manifest_dirty or manifest_dirty
+            raise
+
+    def _write_behind(self):
+        """
+        后台写入发生变化的题库分片和清单
+        """
+        self._write_dirty()
+
+
+def build_manifest(data):
+    """
+    根据数据生成题库清单
+
+    Args:
+        data: 题目数据字典
+
+    Returns:
+        dict: 清单字典
+    """
+    return {
+        'version': 1,
+        'banks': [
+            {
+                'id': bank['id'],
+                'name': bank['name'],
+                'file': shard_file_name(bank['id']),
+                'count': len(bank['questions']) if 'questions' in bank else bank.get('count', 0)
+            }
+            for bank in data['banks']
+        ],
+        'next_question_id': data.get('next_question_id', 1),
+        'next_bank_id': data.get('next_bank_id', 1)
+    }
+
+
+def write_shards(dir_path, data):
+    """
+    将完整数据写为分片目录
+
+    Args:
+        dir_path: 分片目录路径
+        data: 包含全部题目的数据字典
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    for bank in data['banks']:
+        atomic_write_json(os.path.join(dir_path, shard_file_name(bank['id'])),
+                          {'id': bank['id'], 'questions': bank.get('questions', [])})
+    atomic_write_json(os.path.join(dir_path, MANIFEST_NAME), build_manifest(data))
+
+
+def migrate_to_shards(json_path='questions.json', dir_path='questions'):
+    """
+    将单文件JSON数据迁移为分片目录
+
+    Args:
+        json_path: JSON文件路径，支持旧版扁平的questions结构
+        dir_path: 目标分片目录，不能已经包含清单文件
+
+    Returns:
+        tuple: (迁移的题库数, 迁移的题目数)
+    """
+    if os.path.exists(os.path.join(dir_path, MANIFEST_NAME)):
+        raise ValueError(f"目标目录已有分片数据: {dir_path}")
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if is_legacy_data(data):
+        data = convert_legacy_data(data)
+
+    banks = data.get('banks', [])
+    max_question_id = max(
+        (q.get('id', 0) for bank in banks for q in bank.get('questions', [])), default=0)
+    max_bank_id = max((bank['id'] for bank in banks), default=0)
+    data['next_question_id'] = max(data.get('next_question_id', 1), max_question_id + 1)
+    data['next_bank_id'] = max(data.get('next_bank_id', 1), max_bank_id + 1)
+    write_shards(dir_path, data)
+    return len(banks), sum(len(bank.get('questions', [])) for bank in banks)
@@ -0,0 +1,380 @@
+import json
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from persistence import atomic_write, atomic_write_json
+
+# 紧凑快照文件扩展名
+SNAPSHOT_EXTENSION = '.qbs'
+# 文件头：魔数、格式版本、保留标志位
+MAGIC = b'QBSN'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+# 各段长度前缀
+LENGTH = struct.Struct('<I')
+# 字符串列的编码方式：按长度切分，或者按NUL分隔（不含NUL时，解码只需一次split）
+STRINGS_BY_LENGTH = 0
+STRINGS_BY_SEPARATOR = 1
+SEPARATOR = '\x00'
+# 题目中按列存储的文本字段
+TEXT_FIELDS = ('content', 'answer')
+
+
+class SnapshotError(ValueError):
+    """快照文件格式错误"""
+
+
+def _int_array(typecode, values):
+    """
+    生成小端序的整数数组字节
+
+    Args:
+        typecode: array类型码
+        values: 整数序列
+
+    Returns:
+        bytes: 小端序字节
+    """
+    arr = array(typecode, values)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _read_int_array(typecode, buf):
+    """
+    从小端序字节中读取整数数组
+
+    Args:
+        typecode: array类型码
+        buf: 字节数据
+
+    Returns:
+        array: 整数数组
+    """
+    arr = array(typecode)
+    arr.frombytes(buf)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+def _encode_strings(strings):
+    """
+    将字符串列编码为一整块UTF-8文本
+
+    字符串中不含NUL时以NUL分隔，否则额外保存字符长度数组；
+    加载时整块解码后再切分，不需要逐条解码
+
+    Args:
+        strings: 字符串列表
+
+    Returns:
+        bytes: 编码后的字节
+    """
+    if any(SEPARATOR in s for s in strings):
+        mode = STRINGS_BY_LENGTH
+        blob = ''.join(strings)
+        lengths = _int_array('I', (len(s) for s in strings))
+    else:
+        mode = STRINGS_BY_SEPARATOR
+        blob = SEPARATOR.join(strings)
+        lengths = b''
+    blob = blob.encode('utf-8', 'surrogatepass')
+    return b''.join((LENGTH.pack(len(strings)), bytes([mode]), lengths, LENGTH.pack(len(blob)), blob))
+
+
+def _decode_strings(buf, offset):
+    """
+    解码字符串列
+
+    Args:
+        buf: 文件内容
+        offset: 字符串列起始位置
+
+    Returns:
+        tuple: (字符串列表, 结束位置)
+    """
+    (count,) = LENGTH.unpack_from(buf, offset)
+    mode = buf[offset + LENGTH.size]
+    offset += LENGTH.size + 1
+    if mode == STRINGS_BY_LENGTH:
+        lengths = _read_int_array('I', buf[offset:offset + count * 4])
+        offset += count * 4
+    elif mode != STRINGS_BY_SEPARATOR:
+        raise SnapshotError(f"未知的字符串编码方式: {mode}")
+    (blob_size,) = LENGTH.unpack_from(buf, offset)
+    offset += LENGTH.size
+    text = bytes(buf[offset:offset + blob_size]).decode('utf-8', 'surrogatepass')
+    offset += blob_size
+    if count == 0:
+        return [], offset
+    if mode == STRINGS_BY_SEPARATOR:
+        return text.split(SEPARATOR), offset
+    ends = list(accumulate(lengths))
+    starts = [0] + ends[:-1]
+    return [text[start:end] for start, end in zip(starts, ends)], offset
+
+
+def _encode_ints(typecode, values):
+    """
+    编码整数列
+
+    Args:
+        typecode: array类型码
+        values: 整数列表
+
+    Returns:
+        bytes: 编码后的字节
+    """
+    return LENGTH.pack(len(values)) + _int_array(typecode, values)
+
+
+def _decode_ints(typecode, buf, offset):
+    """
+    解码整数列
+
+    Args:
+        typecode: array类型码
+        buf: 文件内容
+        offset: 整数列起始位置
+
+    Returns:
+        tuple: (整数数组, 结束位置)
+    """
+    (count,) = LENGTH.unpack_from(buf, offset)
+    offset += LENGTH.size
+    size = count * array(typecode).itemsize
+    if offset + size > len(buf):
+        raise SnapshotError("快照文件不完整")
+    return _read_int_array(typecode, buf[offset:offset + size]), offset + size
+
+
+def encode_snapshot(data):
+    """
+    将题目数据编码为紧凑快照
+
+    知识点和题库名称只在字符串表中保存一次，题目记录引用其序号；
+    题目ID、知识点序号按整数列存储，题目内容和答案按字符串列存储。
+
+    Args:
+        data: 题目数据字典
+
+    Returns:
+        bytes: 快照字节
+    """
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    banks = data.get('banks', [])
+    bank_ids, bank_names, bank_counts = [], [], []
+    question_ids, topic_refs = [], []
+    columns = {field: [] for field in TEXT_FIELDS}
+    # 只有少数题目有额外字段，按题目序号稀疏保存
+    extra_indices, extras = [], []
+    for bank in banks:
+        bank_ids.append(bank['id'])
+        bank_names.append(intern(bank['name']))
+        questions = bank.get('questions', [])
+        bank_counts.append(len(questions))
+        for question in questions:
+            # 列中放不下的字段（缺失、非字符串或其他自定义字段）保存在extra中
+            extra = {k: v for k, v in question.items() if k not in ('id', 'topic') + TEXT_FIELDS}
+            question_id = question.get('id')
+            if isinstance(question_id, int) and question_id >= 0:
+                question_ids.append(question_id)
+            else:
+                question_ids.append(-1)
+                if 'id' in question:
+                    extra['id'] = question_id
+            topic = question.get('topic')
+            if isinstance(topic, str):
+                topic_refs.append(intern(topic))
+            else:
+                topic_refs.append(-1)
+                if 'topic' in question:
+                    extra['topic'] = topic
+            missing = []
+            for field in TEXT_FIELDS:
+                value = question.get(field)
+                if isinstance(value, str):
+                    columns[field].append(value)
+                else:
+                    columns[field].append('')
+                    if field in question:
+                        extra[field] = value
+                    else:
+                        missing.append(field)
+            if missing:
+                extra['_missing'] = missing
+            if extra:
+                extra_indices.append(len(question_ids) - 1)
+                extras.append(json.dumps(extra, ensure_ascii=False))
+
+    meta = {k: v for k, v in data.items() if k != 'banks'}
+    parts = [
+        HEADER.pack(MAGIC, VERSION, 0),
+        _encode_strings([json.dumps(meta, ensure_ascii=False)]),
+        _encode_strings(strings),
+        _encode_ints('q', bank_ids),
+        _encode_ints('i', bank_names),
+        _encode_ints('I', bank_counts),
+        _encode_ints('q', question_ids),
+        _encode_ints('i', topic_refs),
+    ]
+    parts.extend(_encode_strings(columns[field]) for field in TEXT_FIELDS)
+    parts.append(_encode_ints('I', extra_indices))
+    parts.append(_encode_strings(extras))
+    return b''.join(parts)
+
+
+def _build_data(meta, strings, bank_ids, bank_names, bank_counts,
+                question_ids, topic_refs, columns, extra_indices, extras):
+    """
+    由解码出的各列还原题目数据字典
+
+    Returns:
+        dict: 题目数据字典
+    """
+    contents, answers = columns
+    # 常见情况一次性批量构造，少数特殊题目随后修正
+    questions = [
+        {'topic': strings[topic_ref], 'content': content, 'answer': answer, 'id': question_id}
+        for question_id, topic_ref, content, answer in zip(question_ids, topic_refs, contents, answers)
+    ] if strings else [
+        {'topic': None, 'content': content, 'answer': answer, 'id': question_id}
+        for question_id, content, answer in zip(question_ids, contents, answers)
+    ]
+    if min(topic_refs, default=0) < 0 or min(question_ids, default=0) < 0:
+        for question, topic_ref, question_id in zip(questions, topic_refs, question_ids):
+            if topic_ref < 0:
+                del question['topic']
+            if question_id < 0:
+                del question['id']
+    for i, extra in zip(extra_indices, extras):
+        extra = json.loads(extra)
+        question = questions[i]
+        for field in extra.pop('_missing', []):
+            del question[field]
+        question.update(extra)
+
+    data = {'banks': []}
+    start = 0
+    for bank_id, name_ref, count in zip(bank_ids, bank_names, bank_counts):
+        data['banks'].append({
+            'id': bank_id,
+            'name': strings[name_ref],
+            'questions': questions[start:start + count]
+        })
+        start += count
+    data.update(meta)
+    return data
+
+
+def decode_snapshot(buf):
+    """
+    解码紧凑快照
+
+    Args:
+        buf: 快照字节
+
+    Returns:
+        dict: 题目数据字典
+    """
+    buf = memoryview(buf)
+    if len(buf) < HEADER.size:
+        raise SnapshotError("快照文件不完整")
+    magic, version, _ = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise SnapshotError("不是题库快照文件")
+    if version != VERSION:
+        raise SnapshotError(f"不支持的快照版本: {version}")
+    try:
+        offset = HEADER.size
+        (meta,), offset = _decode_strings(buf, offset)
+        strings, offset = _decode_strings(buf, offset)
+        bank_ids, offset = _decode_ints('q', buf, offset)
+        bank_names, offset = _decode_ints('i', buf, offset)
+        bank_counts, offset = _decode_ints('I', buf, offset)
+        question_ids, offset = _decode_ints('q', buf, offset)
+        topic_refs, offset = _decode_ints('i', buf, offset)
+        columns = []
+        for _ in TEXT_FIELDS:
+            column, offset = _decode_strings(buf, offset)
+            columns.append(column)
+        extra_indices, offset = _decode_ints('I', buf, offset)
+        extras, offset = _decode_strings(buf, offset)
+        meta = json.loads(meta)
+    except (struct.error, ValueError, IndexError) as e:
+        raise SnapshotError(f"快照文件损坏: {e}")
+    total = len(question_ids)
+    if (sum(bank_counts) != total or len(extra_indices) != len(extras)
+            or any(len(column) != total for column in (topic_refs, *columns))):
+        raise SnapshotError("快照文件损坏: 题目记录数不一致")
+
+    try:
+        return _build_data(meta, strings, bank_ids, bank_names, bank_counts,
+                           question_ids, topic_refs, columns, extra_indices, extras)
+    except (IndexError, KeyError, TypeError, AttributeError, ValueError) as e:
+        raise SnapshotError(f"快照文件损坏: {e}")
+
+
+def save_snapshot(file_path, data):
+    """
+    以原子替换的方式保存紧凑快照
+
+    Args:
+        file_path: 快照文件路径
+        data: 题目数据字典
+    """
+    payload = encode_snapshot(data)
+    atomic_write(file_path, lambda f: f.write(payload), binary=True)
+
+
+def load_snapshot(file_path):
+    """
+    加载紧凑快照
+
+    Args:
+        file_path: 快照文件路径
+
+    Returns:
+        dict: 题目数据字典
+    """
+    with open(file_path, 'rb') as f:
+        return decode_snapshot(f.read())
+
+
+def json_to_snapshot(json_path='questions.json', snapshot_path='questions.qbs'):
+    """
+    将JSON数据转换为紧凑快照，支持旧版扁平的questions结构
+
+    Args:
+        json_path: JSON文件路径
+        snapshot_path: 快照文件路径
+    """
+    from data_manager import is_legacy_data, convert_legacy_data
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if is_legacy_data(data):
+        data = convert_legacy_data(data)
+    save_snapshot(snapshot_path, data)
+
+
+def snapshot_to_json(snapshot_path='questions.qbs', json_path='questions.json'):
+    """
+    将紧凑快照转换回JSON数据
+
+    Args:
+        snapshot_path: 快照文件路径
+        json_path: JSON文件路径
+    """
+    atomic_write_json(json_path, load_snapshot(snapshot_path))
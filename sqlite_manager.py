@@ -0,0 +1,509 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from data_manager import ChangeNotifier, change_from_record, is_legacy_data, convert_legacy_data
+
+# 题目中单独成列的字段，其余字段以JSON形式保存在extra列中
+QUESTION_COLUMNS = ('topic', 'content', 'answer')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS banks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    bank_id INTEGER NOT NULL REFERENCES banks(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    topic TEXT,
+    content TEXT,
+    answer TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_questions_bank_seq ON questions(bank_id, seq);
+CREATE INDEX IF NOT EXISTS idx_questions_seq ON questions(seq);
+CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(topic);
+CREATE INDEX IF NOT EXISTS idx_questions_bank_topic ON questions(bank_id, topic);
+'''
+
+
+class SQLiteDataManager(ChangeNotifier):
+    """SQLite数据管理类，与DataManager提供相同的接口，按行读写题目"""
+
+    def __init__(self, file_path='questions.db', journal=False, compact_threshold=1024 * 1024,
+                 write_behind=False, write_delay=0.5, stream_load=False):
+        """
+        初始化SQLite数据管理器
+
+        参数与DataManager相同，create_data_manager可以按同样的方式创建各种后端；
+        每次修改都在事务中提交，日志、后台写入和增量加载的参数都不需要，会被忽略。
+
+        Args:
+            file_path: 数据库文件路径
+            journal: 不使用
+            compact_threshold: 不使用
+            write_behind: 不使用
+            write_delay: 不使用
+            stream_load: 不使用
+        """
+        self.file_path = file_path
+        # 批量修改的嵌套层数
+        self._batch_depth = 0
+        self._pending_changes = []
+        self._subscribers = []
+        self.conn = sqlite3.connect(file_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            # 与JSON存储一致，空库时创建默认题库
+            if self.conn.execute('SELECT COUNT(*) FROM banks').fetchone()[0] == 0:
+                self.conn.execute("INSERT INTO banks (id, name) VALUES (1, '题库一')")
+
+    def flush(self):
+        """
+        与DataManager接口保持一致，每次修改都已在事务中提交，无需额外写入
+        """
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        单次修改的事务，批量修改中由最外层统一提交
+        """
+        if self._batch_depth:
+            yield
+        else:
+            with self.conn:
+                yield
+
+    @contextmanager
+    def batch(self):
+        """
+        批量修改，块内的所有修改在同一个事务中完成，正常结束时提交，
+        出现异常时回滚
+
+        支持嵌套，只有最外层结束时才会提交或回滚
+        """
+        self._batch_depth += 1
+        try:
+            if self._batch_depth > 1:
+                yield self
+                return
+            self._pending_changes = []
+            try:
+                yield self
+            except BaseException:
+                self.conn.rollback()
+                self._pending_changes = []
+                raise
+            self.conn.commit()
+        finally:
+            self._batch_depth -= 1
+        changes = self._pending_changes
+        self._pending_changes = []
+        self._notify(changes)
+
+    def _emit(self, record):
+        """
+        通知订阅者一次修改，批量修改中等到提交后统一通知
+
+        Args:
+            record: 与DataManager日志格式相同的变更记录
+        """
+        change = change_from_record(record)
+        if self._batch_depth:
+            self._pending_changes.append(change)
+        else:
+            self._notify([change])
+
+    def _row_to_question(self, row):
+        """
+        将数据库行转换为题目字典
+
+        Args:
+            row: questions表的一行
+
+        Returns:
+            dict: 题目字典
+        """
+        question = json.loads(row['extra']) if row['extra'] else {}
+        for column in QUESTION_COLUMNS:
+            if row[column] is not None:
+                question[column] = row[column]
+        question['id'] = row['id']
+        return question
+
+    def _question_params(self, question):
+        """
+        将题目字典拆分为各列的值
+
+        Args:
+            question: 题目字典
+
+        Returns:
+            tuple: (topic, content, answer, extra)
+        """
+        extra = {k: v for k, v in question.items() if k not in QUESTION_COLUMNS and k != 'id'}
+        return tuple(question.get(column) for column in QUESTION_COLUMNS) + (
+            json.dumps(extra, ensure_ascii=False) if extra else None,
+        )
+
+    def _next_seq(self):
+        """
+        获取下一个排序序号
+
+        Returns:
+            int: 排序序号
+        """
+        return self.conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM questions').fetchone()[0]
+
+    def _bank_exists(self, bank_id):
+        """
+        判断题库是否存在
+
+        Args:
+            bank_id: 题库ID
+
+        Returns:
+            bool: 是否存在
+        """
+        return self.conn.execute('SELECT 1 FROM banks WHERE id = ?', (bank_id,)).fetchone() is not None
+
+    def is_loaded(self):
+        """
+        判断数据是否已全部加载，SQLite后端按需查询，始终为True
+
+        Returns:
+            bool: 是否加载完成
+        """
+        return True
+
+    def get_banks(self):
+        """
+        获取所有题库
+
+        Returns:
+            list: 题库列表，每项只包含id和name，题目需通过get_questions获取
+        """
+        rows = self.conn.execute('SELECT id, name FROM banks ORDER BY id')
+        return [{'id': row['id'], 'name': row['name']} for row in rows]
+
+    def get_questions(self, bank_id=None):
+        """
+        获取题目
+
+        Args:
+            bank_id: 题库ID，None表示所有题库
+
+        Returns:
+            list: 题目列表
+        """
+        if bank_id:
+            rows = self.conn.execute(
+                'SELECT * FROM questions WHERE bank_id = ? ORDER BY seq', (bank_id,))
+        else:
+            rows = self.conn.execute(
+                'SELECT q.* FROM questions q JOIN banks b ON q.bank_id = b.id ORDER BY b.id, q.seq')
+        return [self._row_to_question(row) for row in rows]
+
+    def iter_questions(self, bank_id=None):
+        """
+        逐行读取题目，不一次性载入整个结果集
+
+        Args:
+            bank_id: 题库ID，None表示所有题库
+
+        Yields:
+            dict: 题目字典
+        """
+        if bank_id:
+            rows = self.conn.execute(
+                'SELECT * FROM questions WHERE bank_id = ? ORDER BY seq', (bank_id,))
+        else:
+            rows = self.conn.execute(
+                'SELECT q.* FROM questions q JOIN banks b ON q.bank_id = b.id ORDER BY b.id, q.seq')
+        for row in rows:
+            yield self._row_to_question(row)
+
+    def get_questions_by_topic(self, topic, bank_id=None):
+        """
+        通过topic索引获取指定知识点的题目
+
+        Args:
+            topic: 知识点
+            bank_id: 题库ID，None表示所有题库
+
+        Returns:
+            list: 题目列表
+        """
+        if bank_id:
+            rows = self.conn.execute(
+                'SELECT * FROM questions WHERE bank_id = ? AND topic = ? ORDER BY seq', (bank_id, topic))
+        else:
+            rows = self.conn.execute(
+                'SELECT q.* FROM questions q JOIN banks b ON q.bank_id = b.id '
+                'WHERE q.topic = ? ORDER BY b.id, q.seq', (topic,))
+        return [self._row_to_question(row) for row in rows]
+
+    def save_questions(self, questions, bank_id):
+        """
+        保存题目列表，替换题库中的全部题目
+
+        Args:
+            questions: 题目列表
+            bank_id: 题库ID
+        """
+        if not self._bank_exists(bank_id):
+            return
+        with self._transaction():
+            self.conn.execute('DELETE FROM questions WHERE bank_id = ?', (bank_id,))
+            seq = self._next_seq()
+            for question in questions:
+                self.conn.execute(
+                    'INSERT INTO questions (id, bank_id, seq, topic, content, answer, extra) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (question.get('id'), bank_id, seq) + self._question_params(question))
+                seq += 1
+        self._emit({'op': 'set_questions', 'bank_id': bank_id, 'questions': questions})
+
+    def get_question_by_id(self, question_id):
+        """
+        根据ID获取题目
+
+        Args:
+            question_id: 题目ID
+
+        Returns:
+            tuple: (题目字典, 题库ID)，如果不存在返回(None, None)
+        """
+        row = self.conn.execute('SELECT * FROM questions WHERE id = ?', (question_id,)).fetchone()
+        if row is None:
+            return None, None
+        return self._row_to_question(row), row['bank_id']
+
+    def add_question(self, question, bank_id):
+        """
+        添加新题目
+
+        Args:
+            question: 题目字典
+            bank_id: 题库ID
+        """
+        if not self._bank_exists(bank_id):
+            return
+        with self._transaction():
+            cursor = self.conn.execute(
+                'INSERT INTO questions (bank_id, seq, topic, content, answer, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (bank_id, self._next_seq()) + self._question_params(question))
+        question['id'] = cursor.lastrowid
+        self._emit({'op': 'add_question', 'bank_id': bank_id, 'question': question})
+
+    def update_question(self, question_id, updated_question):
+        """
+        更新题目
+
+        Args:
+            question_id: 题目ID
+            updated_question: 更新后的题目字典
+        """
+        row = self.conn.execute('SELECT bank_id FROM questions WHERE id = ?', (question_id,)).fetchone()
+        if row is None:
+            return False
+        with self._transaction():
+            self.conn.execute(
+                'UPDATE questions SET topic = ?, content = ?, answer = ?, extra = ? WHERE id = ?',
+                self._question_params(updated_question) + (question_id,))
+        updated_question['id'] = question_id
+        self._emit({'op': 'update_question', 'bank_id': row['bank_id'], 'question': updated_question})
+        return True
+
+    def delete_question(self, question_id):
+        """
+        删除题目
+
+        Args:
+            question_id: 题目ID
+        """
+        row = self.conn.execute('SELECT bank_id FROM questions WHERE id = ?', (question_id,)).fetchone()
+        if row is None:
+            return
+        with self._transaction():
+            self.conn.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+        self._emit({'op': 'delete_question', 'bank_id': row['bank_id'], 'question_id': question_id})
+
+    def move_question(self, question_id, bank_id):
+        """
+        将题目移动到另一个题库
+
+        Args:
+            question_id: 题目ID
+            bank_id: 目标题库ID
+
+        Returns:
+            bool: 是否移动成功
+        """
+        row = self.conn.execute('SELECT bank_id FROM questions WHERE id = ?', (question_id,)).fetchone()
+        if row is None or not self._bank_exists(bank_id):
+            return False
+        if row['bank_id'] == bank_id:
+            return True
+        with self._transaction():
+            self.conn.execute(
+                'UPDATE questions SET bank_id = ?, seq = ? WHERE id = ?',
+                (bank_id, self._next_seq(), question_id))
+        self._emit({'op': 'move_question', 'question_id': question_id,
+                    'from_bank_id': row['bank_id'], 'bank_id': bank_id})
+        return True
+
+    def get_unique_topics(self, bank_id=None):
+        """
+        获取所有唯一的知识点
+
+        Args:
+            bank_id: 题库ID，None表示所有题库
+
+        Returns:
+            list: 知识点列表
+        """
+        if bank_id:
+            rows = self.conn.execute(
+                'SELECT DISTINCT topic FROM questions WHERE bank_id = ? AND topic IS NOT NULL ORDER BY topic',
+                (bank_id,))
+        else:
+            rows = self.conn.execute(
+                'SELECT DISTINCT topic FROM questions WHERE topic IS NOT NULL ORDER BY topic')
+        return [row['topic'] for row in rows]
+
+    def add_bank(self, bank_name):
+        """
+        添加新题库
+
+        Args:
+            bank_name: 题库名称
+
+        Returns:
+            int: 新题库的ID
+        """
+        with self._transaction():
+            cursor = self.conn.execute('INSERT INTO banks (name) VALUES (?)', (bank_name,))
+        self._emit({'op': 'add_bank', 'bank': {'id': cursor.lastrowid, 'name': bank_name}})
+        return cursor.lastrowid
+
+    def update_bank_name(self, bank_id, new_name):
+        """
+        更新题库名称
+
+        Args:
+            bank_id: 题库ID
+            new_name: 新题库名称
+        """
+        with self._transaction():
+            cursor = self.conn.execute('UPDATE banks SET name = ? WHERE id = ?', (new_name, bank_id))
+        if cursor.rowcount:
+            self._emit({'op': 'rename_bank', 'bank_id': bank_id, 'name': new_name})
+
+    def delete_bank(self, bank_id):
+        """
+        删除题库
+
+        Args:
+            bank_id: 题库ID
+        """
+        # 确保至少保留一个题库
+        with self._transaction():
+            if self.conn.execute('SELECT COUNT(*) FROM banks').fetchone()[0] <= 1:
+                return
+            cursor = self.conn.execute('DELETE FROM banks WHERE id = ?', (bank_id,))
+        if cursor.rowcount:
+            self._emit({'op': 'delete_bank', 'bank_id': bank_id})
+
+
+def _seed_sequence(conn, table, next_id):
+    """
+    设置AUTOINCREMENT表的下一个ID，只会增大不会减小
+
+    Args:
+        conn: 数据库连接
+        table: 表名
+        next_id: 下一个分配的ID
+    """
+    row = conn.execute('SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)).fetchone()
+    if row is None:
+        conn.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)', (table, next_id - 1))
+    elif row[0] < next_id - 1:
+        conn.execute('UPDATE sqlite_sequence SET seq = ? WHERE name = ?', (next_id - 1, table))
+
+
+def migrate_json_to_sqlite(json_path='questions.json', db_path='questions.db'):
+    """
+    将JSON数据一次性迁移到SQLite数据库，保留题库ID、题目ID和题目顺序
+
+    Args:
+        json_path: JSON文件路径，支持旧版扁平的questions结构
+        db_path: 目标数据库路径，必须不存在或为空库
+
+    Returns:
+        tuple: (迁移的题库数, 迁移的题目数)
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if is_legacy_data(data):
+        data = convert_legacy_data(data)
+
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            has_questions = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions'"
+            ).fetchone() and conn.execute('SELECT 1 FROM questions LIMIT 1').fetchone()
+        finally:
+            conn.close()
+        if has_questions:
+            raise ValueError(f"目标数据库已有题目: {db_path}")
+
+    manager = SQLiteDataManager(db_path)
+    conn = manager.conn
+    bank_count = 0
+    question_count = 0
+    try:
+        with conn:
+            # 删除空库时自动创建的默认题库
+            conn.execute('DELETE FROM banks')
+            # 没有ID的题目按JSON中的最大ID继续编号
+            next_id = max(
+                (q.get('id', 0) for bank in data.get('banks', []) for q in bank.get('questions', [])),
+                default=0) + 1
+            # JSON中的ID分配器可能大于现有的最大ID（删除过题目或题库），迁移后也不能重复使用这些ID
+            next_id = max(next_id, data.get('next_question_id', 1))
+            seq = 1
+            for bank in data.get('banks', []):
+                conn.execute('INSERT INTO banks (id, name) VALUES (?, ?)', (bank['id'], bank['name']))
+                bank_count += 1
+                for question in bank.get('questions', []):
+                    question_id = question.get('id')
+                    if question_id is None:
+                        question_id = next_id
+                        next_id += 1
+                    conn.execute(
+                        'INSERT INTO questions (id, bank_id, seq, topic, content, answer, extra) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (question_id, bank['id'], seq) + manager._question_params(question))
+                    seq += 1
+                    question_count += 1
+            next_bank_id = max(
+                max((bank['id'] for bank in data.get('banks', [])), default=0) + 1,
+                data.get('next_bank_id', 1))
+            _seed_sequence(conn, 'banks', next_bank_id)
+            _seed_sequence(conn, 'questions', next_id)
+    finally:
+        manager.close()
+    return bank_count, question_count
@@ -0,0 +1,325 @@
+import random
+import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+
+class TopicPool:
+    """一个知识点的题目ID池，按ID排序保存，按位置读取是O(1)
+
+    题目ID保存在有序列表中，加入和移除用二分查找定位，随机抽取时直接按位置读取，
+    不需要复制或打乱整个列表。顺序只取决于池中有哪些题目，与加入和移除的先后无关，
+    因此同一随机种子在题目相同时总是抽到相同的题目。
+    """
+
+    def __init__(self):
+        """
+        初始化空的题目池
+        """
+        self._ids = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, question_id):
+        position = bisect_left(self._ids, question_id)
+        return position < len(self._ids) and self._ids[position] == question_id
+
+    def __getitem__(self, position):
+        return self._ids[position]
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, question_id):
+        """
+        加入题目
+
+        Args:
+            question_id: 题目ID
+        """
+        ids = self._ids
+        if not ids or ids[-1] < question_id:
+            # 按存储顺序建立时ID通常是递增的，直接追加
+            ids.append(question_id)
+            return
+        position = bisect_left(ids, question_id)
+        if ids[position] != question_id:
+            ids.insert(position, question_id)
+
+    def remove(self, question_id):
+        """
+        移除题目
+
+        Args:
+            question_id: 题目ID
+        """
+        position = bisect_left(self._ids, question_id)
+        if position < len(self._ids) and self._ids[position] == question_id:
+            del self._ids[position]
+
+
+def sample_pools(pools, count, rng=random):
+    """
+    从多个题目池的并集中不重复地均匀抽取题目ID
+
+    只抽取count个位置再换算到对应的池，耗时与count成正比，与池的大小无关。
+
+    Args:
+        pools: TopicPool列表，各池中的题目互不相同
+        count: 抽取的题目数，超过题目总数时全部取出
+        rng: 随机数生成器，需要提供sample方法
+
+    Returns:
+        list: 题目ID列表，顺序随机
+    """
+    bounds = []
+    total = 0
+    for pool in pools:
+        total += len(pool)
+        bounds.append(total)
+    count = min(count, total)
+    if count <= 0:
+        return []
+    result = []
+    for pick in rng.sample(range(total), count):
+        i = bisect_right(bounds, pick)
+        result.append(pools[i][pick - (bounds[i - 1] if i else 0)])
+    return result
+
+
+def sample_pools_avoiding(pools, count, avoid, rng=random):
+    """
+    从多个题目池的并集中随机抽取题目ID，尽量不选avoid中的题目
+
+    按随机顺序查看题目，先选不在avoid中的题目，不够时再用avoid中的题目补足。
+    耗时与查看的题目数成正比：avoid只占一小部分时接近count。
+
+    Args:
+        pools: TopicPool列表，各池中的题目互不相同
+        count: 抽取的题目数，超过题目总数时全部取出
+        avoid: 需要避开的题目ID，支持in判断即可，例如集合或UsageHistory.recent()的结果
+        rng: 随机数生成器，需要提供randrange和shuffle方法
+
+    Returns:
+        list: 题目ID列表，不在avoid中的题目在前
+    """
+    chosen = []
+    fallback = []
+    if count <= 0:
+        return chosen
+    for question_id in iter_pools_random(pools, rng):
+        if question_id in avoid:
+            if len(fallback) < count:
+                fallback.append(question_id)
+            continue
+        chosen.append(question_id)
+        if len(chosen) >= count:
+            break
+    return chosen + fallback[:count - len(chosen)]
+
+
+def iter_pools_random(pools, rng=random):
+    """
+    按随机顺序逐个产出多个题目池中的题目ID，每个排列出现的概率相同
+
+    前一半题目通过随机抽取位置产出，不需要预先打乱；只有取到一半以上时才打乱剩余的位置，
+    因此只需要少量题目时耗时与池的大小无关。迭代期间题目池不能修改。
+
+    Args:
+        pools: 题目池或其他可按位置读取的序列的列表
+        rng: 随机数生成器，需要提供randrange和shuffle方法
+
+    Yields:
+        题目池中的元素
+    """
+    bounds = []
+    total = 0
+    for pool in pools:
+        total += len(pool)
+        bounds.append(total)
+
+    def item_at(pick):
+        i = bisect_right(bounds, pick)
+        return pools[i][pick - (bounds[i - 1] if i else 0)]
+
+    seen = set()
+    while len(seen) * 2 < total:
+        pick = rng.randrange(total)
+        if pick not in seen:
+            seen.add(pick)
+            yield item_at(pick)
+    rest = [pick for pick in range(total) if pick not in seen]
+    rng.shuffle(rest)
+    for pick in rest:
+        yield item_at(pick)
+
+
+def allocate_quotas(quotas, question_count=None):
+    """
+    将知识点配额换算为各知识点的题目数
+
+    整数配额表示题目数；小数配额表示占question_count的比例，按最大余数法取整，
+    使按比例分配的题目数之和等于question_count乘以比例之和的四舍五入值。
+
+    Args:
+        quotas: 知识点 -> 题目数或比例，按试卷中的顺序排列
+        question_count: 试卷总题数，使用比例配额时必须提供
+
+    Returns:
+        dict: 知识点 -> 题目数，顺序与quotas相同
+
+    Raises:
+        ValueError: 配额不是非负数，或使用比例配额时没有提供总题数
+    """
+    counts = {}
+    shares = {}
+    for topic, quota in quotas.items():
+        if isinstance(quota, bool) or not isinstance(quota, (int, float)) or quota < 0:
+            raise ValueError(f"无效的配额: {topic}={quota!r}")
+        if isinstance(quota, int):
+            counts[topic] = quota
+        else:
+            shares[topic] = quota
+            counts[topic] = 0
+    if not shares:
+        return counts
+    if question_count is None:
+        raise ValueError("按比例分配题目时需要指定总题数")
+    exact = {topic: question_count * share for topic, share in shares.items()}
+    target = round(sum(exact.values()))
+    for topic, value in exact.items():
+        counts[topic] = int(value)
+    # 余下的题目依次分给小数部分最大的知识点
+    remaining = target - sum(counts[topic] for topic in shares)
+    for topic in sorted(shares, key=lambda topic: int(exact[topic]) - exact[topic])[:max(remaining, 0)]:
+        counts[topic] += 1
+    return counts
+
+
+def draw_variants(strata, n_variants, max_overlap=None, rng=random):
+    """
+    为多套试卷分配题目：同一层中优先使用被使用次数最少的题目，
+    且任意两套试卷的相同题目不超过max_overlap道
+
+    每层的题目排成一个队列，每套试卷从队首开始挑选，选中的题目移到队尾，
+    因此使用次数少的题目总在前面；某道题会使本套试卷与已生成的某套试卷的相同题目
+    超过上限时跳过，留在队首给下一套试卷。每层的题目都再使用一遍后按使用次数重新打乱，
+    避免各套试卷按固定的分组重复出现。每套试卷只查看它需要的题目和被跳过的题目，
+    与题目池的大小无关。
+
+    Args:
+        strata: (题目ID列表, 每套试卷从中抽取的题目数)列表，各层的题目互不相同
+        n_variants: 试卷套数
+        max_overlap: 任意两套试卷最多相同的题目数，None表示不限制
+        rng: 随机数生成器，需要提供sample和shuffle方法
+
+    Returns:
+        list: 每套试卷的(题目ID列表, 各层实际抽到的题目数列表)，
+            某层题目不足或受相同题目上限限制时抽到的题目数少于需要的题目数
+    """
+    decks = []
+    for question_ids, count in strata:
+        needed = count * n_variants
+        if needed < len(question_ids):
+            # 题目足够每套试卷各用不同的题目，不会重复使用也不会跳过，只需抽出要用的题目
+            deck = rng.sample(question_ids, needed)
+        else:
+            deck = list(question_ids)
+            rng.shuffle(deck)
+        # [队列, 上次打乱后选出的题目数]
+        decks.append([deque(deck), 0])
+    # 题目ID -> 使用该题的试卷序号列表
+    holders = {}
+    variants = []
+    for variant in range(n_variants):
+        # 本套试卷与之前各套试卷的相同题目数
+        overlaps = [0] * variant
+        chosen = []
+        drawn = []
+        for (_, count), deck in zip(strata, decks):
+            queue = deck[0]
+            taken = []
+            skipped = []
+            while queue and len(taken) < count:
+                question_id = queue.popleft()
+                users = holders.get(question_id, ())
+                if max_overlap is not None and any(overlaps[user] >= max_overlap for user in users):
+                    skipped.append(question_id)
+                    continue
+                for user in users:
+                    overlaps[user] += 1
+                taken.append(question_id)
+            queue.extendleft(reversed(skipped))
+            queue.extend(taken)
+            for question_id in taken:
+                holders.setdefault(question_id, []).append(variant)
+            deck[1] += len(taken)
+            if deck[1] >= len(queue) > 0:
+                items = list(queue)
+                rng.shuffle(items)
+                items.sort(key=lambda question_id: len(holders.get(question_id, ())))
+                deck[0] = deque(items)
+                deck[1] = 0
+            chosen.extend(taken)
+            drawn.append(len(taken))
+        variants.append((chosen, drawn))
+    return variants
+
+
+def variant_label(index):
+    """
+    获取试卷的套号：A、B、……、Z、AA、AB、……
+
+    Args:
+        index: 从0开始的序号
+
+    Returns:
+        str: 套号
+    """
+    label = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        label = chr(ord('A') + remainder) + label
+    return label
+
+
+# 配额文本中的一项：知识点、最后一个冒号、非负的整数、小数或百分数
+_QUOTA_ITEM_RE = re.compile(r'(.*)[:：]\s*(\d+(?:\.\d*)?|\.\d+)\s*(%?)$')
+
+
+def parse_quotas(text):
+    """
+    解析配额文本，例如“OSPF:3, IP:5, 每日问答:20%”
+
+    各项以逗号、分号或换行分隔，知识点与配额以最后一个冒号分隔（中英文标点均可）；
+    配额为整数时表示题目数，为小数或百分数时表示占总题数的比例。
+
+    Args:
+        text: 配额文本
+
+    Returns:
+        dict: 知识点 -> 题目数或比例，顺序与文本相同
+
+    Raises:
+        ValueError: 格式错误
+    """
+    quotas = {}
+    for item in re.split(r'[,，;；\n]', text):
+        item = item.strip()
+        if not item:
+            continue
+        match = _QUOTA_ITEM_RE.match(item)
+        if match is None:
+            raise ValueError(f"配额格式错误: {item}，应为“知识点:数量”")
+        topic, value, percent = match.group(1).strip(), match.group(2), match.group(3)
+        if not topic:
+            raise ValueError(f"配额格式错误: {item}，缺少知识点")
+        if percent:
+            quotas[topic] = float(value) / 100
+        elif value.isdigit():
+            quotas[topic] = int(value)
+        else:
+            quotas[topic] = float(value)
+    return quotas
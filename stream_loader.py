@@ -0,0 +1,242 @@
+import json
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 64 * 1024
+
+
+class JsonStreamReader:
+    """增量JSON读取类，按块读取文件，逐个解析对象和数组中的值，不需要一次性载入整个文档"""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        """
+        初始化增量读取器
+
+        Args:
+            f: 以文本模式打开的文件对象
+            chunk_size: 每次读取的字符数
+        """
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """
+        读取下一块内容，丢弃已解析的部分
+
+        单个值超过缓冲区时读取量随缓冲区增大，避免反复重新解析
+
+        Returns:
+            bool: 是否读到了新内容
+        """
+        chunk = self._f.read(max(self._chunk_size, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _error(self, message):
+        """
+        生成解析错误
+
+        Args:
+            message: 错误信息
+
+        Returns:
+            json.JSONDecodeError: 解析错误
+        """
+        return json.JSONDecodeError(message, self._buf, self._pos)
+
+    def peek(self):
+        """
+        跳过空白后查看下一个字符
+
+        Returns:
+            str: 下一个字符，文件结束时返回空字符串
+        """
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        """
+        读取指定的分隔符
+
+        Args:
+            char: 期望的字符
+        """
+        if self.peek() != char:
+            raise self._error(f"应为 {char!r}")
+        self._pos += 1
+
+    def value(self):
+        """
+        解析下一个完整的JSON值
+
+        Returns:
+            解析出的值
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # 数字可能恰好在缓冲区末尾被截断，还有后续内容时才能确认解析完整
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def iter_object(self):
+        """
+        遍历对象的键，每次产出一个键后调用方必须读取或遍历对应的值
+
+        Yields:
+            str: 对象的键
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error("应为字符串键")
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self.expect('}')
+            return
+
+    def iter_array(self):
+        """
+        遍历数组，每次产出后调用方必须读取或遍历一个元素
+
+        Yields:
+            int: 元素位置
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.peek() == ',':
+                self._pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def _iter_bank(reader):
+    """
+    增量解析一个题库对象
+
+    Args:
+        reader: 增量读取器
+
+    Yields:
+        tuple: 与iter_bank_events相同的事件
+    """
+    bank = {}
+    started = False
+    for key in reader.iter_object():
+        if key == 'questions' and reader.peek() == '[':
+            started = True
+            yield ('bank', bank)
+            for _ in reader.iter_array():
+                yield ('question', bank, reader.value())
+        else:
+            bank[key] = reader.value()
+    if not started:
+        yield ('bank', bank)
+    yield ('bank_end', bank)
+
+
+def iter_bank_events(file_path, chunk_size=CHUNK_SIZE):
+    """
+    增量解析题库JSON文件，按文件中的顺序产出事件，内存占用与单道题目的大小相当
+
+    事件:
+        ('bank', bank)              开始读取题库的题目，bank中已有题目之前出现的字段（通常是id和name）
+        ('question', bank, question) 读到一道题目
+        ('bank_end', bank)          题库读取完毕，bank中包含题目之外的全部字段
+        ('meta', key, value)        题库列表之外的顶层字段，如ID分配器
+        ('legacy',)                 文件是旧版扁平的questions结构，随后按ID为1的“题库一”产出题目
+
+    Args:
+        file_path: JSON文件路径
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        tuple: 事件
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = JsonStreamReader(f, chunk_size)
+        seen_banks = False
+        for key in reader.iter_object():
+            if key == 'banks' and reader.peek() == '[':
+                seen_banks = True
+                for _ in reader.iter_array():
+                    yield from _iter_bank(reader)
+            elif key == 'questions' and not seen_banks and reader.peek() == '[':
+                # 兼容旧数据结构
+                yield ('legacy',)
+                bank = {'id': 1, 'name': '题库一'}
+                yield ('bank', bank)
+                for _ in reader.iter_array():
+                    yield ('question', bank, reader.value())
+                yield ('bank_end', bank)
+            else:
+                yield ('meta', key, reader.value())
+        if reader.peek():
+            raise reader._error("文档结束后还有多余内容")
+
+
+def iter_questions_from_file(file_path, bank_id=None):
+    """
+    逐题读取JSON文件中的题目，不在内存中保留整个文档，适合统计和导出
+
+    Args:
+        file_path: JSON文件路径
+        bank_id: 题库ID，None表示所有题库
+
+    Yields:
+        dict: 题目字典
+    """
+    for event in iter_bank_events(file_path):
+        if event[0] == 'question' and (not bank_id or event[1].get('id') == bank_id):
+            yield event[2]
+
+
+def count_questions(file_path):
+    """
+    增量统计JSON文件中每个题库的题目数
+
+    Args:
+        file_path: JSON文件路径
+
+    Returns:
+        dict: 题库ID -> 题目数
+    """
+    counts = {}
+    for event in iter_bank_events(file_path):
+        if event[0] == 'bank':
+            counts.setdefault(event[1].get('id'), 0)
+        elif event[0] == 'question':
+            counts[event[1].get('id')] += 1
+    return counts
@@ -0,0 +1,78 @@
+import copy
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from journal import MutationJournal, apply_record
+
+
+def _bank_ids(data, question_id):
+    return [bank['id'] for bank in data['banks'] for q in bank['questions'] if q['id'] == question_id]
+
+
+class ApplyRecordReplayTest(unittest.TestCase):
+    """重放已包含在快照中的记录时结果不变"""
+
+    def setUp(self):
+        self.question = {'id': 5, 'topic': 'OSPF', 'content': 'c', 'answer': 'A'}
+        self.records = [
+            {'op': 'add_question', 'bank_id': 1, 'question': self.question},
+            {'op': 'move_question', 'question_id': 5, 'from_bank_id': 1, 'bank_id': 2},
+        ]
+
+    def _replay(self, data):
+        for record in self.records:
+            apply_record(data, record)
+        return data
+
+    def test_add_and_move(self):
+        data = {'banks': [{'id': 1, 'name': 'a', 'questions': []}, {'id': 2, 'name': 'b', 'questions': []}]}
+        self.assertEqual(_bank_ids(self._replay(data), 5), [2])
+
+    def test_replay_over_snapshot_containing_move(self):
+        # 快照写完、旧日志还未删除时崩溃：快照中q5已在题库2
+        snapshot = {'banks': [
+            {'id': 1, 'name': 'a', 'questions': []},
+            {'id': 2, 'name': 'b', 'questions': [copy.deepcopy(self.question)]},
+        ]}
+        data = self._replay(snapshot)
+        self.assertEqual(_bank_ids(data, 5), [2])
+        self.assertEqual(_bank_ids(self._replay(data), 5), [2])
+
+    def test_move_removes_stray_copies(self):
+        data = {'banks': [
+            {'id': 1, 'name': 'a', 'questions': [copy.deepcopy(self.question)]},
+            {'id': 2, 'name': 'b', 'questions': [copy.deepcopy(self.question)]},
+        ]}
+        apply_record(data, self.records[1])
+        self.assertEqual(_bank_ids(data, 5), [2])
+
+
+class ReplayCostTest(unittest.TestCase):
+    """重放大量记录时不随题目总数逐条遍历题库"""
+
+    def test_many_adds_over_large_snapshot(self):
+        data = {'banks': [
+            {'id': bank_id, 'name': str(bank_id),
+             'questions': [{'id': bank_id * 100000 + i, 'content': 'c'} for i in range(20000)]}
+            for bank_id in range(1, 6)
+        ]}
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = MutationJournal(os.path.join(tmp, 'questions.json.journal'))
+            # 前100条已包含在快照中
+            records = [{'op': 'add_question', 'bank_id': 1, 'question': {'id': 100000 + i}} for i in range(100)]
+            records += [{'op': 'add_question', 'bank_id': 1 + i % 5, 'question': {'id': 10 ** 6 + i}}
+                        for i in range(3000)]
+            with open(journal.file_path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(record) + '\n' for record in records)
+            start = time.perf_counter()
+            self.assertEqual(journal.replay(data), len(records))
+            self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(sum(len(bank['questions']) for bank in data['banks']), 103000)
+        self.assertEqual(data['next_question_id'], 10 ** 6 + 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from data_manager import DataManager
+from paper_assembler import AssemblyError, assemble_paper, question_kind
+from question_manager import QuestionManager
+
+
+class QuestionKindTest(unittest.TestCase):
+
+    def test_option_letter_answers_are_choice(self):
+        for answer in ('D', 'BCD', ' A', 'A、C', 'A, C', 'A正确', 'B错误', 'B .tracert', 'C。'):
+            self.assertEqual(question_kind({'answer': answer}), 'choice', answer)
+
+    def test_words_are_short_answer(self):
+        for answer in ('each', 'bad', 'face', 'added', 'def x', 'Bad', 'ARP协议', 'BGP', 'a', '222', '', None):
+            self.assertEqual(question_kind({'answer': answer}), 'short', answer)
+
+
+class AssemblePaperKindTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'questions.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'banks': [{'id': 1, 'name': '题库一', 'questions': []}]}, f)
+        self.question_manager = QuestionManager(DataManager(path))
+        answers = ['A', 'BD', 'each', 'bad', 'face', 'added', 'def x']
+        for i, answer in enumerate(answers):
+            self.question_manager.add_question({'topic': 'T', 'content': f'q{i}', 'answer': answer}, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lowercase_words_do_not_satisfy_choice_quota(self):
+        questions = assemble_paper(self.question_manager, {'question_count': 4, 'kinds': {'short': 4}})
+        self.assertTrue(all(question_kind(q) == 'short' for q in questions))
+        with self.assertRaises(AssemblyError) as context:
+            assemble_paper(self.question_manager, {'question_count': 3, 'kinds': {'choice': 3}})
+        self.assertIn('选择题至少需要3道，可用的只有2道', context.exception.problems)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import threading
+import time
+import unittest
+
+from persistence import BackgroundWriter
+
+
+class BackgroundWriterTest(unittest.TestCase):
+    """flush写入期间有新修改时，后台线程等待写入结束而不是空转"""
+
+    def test_no_busy_wait_during_flush(self):
+        writes = []
+
+        def write():
+            time.sleep(0.5)
+            writes.append(time.monotonic())
+
+        writer = BackgroundWriter(write, delay=0.01)
+        try:
+            flusher = threading.Thread(target=writer.flush)
+            writer.mark_dirty()
+            flusher.start()
+            time.sleep(0.05)
+            writer.mark_dirty()
+            start = time.process_time()
+            flusher.join()
+            self.assertLess(time.process_time() - start, 0.2)
+            # flush期间的修改在flush结束后由后台线程写入
+            deadline = time.monotonic() + 2
+            while writer.is_dirty() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(len(writes), 2)
+        finally:
+            writer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
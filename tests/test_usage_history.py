@@ -0,0 +1,45 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from data_manager import DataManager
+from paper_generator import PaperGenerator
+from question_manager import QuestionManager
+from usage_history import UsageHistory
+
+
+class GeneratePapersHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, 'questions.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'banks': [{'id': 1, 'name': '题库一', 'questions': []}]}, f)
+        question_manager = QuestionManager(DataManager(path))
+        for i in range(40):
+            question_manager.add_question({'topic': 'T', 'content': f'q{i}', 'answer': 'A'}, 1)
+        self.history = UsageHistory(os.path.join(self.tmpdir, 'history.jsonl'))
+        self.generator = PaperGenerator(question_manager, self.history)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_variants_are_recorded_as_one_paper(self):
+        papers = self.generator.generate_papers(3, topic='T', question_count=5, seed=1)
+        self.assertEqual(len(self.history), 1)
+        used = {question_id for paper in papers for question_id in paper['question_ids']}
+        self.assertEqual(set(self.history.recent(papers=1)), used)
+        self.assertEqual(len(UsageHistory(self.history.file_path)), 1)
+
+    def test_avoid_last_paper_covers_every_variant(self):
+        papers = self.generator.generate_papers(3, topic='T', question_count=5, seed=1)
+        used = {question_id for paper in papers for question_id in paper['question_ids']}
+        manifest, _ = self.generator.create_manifest('T', 20, seed=2, avoid=self.history.recent(papers=1))
+        self.assertFalse(used & set(manifest['question_ids']))
+        self.assertEqual(len(self.history), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,273 @@
+from bisect import bisect_left, insort
+import heapq
+from search_index import normalize_search_text
+
+
+class _TrieNode:
+    """前缀树节点"""
+
+    __slots__ = ('children', 'topics', 'ranked')
+
+    def __init__(self):
+        # 规范化后的字符 -> 子节点
+        self.children = {}
+        # 以该节点对应前缀开头的知识点
+        self.topics = set()
+        # 按排序键排好序的(负使用次数, 知识点)，第一次查询时建立，之后随次数变化增量调整
+        self.ranked = None
+
+
+class TopicCompleter:
+    """知识点自动补全类，前缀树用于前缀匹配，两字片段索引用于中间匹配，结果按使用次数排序
+
+    匹配前知识点和输入都按search_index.normalize_search_text规范化，与关键词搜索一致。
+
+    每个前缀树节点缓存排序结果，知识点的使用次数变化时只用二分查找调整该知识点
+    路径上的缓存，连续输入时每次按键只需沿前缀树走到对应节点。
+    """
+
+    def __init__(self):
+        """
+        初始化空的补全器
+        """
+        self._root = _TrieNode()
+        # 知识点 -> 使用该知识点的题目数
+        self._counts = {}
+        # 知识点 -> 规范化后的知识点
+        self._normalized = {}
+        # 规范化后的单字或两字片段 -> 包含它的知识点，用于中间匹配
+        self._grams = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, topic):
+        return topic in self._counts
+
+    def _rank_key(self, topic):
+        """
+        排序键：使用次数多的在前，次数相同时按名称排列
+
+        Args:
+            topic: 知识点
+
+        Returns:
+            tuple: 排序键
+        """
+        return (-self._counts[topic], topic)
+
+    @staticmethod
+    def _topic_grams(lowered):
+        """
+        获取规范化后的知识点中的单字和相邻两字
+
+        Args:
+            lowered: 规范化后的知识点
+
+        Returns:
+            set: 单字和两字片段
+        """
+        return set(lowered) | {lowered[i:i + 2] for i in range(len(lowered) - 1)}
+
+    def _path(self, lowered, create=False):
+        """
+        获取前缀对应的节点路径
+
+        Args:
+            lowered: 规范化后的前缀
+            create: 节点不存在时是否创建
+
+        Returns:
+            list: 从根节点开始的节点列表，前缀不存在时返回None
+        """
+        node = self._root
+        path = [node]
+        for char in lowered:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _TrieNode()
+            node = child
+            path.append(node)
+        return path
+
+    def _set_count(self, topic, lowered, count):
+        """
+        修改知识点的使用次数，并调整前缀树路径上已缓存的排序结果
+
+        Args:
+            topic: 知识点
+            lowered: 规范化后的知识点
+            count: 新的使用次数，0表示移除
+        """
+        old = self._counts.get(topic)
+        path = self._path(lowered, create=count > 0)
+        for node in path:
+            if old is None:
+                node.topics.add(topic)
+            elif count == 0:
+                node.topics.discard(topic)
+            ranked = node.ranked
+            if ranked is not None:
+                if old is not None:
+                    del ranked[bisect_left(ranked, (-old, topic))]
+                if count:
+                    insort(ranked, (-count, topic))
+        if count:
+            self._counts[topic] = count
+            return
+        del self._counts[topic]
+        # 删除不再有知识点的节点
+        for depth in range(len(lowered), 0, -1):
+            if path[depth].topics:
+                break
+            del path[depth - 1].children[lowered[depth - 1]]
+
+    def add(self, topic, count=1):
+        """
+        增加知识点的使用次数，新知识点加入前缀树和片段索引
+
+        Args:
+            topic: 知识点
+            count: 增加的次数
+        """
+        if not isinstance(topic, str) or count <= 0:
+            return
+        is_new = topic not in self._counts
+        if is_new:
+            self._normalized[topic] = normalize_search_text(topic)
+        lowered = self._normalized[topic]
+        self._set_count(topic, lowered, self._counts.get(topic, 0) + count)
+        if is_new:
+            for gram in self._topic_grams(lowered):
+                self._grams.setdefault(gram, set()).add(topic)
+
+    def remove(self, topic, count=1):
+        """
+        减少知识点的使用次数，次数为0时移除知识点
+
+        Args:
+            topic: 知识点
+            count: 减少的次数
+        """
+        current = self._counts.get(topic)
+        if current is None or count <= 0:
+            return
+        lowered = self._normalized[topic]
+        self._set_count(topic, lowered, max(current - count, 0))
+        if current > count:
+            return
+        del self._normalized[topic]
+        for gram in self._topic_grams(lowered):
+            topics = self._grams.get(gram)
+            if topics is not None:
+                topics.discard(topic)
+                if not topics:
+                    del self._grams[gram]
+
+    def count(self, topic):
+        """
+        获取知识点的使用次数
+
+        Args:
+            topic: 知识点
+
+        Returns:
+            int: 使用次数，不存在时为0
+        """
+        return self._counts.get(topic, 0)
+
+    def _ranked(self, lowered):
+        """
+        获取以前缀开头的知识点的排序结果
+
+        Args:
+            lowered: 规范化后的前缀
+
+        Returns:
+            list: (负使用次数, 知识点)列表，前缀不存在时为空列表
+        """
+        path = self._path(lowered)
+        if path is None:
+            return []
+        node = path[-1]
+        if node.ranked is None:
+            node.ranked = sorted((-self._counts[topic], topic) for topic in node.topics)
+        return node.ranked
+
+    def _gram_groups(self, lowered):
+        """
+        获取输入中每个单字或两字片段对应的知识点集合
+
+        Args:
+            lowered: 规范化后的输入
+
+        Returns:
+            list: 知识点集合列表，从小到大排列
+        """
+        if len(lowered) == 1:
+            return [self._grams.get(lowered, set())]
+        return sorted((self._grams.get(lowered[i:i + 2], set()) for i in range(len(lowered) - 1)), key=len)
+
+    def _infix_matches(self, lowered, groups):
+        """
+        获取在中间位置包含输入的知识点
+
+        Args:
+            lowered: 规范化后的输入
+            groups: _gram_groups的结果
+
+        Returns:
+            set: 知识点集合，包含以输入开头的知识点
+        """
+        topics = groups[0]
+        for group in groups[1:]:
+            if not topics:
+                break
+            topics = topics & group
+        if len(lowered) > 2:
+            normalized = self._normalized
+            topics = {topic for topic in topics if lowered in normalized[topic]}
+        return topics
+
+    def complete(self, text, limit=None):
+        """
+        补全知识点，忽略大小写、全半角和空白的差异
+
+        以输入开头的知识点排在前面，其次是在中间位置包含输入的知识点，
+        两部分各自按使用次数从多到少排列。
+
+        Args:
+            text: 已输入的文本
+            limit: 最多返回的知识点数，None表示全部
+
+        Returns:
+            list: 知识点列表
+        """
+        lowered = normalize_search_text(text)
+        ranked = self._ranked(lowered)
+        results = [topic for _, topic in (ranked if limit is None else ranked[:limit])]
+        if not lowered or (limit is not None and len(results) >= limit):
+            return results
+        groups = self._gram_groups(lowered)
+        if len(groups[0]) <= len(ranked):
+            # 包含输入的知识点不会比以输入开头的多
+            return results
+        if limit is not None and len(groups[0]) * 4 >= len(self._counts):
+            # 可能匹配的知识点较多时，按全部知识点的排序依次检查，很快就能凑满
+            for _, topic in self._ranked(''):
+                lowered_topic = self._normalized[topic]
+                if lowered in lowered_topic and not lowered_topic.startswith(lowered):
+                    results.append(topic)
+                    if len(results) >= limit:
+                        break
+            return results
+        prefix = {topic for _, topic in ranked}
+        others = [topic for topic in self._infix_matches(lowered, groups) if topic not in prefix]
+        if limit is None:
+            others.sort(key=self._rank_key)
+        else:
+            others = heapq.nsmallest(limit - len(results), others, key=self._rank_key)
+        results.extend(others)
+        return results
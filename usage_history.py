@@ -0,0 +1,236 @@
+import json
+import os
+import time
+from itertools import accumulate
+from persistence import atomic_write
+
+# 默认的使用记录文件
+HISTORY_FILE = 'usage_history.jsonl'
+# 默认保留的试卷数，超过两倍时压缩记录文件
+MAX_PAPERS = 10000
+
+
+def _encode(timestamp, question_ids):
+    """
+    将一份试卷的使用记录编码为一行：[时间戳, 排序后相邻题目ID的差值]
+
+    Args:
+        timestamp: 生成试卷的时间戳（秒）
+        question_ids: 题目ID列表
+
+    Returns:
+        str: 不含换行的一行文本
+    """
+    ids = sorted(set(question_ids))
+    deltas = [b - a for a, b in zip([0] + ids, ids)]
+    return json.dumps([timestamp, deltas], separators=(',', ':'))
+
+
+def _decode(line):
+    """
+    解码一行使用记录
+
+    Args:
+        line: _encode生成的文本
+
+    Returns:
+        tuple: (时间戳, 题目ID元组)
+    """
+    timestamp, deltas = json.loads(line)
+    return timestamp, tuple(accumulate(deltas))
+
+
+class RecentUsage:
+    """最近若干份试卷或若干天内用过的题目
+
+    只是使用记录上的一个视图，判断一道题是否在其中只需查一次题目最近使用的索引，
+    与记录了多少份试卷无关。可以直接作为抽题时的avoid参数。
+    """
+
+    def __init__(self, history, min_paper, min_time):
+        """
+        初始化视图
+
+        Args:
+            history: UsageHistory
+            min_paper: 试卷序号不小于它的试卷算作最近的试卷
+            min_time: 生成时间不早于它的试卷算作最近的试卷
+        """
+        self._history = history
+        self._min_paper = min_paper
+        self._min_time = min_time
+
+    def __contains__(self, question_id):
+        paper = self._history.last_paper(question_id)
+        if paper is None:
+            return False
+        return paper >= self._min_paper or self._history.paper_time(paper) >= self._min_time
+
+    def __iter__(self):
+        return (question_id for question_id in self._history.question_ids() if question_id in self)
+
+
+class UsageHistory:
+    """试卷使用记录，记录每份生成的试卷用了哪些题目
+
+    每份试卷追加一行 [时间戳, 题目ID差值]，题目ID排序后只保存相邻的差值。
+    内存中按题目ID记录它最近一次出现在哪份试卷中，查询一道题是否最近用过是O(1)的，
+    记录增长到数千份试卷也不会变慢。记录超过max_papers的两倍时只保留最近的max_papers份。
+    """
+
+    def __init__(self, file_path=HISTORY_FILE, max_papers=MAX_PAPERS):
+        """
+        初始化使用记录，文件存在时加载已有记录
+
+        Args:
+            file_path: 记录文件路径，None表示只记录在内存中
+            max_papers: 压缩时保留的试卷数
+        """
+        self.file_path = file_path
+        self.max_papers = max_papers
+        # (时间戳, 题目ID元组)，序号为_first_paper加上在列表中的位置
+        self._papers = []
+        self._first_paper = 0
+        # 题目ID -> 最近一次使用该题的试卷序号
+        self._last_paper = {}
+        self._load()
+
+    def __len__(self):
+        return len(self._papers)
+
+    def _load(self):
+        """
+        从记录文件加载使用记录
+        """
+        if not self.file_path or not os.path.exists(self.file_path):
+            return
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._append(*_decode(line))
+                    except (json.JSONDecodeError, TypeError, ValueError):
+                        # 崩溃时最后一行可能只写了一半，忽略之后的内容
+                        break
+        except OSError as e:
+            print(f"加载使用记录失败: {e}")
+
+    def _append(self, timestamp, question_ids):
+        """
+        在内存中加入一份试卷的记录并更新索引
+
+        Args:
+            timestamp: 时间戳
+            question_ids: 题目ID元组
+
+        Returns:
+            int: 试卷序号
+        """
+        paper = self._first_paper + len(self._papers)
+        self._papers.append((timestamp, question_ids))
+        last_paper = self._last_paper
+        for question_id in question_ids:
+            last_paper[question_id] = paper
+        return paper
+
+    def record(self, question_ids, timestamp=None):
+        """
+        记录一份试卷用到的题目
+
+        Args:
+            question_ids: 题目ID列表
+            timestamp: 生成试卷的时间戳（秒），None表示当前时间
+
+        Returns:
+            int: 试卷序号
+        """
+        if timestamp is None:
+            timestamp = int(time.time())
+        line = _encode(timestamp, question_ids)
+        paper = self._append(*_decode(line))
+        if self.file_path:
+            try:
+                with open(self.file_path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                print(f"保存使用记录失败: {e}")
+        if len(self._papers) > 2 * self.max_papers:
+            self.compact()
+        return paper
+
+    def compact(self):
+        """
+        只保留最近的max_papers份试卷，并重写记录文件
+        """
+        dropped = max(len(self._papers) - self.max_papers, 0)
+        if dropped:
+            self._first_paper += dropped
+            del self._papers[:dropped]
+            first = self._first_paper
+            self._last_paper = {
+                question_id: paper for question_id, paper in self._last_paper.items() if paper >= first
+            }
+        if self.file_path:
+            lines = [_encode(timestamp, question_ids) + '\n' for timestamp, question_ids in self._papers]
+            try:
+                atomic_write(self.file_path, lambda f: f.writelines(lines))
+            except OSError as e:
+                print(f"保存使用记录失败: {e}")
+
+    def last_paper(self, question_id):
+        """
+        获取最近一次使用该题的试卷序号
+
+        Args:
+            question_id: 题目ID
+
+        Returns:
+            int: 试卷序号，没有使用过（或记录已被压缩掉）时为None
+        """
+        return self._last_paper.get(question_id)
+
+    def paper_time(self, paper):
+        """
+        获取试卷的生成时间
+
+        Args:
+            paper: 试卷序号
+
+        Returns:
+            int: 时间戳
+        """
+        return self._papers[paper - self._first_paper][0]
+
+    def question_ids(self):
+        """
+        获取记录中用过的所有题目ID
+
+        Returns:
+            list: 题目ID列表
+        """
+        return list(self._last_paper)
+
+    def recent(self, papers=None, days=None, now=None):
+        """
+        获取最近papers份试卷或最近days天内用过的题目，两个条件满足其一即可
+
+        Args:
+            papers: 最近的试卷数，None或0表示不按试卷数
+            days: 最近的天数，None或0表示不按天数
+            now: 当前时间戳，None表示当前时间
+
+        Returns:
+            RecentUsage: 最近用过的题目，没有任何条件时为None
+        """
+        if not papers and not days:
+            return None
+        next_paper = self._first_paper + len(self._papers)
+        min_paper = next_paper - papers if papers else float('inf')
+        if days:
+            min_time = (time.time() if now is None else now) - days * 86400
+        else:
+            min_time = float('inf')
+        return RecentUsage(self, min_paper, min_time)